@@ -1,17 +1,50 @@
 import json
+import time
 import constants
 from typing import Any, Dict
 from utils import extract_json
 from state import AppState
-from llm import llm
+from llm import get_llm
+from llm_usage import usage_tracker
+from tracing import span
+from settings import settings
+from context_prefetch import get_context_inputs
 from langchain_core.tools import tool
 from tools.clockify_tools import get_all_descriptions
-from tools.feedback_doc_reader import parse_feedback_excel
+from tools.feedback_doc_reader import aparse_feedback_excel
 
 CURRENT_STEP = constants.CONTEXT_BUILDER_STEP
+llm = get_llm(CURRENT_STEP)
+
+# Describes the descriptions' format only when tools/activity_filter.py produced it
+ACTIVITY_FILTER_NOTE = (
+    ' The descriptions are already pre-filtered and ranked by time logged; "(xN)" means N similar time entries'
+    ' were merged into that item.'
+) if settings.activity_filter_enabled else ""
+
+PREFETCHED_SYSTEM_PROMPT = """You are a context building agent that helps gather information about an employee's work activities and feedback.
+
+You are given the employee's Clockify work descriptions and their feedback document.
+
+Your task is to:
+1. From the Clockify work descriptions, identify ONLY actual development work activities (coding, testing, bug fixes, feature implementation, code reviews, deployment, etc.). Completely ignore and exclude: meetings, discussions, standups, planning sessions, and any non-technical activities.""" + ACTIVITY_FILTER_NOTE + """
+
+2. From the feedback document, provide a concise summary of the key points in approximately 200 words. Focus on the most important appreciations, areas for improvement, and action items.
+
+3. The final response should contain **ONLY** the following JSON object, without any additional explanation or text:
+{
+    "development_activities": ["list of filtered development work items"],
+    "feedback_summary": "A 200-word summary of the feedback document",
+    "project_summary": "project summary from context",
+    "user_role": "user responsibilities",
+    "technologies": ["tech stack used"],
+    "designation": "user designation"
+}
+
+Be thorough in filtering out non-development activities from Clockify logs."""
 
 @tool
-def get_clockify_work_descriptions(project_id: str, user_id: str, rangeStart: str, rangeEnd: str) -> str:
+async def get_clockify_work_descriptions(project_id: str, user_id: str, rangeStart: str, rangeEnd: str) -> str:
     """
     Retrieve all work descriptions from Clockify time tracking for a specific project and user within a date range.
     Returns a comma-separated string of work descriptions. Filter and return only items that involve actual 
@@ -25,13 +58,13 @@ def get_clockify_work_descriptions(project_id: str, user_id: str, rangeStart: st
         rangeEnd: End date in ISO 8601 format (e.g., "2025-10-24T23:59:59.000Z")
     
     Returns:
-        Comma-separated string of unique work descriptions
+        Comma-separated string of work activities, ranked by time logged; "(xN)" marks N merged similar entries
     """
-    return get_all_descriptions(project_id, user_id, rangeStart, rangeEnd)
+    return await get_all_descriptions(project_id, user_id, rangeStart, rangeEnd)
 
 
 @tool
-def get_feedback_summary(file_path: str) -> str:
+async def get_feedback_summary(file_path: str) -> str:
     """
     Parse and return the employee feedback document content as JSON.
     The feedback document contains appreciations, areas of improvement, and action items.
@@ -43,27 +76,33 @@ def get_feedback_summary(file_path: str) -> str:
     Returns:
         JSON string containing structured feedback data from all sheets
     """
-    return parse_feedback_excel(file_path)
+    return await aparse_feedback_excel(file_path)
+
+
+async def invoke_model(model, messages, session_id: str):
+    """One LLM round of the context builder, traced and accounted."""
+    with span("llm.context_builder", {"messages": len(messages)}):
+        started = time.perf_counter()
+        response = await model.ainvoke(messages)
+        usage_tracker.record("context_builder", response.usage_metadata, time.perf_counter() - started, session_id=session_id)
+        return response
 
 
 async def context_builder(state: AppState, stream_callback) -> Dict[str, Any]:
     """
-    Build the project context from the current state using LLM with tool calling.
+    Build the project context from the current state using LLM with tool calling,
+    or with a single LLM call over prefetched inputs when context prefetch is enabled.
     This agent gathers context about the user's work by:
     1. Fetching and filtering development work from Clockify time logs
     2. Summarizing feedback received by the user
     """
     await stream_callback({"type": "status", "data": "Building project context...", "current_step": CURRENT_STEP})
     
-    # Prepare tools for the LLM
-    tools = [get_clockify_work_descriptions, get_feedback_summary]
-    llm_with_tools = llm.bind_tools(tools)
-    
     # Build the prompt for the LLM
     system_prompt = """You are a context building agent that helps gather information about an employee's work activities and feedback.
 
 Your task is to:
-1. Use the get_clockify_work_descriptions tool to retrieve time log entries and identify ONLY actual development work activities (coding, testing, bug fixes, feature implementation, code reviews, deployment, etc.). Completely ignore and exclude: meetings, discussions, standups, planning sessions, and any non-technical activities.
+1. Use the get_clockify_work_descriptions tool to retrieve time log entries and identify ONLY actual development work activities (coding, testing, bug fixes, feature implementation, code reviews, deployment, etc.). Completely ignore and exclude: meetings, discussions, standups, planning sessions, and any non-technical activities.""" + ACTIVITY_FILTER_NOTE + """
 
 2. Use the get_feedback_summary tool to read the feedback document and provide a concise summary of the key points in approximately 200 words. Focus on the most important appreciations, areas for improvement, and action items.
 
@@ -86,6 +125,7 @@ Be thorough in filtering out non-development activities from Clockify logs."""
     rangeStart = conversation.get("start_date", "")
     rangeEnd = conversation.get("end_date", "")
     feedback_path = conversation.get("feedback_document_path", "")
+    session_id = conversation.get("id", "")
     
     # Get existing project context
     project_context = state.get("project_context", {}).get("project_context", {})
@@ -114,12 +154,46 @@ Be thorough in filtering out non-development activities from Clockify logs."""
 
 Remember to filter only actual development work from Clockify and provide a concise 200-word feedback summary."""
     
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_message}
-    ]
+    if settings.context_prefetch_enabled:
+        # The tool arguments are fully known from the conversation, so the inputs are
+        # fetched up front (usually already at conversation creation) and the model
+        # only needs a single call to filter and summarize them.
+        await stream_callback({"type": "status", "data": "Reading work logs and feedback...", "current_step": CURRENT_STEP})
+        inputs = await get_context_inputs(state)
+        await stream_callback({
+            "type": "state_update",
+            "data": json.dumps(inputs),
+            "current_step": CURRENT_STEP
+        })
+        model = llm
+        messages = [
+            {"role": "system", "content": PREFETCHED_SYSTEM_PROMPT},
+            {"role": "user", "content": f"""Please analyze the following information:
+
+1. Clockify work descriptions (comma-separated):
+{inputs["clockify_data"].get("descriptions", "")}
+
+2. Feedback document (JSON):
+{inputs["feedback_data"].get("content", "")}
+
+3. Include the following existing context in your final JSON response:
+   - project_summary: {project_summary}
+   - user_role: {user_role}
+   - technologies: {technologies}
+   - designation: {designation}
+
+Remember to filter only actual development work from Clockify and provide a concise 200-word feedback summary."""}
+        ]
+    else:
+        # Prepare tools for the LLM
+        tools = [get_clockify_work_descriptions, get_feedback_summary]
+        model = llm.bind_tools(tools)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
     
-    await stream_callback({"type": "status", "data": "Calling LLM with tools...", "current_step": CURRENT_STEP})
+    await stream_callback({"type": "status", "data": "Calling LLM...", "current_step": CURRENT_STEP})
 
     await stream_callback({
             "type": "state_update",
@@ -127,8 +201,8 @@ Remember to filter only actual development work from Clockify and provide a conc
             "current_step": constants.CONTEXT_BUILDER_STEP
         })
     
-    # Invoke the LLM with tools
-    response = await llm_with_tools.ainvoke(messages)
+    # Invoke the LLM (with tools unless the inputs were prefetched)
+    response = await invoke_model(model, messages, session_id)
 
     try:
     
@@ -145,9 +219,9 @@ Remember to filter only actual development work from Clockify and provide a conc
                 await stream_callback({"type": "status", "data": f"Calling {tool_name}...", "current_step": CURRENT_STEP})
                 
                 if tool_name == "get_clockify_work_descriptions":
-                    tool_result = get_all_descriptions(**tool_args)
+                    tool_result = await get_all_descriptions(**tool_args)
                 elif tool_name == "get_feedback_summary":
-                    tool_result = parse_feedback_excel(**tool_args)
+                    tool_result = await aparse_feedback_excel(**tool_args)
                 else:
                     tool_result = f"Unknown tool: {tool_name}"
                 
@@ -158,7 +232,7 @@ Remember to filter only actual development work from Clockify and provide a conc
                 })
             
             # Get next response from LLM
-            response = await llm_with_tools.ainvoke(messages)
+            response = await invoke_model(model, messages, session_id)
         
         await stream_callback({"type": "status", "data": "Processing LLM response...", "current_step": CURRENT_STEP})
         
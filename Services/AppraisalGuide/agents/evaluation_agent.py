@@ -1,17 +1,31 @@
 # agents/project_intake.py
 
 import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 import constants
-from utils import extract_json, strip_unwanted_properties
+from utils import JSONFieldStreamer, JSONStreamScanner, strip_unwanted_properties, window_history
 from state import AppState
-from llm import llm
+from llm import get_llm
+from langchain_core.messages import AIMessageChunk
+from langchain_core.messages.ai import add_usage
 from langchain_core.prompts import PromptTemplate
 from store import available_outcomes
+from settings import settings
+from prompt_cache import get_prompt_prefix_cache
+from opening_questions import get_opening_question_cache
+from llm_usage import usage_tracker
+from tracing import span
 
 CURRENT_STEP = constants.EVALUATION_STEP
+llm = get_llm(CURRENT_STEP)
 
 MAX_QUESTIONS_PER_OUTCOME = 4
 
+# Reply fields shown to the user, streamed as they are generated
+STREAMED_FIELDS = ("rationale", "question", "summary")
+
+# Stable part of the prompt: the same for every session and outcome, rendered once
 INTAKE_PROMPT = PromptTemplate(template="""
 You are an Outcome Evaluation Agent in an AI-assisted employee appraisal system.
 
@@ -28,40 +42,6 @@ using first-person language (“I”, “my contribution”, etc.).
 
 ---
 
-## Outcome being evaluated
-Outcome name:
-{outcome_name}
-
-Outcome expectations (based on designation):
-{outcome_expectations}
-
----
-
-## Context about the employee
-This information is provided to help you ask relevant questions.
-It may be incomplete.
-
-Project summary:
-{project_summary}
-
-User roles in the project:
-{user_role}
-
-Technologies involved:
-{technologies}
-
-Development activities:
-{development_activities}
-
-Feedback summary:
-{feedback_summary}
-
-Refer the user roles, development activities and feedback summary to form your
-questions and final summary. This is the MOST value addition you can do to
-the user as it simplifies their manual effort.
-
----
-
 ## Rating scale (organizational standard)
 You may use ONLY the following ratings:
 
@@ -178,8 +158,93 @@ Do NOT include any text outside JSON.
 }}
 
 """,
-input_variables=["outcome_name", "outcome_expectations", "project_summary", "user_role", "technologies", "development_activities", "feedback_summary", "max_contribution_questions",
-                 "max_rating_justification_questions"])
+input_variables=["max_contribution_questions", "max_rating_justification_questions"]).format(
+    max_contribution_questions=MAX_QUESTIONS_PER_OUTCOME,
+    max_rating_justification_questions=3
+)
+
+# Per (session, outcome) part, appended after the stable part so the two form one cacheable prefix
+OUTCOME_CONTEXT_PROMPT = PromptTemplate(template="""
+## Outcome being evaluated
+Outcome name:
+{outcome_name}
+
+Outcome expectations (based on designation):
+{outcome_expectations}
+
+---
+
+## Context about the employee
+This information is provided to help you ask relevant questions.
+It may be incomplete.
+
+Project summary:
+{project_summary}
+
+User roles in the project:
+{user_role}
+
+Technologies involved:
+{technologies}
+
+Development activities:
+{development_activities}
+
+Feedback summary:
+{feedback_summary}
+
+Refer the user roles, development activities and feedback summary to form your
+questions and final summary. This is the MOST value addition you can do to
+the user as it simplifies their manual effort.
+""",
+input_variables=["outcome_name", "outcome_expectations", "project_summary", "user_role", "technologies", "development_activities", "feedback_summary"])
+
+def get_outcome_inputs(outcome: Optional[Dict[str, Any]], context_builder_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Inputs of OUTCOME_CONTEXT_PROMPT for an outcome of available_outcomes."""
+    return {
+        "outcome_name": outcome["outcome"] if outcome else "",
+        "outcome_expectations": outcome["expectation"] if outcome else "",
+        "project_summary": context_builder_data.get("project_summary", ""),
+        "user_role": context_builder_data.get("user_role", ""),
+        "technologies": context_builder_data.get("technologies", ""),
+        "development_activities": context_builder_data.get("development_activities", ""),
+        "feedback_summary": context_builder_data.get("feedback_summary", ""),
+    }
+
+def render_prompt_prefix(session_id: str, outcome_inputs: Dict[str, Any]) -> str:
+    return get_prompt_prefix_cache().render(
+        (session_id, outcome_inputs["outcome_name"]), outcome_inputs,
+        lambda: INTAKE_PROMPT + "\n---\n" + OUTCOME_CONTEXT_PROMPT.format(**outcome_inputs)
+    )
+
+def opening_messages(outcome_name: str) -> List[Dict[str, Any]]:
+    """The conversation of an outcome's first turn, before the employee has said anything about it."""
+    return [{"role": "user", "content": "Start evaluation for outcome " + outcome_name}]
+
+async def replay(text: str) -> AsyncIterator[AIMessageChunk]:
+    yield AIMessageChunk(content=text)
+
+async def generate_opening_reply(session_id: str, outcome_inputs: Dict[str, Any]) -> str:
+    """The reply to an outcome's first turn, generated ahead of time."""
+    messages = [{"role": "system", "content": render_prompt_prefix(session_id, outcome_inputs)}]
+    messages.extend(opening_messages(outcome_inputs["outcome_name"]))
+    with span("llm.evaluation_opening", {"outcome": outcome_inputs["outcome_name"]}):
+        started = time.perf_counter()
+        response = await llm.ainvoke(messages)
+        usage_tracker.record("evaluation_opening", response.usage_metadata, time.perf_counter() - started, session_id=session_id)
+    return response.text
+
+def prepare_opening_questions(session_id: str, outcomes: List[Dict[str, Any]], context_builder_data: Dict[str, Any]):
+    """
+    Generate the opening replies of `outcomes` concurrently in the background, so
+    moving on to the next outcome does not wait for a second LLM call. Replies
+    already prepared for the same context are kept; others are replaced.
+    """
+    cache = get_opening_question_cache()
+    for outcome in outcomes:
+        outcome_inputs = get_outcome_inputs(outcome, context_builder_data)
+        cache.prepare((session_id, outcome["outcome"]), outcome_inputs,
+                      lambda outcome_inputs=outcome_inputs: generate_opening_reply(session_id, outcome_inputs))
 
 async def evaluation_agent(state: AppState, stream_callback):
     try:
@@ -211,27 +276,47 @@ async def evaluation_agent(state: AppState, stream_callback):
             "current_step": present_step
         })
 
-        INTAKE_PROMPT_FORMATTED = INTAKE_PROMPT.format(
-            designation=designation,
-            outcome_name=evaluating_outcome["outcome"] if evaluating_outcome else "",
-            outcome_expectations=evaluating_outcome["expectation"] if evaluating_outcome else "",
-            project_summary=context_builder_data.get("project_summary", ""),
-            user_role=context_builder_data.get("user_role", ""),
-            technologies=context_builder_data.get("technologies", ""),
-            development_activities=context_builder_data.get("development_activities", ""),
-            feedback_summary=context_builder_data.get("feedback_summary", ""),
-            max_contribution_questions=MAX_QUESTIONS_PER_OUTCOME,
-            max_rating_justification_questions=3
-            )
-        
+        session_id = state.get("conversation", {}).get("id", "")
+        outcome_inputs = get_outcome_inputs(evaluating_outcome, context_builder_data)
+        prefix_key = (session_id, outcome_inputs["outcome_name"])
+        prefix_cache = get_prompt_prefix_cache()
+        prompt_prefix = render_prompt_prefix(session_id, outcome_inputs)
+
+        if settings.speculative_opening_questions and context_builder_data:
+            prepare_opening_questions(session_id, pending_outcomes[1:], context_builder_data)
+
         current_step_messages = [m for m in messages if m.get("message_section", "") == present_step]
         current_step_messages = strip_unwanted_properties(current_step_messages)
+        opening_reply = None
         if current_step_messages == []:
-            current_step_messages = [{"role": "user", "content": "Start evaluation for outcome " + evaluating_outcome["outcome"]}]
+            current_step_messages = opening_messages(evaluating_outcome["outcome"])
+            if settings.speculative_opening_questions:
+                opening_reply = await get_opening_question_cache().take(prefix_key, outcome_inputs)
+
+        history_summaries = state.get("history_summaries", {})
+        current_step_messages, history_summary = await window_history(
+            current_step_messages, history_summaries.get(present_step, {}), llm,
+            keep_last_turns=settings.history_keep_last_turns,
+            token_budget=settings.evaluation_history_token_budget,
+            summary_batch_turns=settings.history_summary_batch_turns
+        )
+        if history_summary != history_summaries.get(present_step, {}):
+            await stream_callback({
+                "type": "state_update",
+                "data": json.dumps({"history_summaries": {**history_summaries, present_step: history_summary}}),
+                "current_step": present_step
+            })
 
-        # Build full message context
-        final_messages = [{"role": "assistant", "content": INTAKE_PROMPT_FORMATTED }]
-        final_messages.extend(current_step_messages)
+        # Build full message context. With a provider cache the prefix is already on the
+        # provider's side and only the turns of this outcome are sent.
+        cached_content = prefix_cache.provider_cache(prefix_key, llm) if settings.llm_context_cache_enabled else None
+        if cached_content:
+            final_messages = list(current_step_messages)
+            llm_kwargs = {"cached_content": cached_content}
+        else:
+            final_messages = [{"role": "system", "content": prompt_prefix}]
+            final_messages.extend(current_step_messages)
+            llm_kwargs = {}
         
         await stream_callback({
             "data": f"Yoda is thinking to evaluate{evaluating_outcome['outcome']}...",
@@ -239,10 +324,45 @@ async def evaluation_agent(state: AppState, stream_callback):
             "current_step": present_step
         })
 
-        response = await llm.ainvoke(final_messages)
-
-        if response.text:
-            final_response = extract_json(response.text)
+        # Stream the user-facing fields while the JSON reply is generated, in the order
+        # they are assembled below; the complete object is parsed from the same chunks
+        scanner = JSONStreamScanner()
+        streamer = JSONFieldStreamer(STREAMED_FIELDS)
+        full_output = ""
+        usage = None
+        streamed_field = None
+        first_token_seconds = None
+        with span("llm.evaluation_agent", {"prompt_cache": "provider" if cached_content else "inline",
+                                           "speculative": opening_reply is not None}):
+            started = time.perf_counter()
+            # A speculatively generated opening reply is replayed through the same path as a live stream
+            chunks = replay(opening_reply) if opening_reply is not None else llm.astream(final_messages, **llm_kwargs)
+            async for chunk in chunks:
+                usage = add_usage(usage, chunk.usage_metadata) if chunk.usage_metadata else usage
+                if not chunk.content:
+                    continue
+                piece = chunk.content
+                full_output += piece
+                scanner.feed(piece)
+                for field, text in streamer.feed(piece):
+                    if streamed_field is None and streamer.values.get("status") == "rating_proposal":
+                        text = f"I would like to suggest the rating {streamer.values.get('rating', '')}. " + text
+                    elif streamed_field not in (None, field):
+                        text = " " + text
+                    streamed_field = field
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - started
+                    await stream_callback({
+                        "data": text,
+                        "type": "message",
+                        "current_step": present_step
+                    })   # STREAM TO FRONTEND
+            if opening_reply is None:
+                usage_tracker.record("evaluation_agent", usage, time.perf_counter() - started, session_id=session_id,
+                                     prompt_cache="provider" if cached_content else "inline", first_token_seconds=first_token_seconds)
+
+        if full_output:
+            final_response = scanner.objects[0] if scanner.objects else {}
         else:
             final_response = {"error": "No response text from LLM"}
         
@@ -273,10 +393,10 @@ async def evaluation_agent(state: AppState, stream_callback):
             else:
                 content = final_response.get("question", "Couldn't get question from LLM.  Something wrong")
                 if not final_response.get("question"):
-                    if response.text not in [None, ""]:
-                        content = response.text
+                    if full_output not in [None, ""]:
+                        content = full_output
                     print("Missing question in evaluation agent response:", final_response)
-                    print("Full response text:", response.text)
+                    print("Full response text:", full_output)
             await stream_callback({
                 "data": content,
                 "type": "full_text",
@@ -1,14 +1,20 @@
 # agents/project_intake.py
 
 import json
+import time
 import constants
 from typing import Dict, Any
-from utils import extract_json, strip_unwanted_properties
+from utils import JSONStreamScanner, strip_unwanted_properties, window_history
 from state import AppState
-from llm import llm
+from llm import get_llm
+from llm_usage import usage_tracker
+from tracing import sampled_log, span
+from langchain_core.messages.ai import add_usage
+from settings import settings
 from langchain_core.prompts import PromptTemplate
 
 CURRENT_STEP = constants.PROJECT_INTAKE_STEP
+llm = get_llm(CURRENT_STEP)
 
 INTAKE_PROMPT = PromptTemplate(template="""
 You are an Intake Agent in a multi-agent performance appraisal system.
@@ -80,7 +86,8 @@ async def project_intake_agent(state: AppState, stream_callback):
 
         messages = strip_unwanted_properties(messages)
 
-        print("Project Intake Agent invoked with state:", state)
+        sampled_log("project_intake.invoked", conversation_id=state.get("conversation", {}).get("id", ""),
+                    messages=len(messages))
 
         designation = state.get("designation", "")
 
@@ -93,11 +100,23 @@ async def project_intake_agent(state: AppState, stream_callback):
         INTAKE_PROMPT_FORMATTED = INTAKE_PROMPT.format(
             designation=designation)
 
-        print("Formatted Intake Prompt:")
+        history_summaries = state.get("history_summaries", {})
+        history, history_summary = await window_history(
+            messages, history_summaries.get(CURRENT_STEP, {}), llm,
+            keep_last_turns=settings.history_keep_last_turns,
+            token_budget=settings.intake_history_token_budget,
+            summary_batch_turns=settings.history_summary_batch_turns
+        )
+        if history_summary != history_summaries.get(CURRENT_STEP, {}):
+            await stream_callback({
+                "type": "state_update",
+                "data": json.dumps({"history_summaries": {**history_summaries, CURRENT_STEP: history_summary}}),
+                "current_step": CURRENT_STEP
+            })
 
         # Build full message context
         final_messages = [{"role": "assistant", "content": INTAKE_PROMPT_FORMATTED }]
-        final_messages.extend(messages)
+        final_messages.extend(history)
 
         # LLM call with streaming
         # response = await llm.astream(final_messages)
@@ -109,26 +128,40 @@ async def project_intake_agent(state: AppState, stream_callback):
             "current_step": CURRENT_STEP
         })
         
-        async for chunk in llm.astream(final_messages):
-            if chunk.content:
-                piece = chunk.content
-                full_output += piece
-                if '"status": "complete"' in full_output:
-                    # If complete, skip streaming intermediate pieces
-                    continue
-                await stream_callback({
-                    "data": piece,
-                    "type": "message",
-                    "current_step": CURRENT_STEP
-                })   # STREAM TO FRONTEND
-
-        
+        # Prose is streamed as it arrives; from the first "{" on the output is held back,
+        # so the completion object never reaches the client in fragments
+        scanner = JSONStreamScanner()
+        completion = None
+        usage = None
+        first_token_seconds = None
+        with span("llm.project_intake"):
+            started = time.perf_counter()
+            async for chunk in llm.astream(final_messages):
+                usage = add_usage(usage, chunk.usage_metadata) if chunk.usage_metadata else usage
+                if chunk.content:
+                    piece = chunk.content
+                    full_output += piece
+                    prose = scanner.feed(piece)
+                    if prose:
+                        if first_token_seconds is None:
+                            first_token_seconds = time.perf_counter() - started
+                        await stream_callback({
+                            "data": prose,
+                            "type": "message",
+                            "current_step": CURRENT_STEP
+                        })   # STREAM TO FRONTEND
+                    if scanner.objects and scanner.objects[-1].get("status") == "complete":
+                        # Nothing after the completion object is used
+                        completion = scanner.objects[-1]
+                        break
+            usage_tracker.record("project_intake", usage, time.perf_counter() - started,
+                                 session_id=state.get("conversation", {}).get("id", ""), first_token_seconds=first_token_seconds)
 
         # Check if intake is complete
-        if '"status": "complete"' in full_output:
+        if completion:
             return {
                 "current_node_complete": True,
-                "project_context": extract_json(full_output),
+                "project_context": completion,
                 "messages": messages + [{"role": "assistant", "content": full_output}],
                 "wait_for_user_input": False,
                 "current_step": "intake"
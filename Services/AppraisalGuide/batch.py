@@ -0,0 +1,284 @@
+# batch.py
+"""
+Offline appraisal drafts for a whole team.
+
+For every row of a manifest (engineer, designation, project, date range,
+feedback document) this fetches the Clockify work descriptions, parses the
+feedback document and runs the context builder, the same steps a
+conversation goes through before its evaluation starts. Rows run
+concurrently (--concurrency), Clockify calls share the client's rate limit
+and context builder calls a token bucket of --llm-rps.
+
+Each row's draft is written as soon as it is ready: to the session store
+(--output session, the default) as a conversation that opens at the
+evaluation step, or as <conversation id>.json in --out-dir. Conversation ids
+are derived from the row, so after a crash running the same manifest again
+skips the rows whose draft was written.
+
+Manifest: CSV with a header, or a JSON list of objects, with the columns
+    engineer_id             Clockify user id
+    engineer_name           optional
+    designation             designation name or id (see store.py)
+    project_id, project_name
+    start_date, end_date    ISO 8601
+    feedback_document_path  path of the feedback Excel document
+
+Usage (from Services/AppraisalGuide):
+    python batch.py team.csv --concurrency 8 --llm-rps 2
+    python batch.py team.json --output files --out-dir drafts
+"""
+import argparse
+import asyncio
+import base64
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import NAMESPACE_URL, uuid5
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import constants
+import session_store
+from rate_limit import TokenBucket
+from settings import settings
+from state import INITIAL_STATE
+from store import available_designations
+from tools.clockify_client import close_clockify_client
+from tools.clockify_tools import get_all_descriptions
+from tools.feedback_doc_reader import aparse_feedback_excel
+from tracing import shutdown_tracing, span
+
+REQUIRED_COLUMNS = ("engineer_id", "designation", "project_id", "start_date", "end_date", "feedback_document_path")
+STAGES = ("clockify", "feedback", "llm_wait", "context_builder", "write")
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = json.load(f) if path.endswith(".json") else list(csv.DictReader(f))
+    for number, row in enumerate(rows, start=1):
+        missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+        if missing:
+            raise ValueError(f"manifest row {number} has no {', '.join(missing)}")
+    return rows
+
+
+def conversation_for(row: Dict[str, str]) -> Dict[str, Any]:
+    """The conversation a row's draft belongs to; its id is stable across runs of the same row."""
+    designation = next((d for d in available_designations if row["designation"] in (d.id, d.name)), None)
+    if designation is None:
+        raise ValueError(f"unknown designation {row['designation']!r}")
+    conversation_id = str(uuid5(NAMESPACE_URL, "appraisal-batch:" + ":".join(
+        row[column] for column in ("engineer_id", "project_id", "start_date", "end_date"))))
+    now = datetime.datetime.utcnow().isoformat()
+    return {
+        "id": conversation_id,
+        "user_id": row["engineer_id"],
+        "designation_id": designation.id,
+        "project_id": row["project_id"],
+        "start_date": row["start_date"],
+        "end_date": row["end_date"],
+        "created_at": now,
+        "updated_at": now,
+        "designation": designation.model_dump(),
+        "project": {"id": row["project_id"], "name": row.get("project_name") or row["project_id"]},
+        "feedback_document_path": base64.b64encode(str(Path(row["feedback_document_path"])).encode("utf-8")).decode("utf-8"),
+        "clockify_user_id": row["engineer_id"],
+    }
+
+
+class DraftWriter:
+    """Writes drafts to the session store or to one JSON file per conversation."""
+
+    def __init__(self, output: str, out_dir: Optional[str]):
+        self.output = output
+        self.out_dir = Path(out_dir) if out_dir else None
+        if self.out_dir is not None:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, conversation_id: str) -> Path:
+        return self.out_dir / f"{conversation_id}.json"
+
+    async def exists(self, conversation_id: str) -> bool:
+        if self.output == "files":
+            return self._path(conversation_id).exists()
+        session = await session_store.load_session(conversation_id, include_messages=False)
+        return bool(session.get("context_builder_data"))
+
+    async def write(self, state: Dict[str, Any]):
+        conversation_id = state["conversation"]["id"]
+        if self.output == "files":
+            # Written whole or not at all, so a crash never leaves a draft that looks done
+            path = self._path(conversation_id)
+            tmp = path.with_suffix(".json.tmp")
+            await asyncio.to_thread(tmp.write_text, json.dumps(state, indent=2), "utf-8")
+            await asyncio.to_thread(os.replace, tmp, path)
+            return
+        await session_store.save_session(conversation_id, state)
+        await session_store.index_conversation(state["conversation"])
+
+
+class BatchRun:
+    def __init__(self, writer: DraftWriter, concurrency: int, llm_rps: float):
+        self.writer = writer
+        self.concurrency = concurrency
+        self.llm_bucket = TokenBucket(llm_rps, capacity=max(1.0, llm_rps))
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.results = {"drafted": 0, "skipped": 0, "failed": 0}
+        self.failures: List[Dict[str, str]] = []
+
+    def _timed(self, stage: str, started: float):
+        self.timings[stage].append(time.perf_counter() - started)
+
+    async def _fetch(self, stage: str, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._timed(stage, started)
+
+    async def draft(self, row: Dict[str, str]):
+        from agents.context_builder import context_builder
+        from workflow import run_agent
+
+        conversation = conversation_for(row)
+        conversation_id = conversation["id"]
+        if await self.writer.exists(conversation_id):
+            self.results["skipped"] += 1
+            return
+
+        with span("batch.draft", {"conversation.id": conversation_id}):
+            descriptions, feedback = await asyncio.gather(
+                self._fetch("clockify", get_all_descriptions(conversation["project_id"], conversation["clockify_user_id"],
+                                                             conversation["start_date"], conversation["end_date"])),
+                self._fetch("feedback", aparse_feedback_excel(conversation["feedback_document_path"])),
+            )
+            if not descriptions or not feedback:
+                raise RuntimeError("no Clockify descriptions" if not descriptions else "feedback document unreadable")
+
+            state = {
+                **INITIAL_STATE,
+                "conversation": conversation,
+                "designation": conversation["designation"]["name"],
+                "clockify_data": {"descriptions": descriptions},
+                "feedback_data": {"content": feedback},
+            }
+            started = time.perf_counter()
+            await self.llm_bucket.acquire()
+            self._timed("llm_wait", started)
+
+            async def ignore(event):
+                pass
+
+            # As the context_builder node runs it, so the draft has the node's state and messages
+            started = time.perf_counter()
+            delta = await run_agent(context_builder, state,
+                                    {"configurable": {"thread_id": conversation_id, "stream_callback": ignore}})
+            self._timed("context_builder", started)
+            if delta.get("error") or not delta.get("context_builder_data"):
+                raise RuntimeError(delta.get("error") or "context builder returned no context")
+
+            new_messages = delta.pop("messages")
+            state.update(delta)
+            state["messages"] = [{**message, "message_section": constants.CONTEXT_BUILDER_STEP} for message in new_messages]
+            # The conversation opens at its evaluation
+            state["current_step"] = constants.EVALUATION_STEP
+            state["current_node_complete"] = False
+
+            started = time.perf_counter()
+            await self.writer.write(state)
+            self._timed("write", started)
+        self.results["drafted"] += 1
+
+    async def _worker(self, queue: "asyncio.Queue[Dict[str, str]]"):
+        while True:
+            try:
+                row = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self.draft(row)
+            except Exception as e:
+                self.results["failed"] += 1
+                self.failures.append({"engineer_id": row.get("engineer_id", ""), "project_id": row.get("project_id", ""), "error": str(e)})
+                print(f"Draft failed for engineer {row.get('engineer_id')} on project {row.get('project_id')}: {e}")
+            done = sum(self.results.values())
+            if done % 10 == 0:
+                print(f"{done} rows done ({self.results['drafted']} drafted, {self.results['skipped']} skipped, {self.results['failed']} failed)")
+
+    async def run(self, rows: List[Dict[str, str]]) -> Dict[str, Any]:
+        queue: "asyncio.Queue[Dict[str, str]]" = asyncio.Queue()
+        for row in rows:
+            queue.put_nowait(row)
+        started = time.perf_counter()
+        await asyncio.gather(*(self._worker(queue) for _ in range(min(self.concurrency, len(rows)) or 1)))
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        stages = {}
+        for stage, samples in self.timings.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stages[stage] = {
+                "count": len(ordered),
+                "mean_seconds": round(sum(ordered) / len(ordered), 4),
+                "p50_seconds": round(ordered[len(ordered) // 2], 4),
+                "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+                "max_seconds": round(ordered[-1], 4),
+            }
+        return {
+            **self.results,
+            "elapsed_seconds": round(elapsed, 2),
+            "engineers_per_minute": round(self.results["drafted"] / elapsed * 60, 2) if elapsed else 0.0,
+            "concurrency": self.concurrency,
+            "llm_requests_per_second": self.llm_bucket.rate,
+            "stages": stages,
+            "failures": self.failures,
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{report['drafted']} drafted, {report['skipped']} skipped (already drafted), {report['failed']} failed "
+          f"in {report['elapsed_seconds']}s: {report['engineers_per_minute']} engineers/min")
+    print(f"{'stage':<16} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for stage, timing in report["stages"].items():
+        print(f"{stage:<16} {timing['count']:>6} " + " ".join(
+            f"{timing[field]:>8.3f}s" for field in ("mean_seconds", "p50_seconds", "p95_seconds", "max_seconds")))
+
+
+async def main(args) -> int:
+    rows = load_manifest(args.manifest)
+    # The inputs are fetched here, so the context builder makes a single LLM call per row
+    settings.context_prefetch_enabled = True
+    writer = DraftWriter(args.output, args.out_dir if args.output == "files" else None)
+    batch = BatchRun(writer, args.concurrency, args.llm_rps)
+    try:
+        report = await batch.run(rows)
+    finally:
+        await close_clockify_client()
+        await session_store.get_backend().close()
+        shutdown_tracing()
+
+    print_report(report)
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV or JSON manifest of the engineers to draft")
+    parser.add_argument("--concurrency", type=int, default=settings.batch_concurrency, help="rows drafted at once")
+    parser.add_argument("--llm-rps", type=float, default=settings.batch_llm_requests_per_second,
+                        help="context builder LLM calls per second, across rows")
+    parser.add_argument("--output", choices=("session", "files"), default="session")
+    parser.add_argument("--out-dir", default="drafts", help="directory of the drafts with --output files")
+    parser.add_argument("--report", help="also write the report as JSON to this path")
+    sys.exit(asyncio.run(main(parser.parse_args())))
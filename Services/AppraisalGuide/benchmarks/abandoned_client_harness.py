@@ -0,0 +1,205 @@
+# benchmarks/abandoned_client_harness.py
+"""
+Abandoned SSE client harness.
+
+Runs the app under uvicorn (in-memory sessions, a fake evaluation model that
+streams a long reply slowly) and opens --clients chat streams at once. Half
+of the clients hang up while the model is still "thinking" (before the first
+token), the other half after the first streamed text. One more client reads
+its stream to the end as a control. Abandoned turns are cancelled once the
+resume grace period (STREAM_RESUME_GRACE_SECONDS, 0.5s here) has passed.
+
+Afterwards the harness checks that everything returns to baseline: no model
+stream is still open, no more tokens are being generated, the server's event
+loop has the same number of tasks as before, and the abandoned clients cost
+only a fraction of the tokens of full replies. Exits non-zero when a check
+fails.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.abandoned_client_harness --clients 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+    "STREAM_DISCONNECT_POLL_SECONDS": "0.2",
+    "STREAM_RESUME_GRACE_SECONDS": "0.5",
+    "LOG_SAMPLE_RATE": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+import uvicorn
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+DESIGNATION = "Senior Project Engineer"
+REPLY = json.dumps({
+    "status": "question",
+    "phase": "contribution",
+    "question": "Could you describe how you planned and delivered your modules this cycle? " * 20,
+}, indent=2)
+
+
+class CountingStreamModel(BaseChatModel):
+    """Streams REPLY one character at a time, counting streams, open streams and generated characters."""
+    first_token_latency: float = 1.0
+    char_delay: float = 0.01
+    generated: int = 0
+    streams: int = 0
+    open_streams: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("streaming only")
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.streams += 1
+        self.open_streams += 1
+        try:
+            await asyncio.sleep(self.first_token_latency)
+            for c in REPLY:
+                await asyncio.sleep(self.char_delay)
+                self.generated += 1
+                yield ChatGenerationChunk(message=AIMessageChunk(content=c))
+        finally:
+            self.open_streams -= 1
+
+
+class Server:
+    """The app under uvicorn on its own event loop in a background thread."""
+
+    def __init__(self, port: int):
+        import main
+        self.server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.server.serve(),), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def task_count(self) -> int:
+        async def count():
+            return len(asyncio.all_tasks())
+        return self.run(count())
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+async def new_conversation(conversation_id: str):
+    import session_store
+    from state import INITIAL_STATE
+    await session_store.save_session(conversation_id, {
+        **INITIAL_STATE,
+        "conversation": {"id": conversation_id},
+        "designation": DESIGNATION,
+        "current_step": "evaluation",
+        "context_builder_data": {"project_summary": "A reporting platform", "user_role": "Module owner"},
+    })
+
+
+async def client(base_url: str, conversation_id: str, hang_up: str) -> str:
+    """Stream one turn; hang_up is "thinking" (0.3s after the request), "streaming" (after the first text) or "never"."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        async with http.stream("POST", f"/api/conversations/{conversation_id}/messages/stream",
+                               json={"content": "Let's start"}) as response:
+            if hang_up == "thinking":
+                await asyncio.sleep(0.3)
+                return "abandoned while thinking"
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "message" and hang_up == "streaming":
+                    return "abandoned while streaming"
+                if event["type"] == "complete":
+                    return "completed"
+    return "ended without complete"
+
+
+def wait_until(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def main(args) -> int:
+    import agents.evaluation_agent as evaluation_agent
+    model = CountingStreamModel(first_token_latency=args.first_token_latency, char_delay=args.char_delay)
+    evaluation_agent.llm = model
+
+    with Server(args.port) as server:
+        base_url = f"http://127.0.0.1:{args.port}"
+        for i in range(args.clients + 1):
+            server.run(new_conversation(f"harness-{i}"))
+        baseline_tasks = server.task_count()
+
+        async def run_clients():
+            modes = ["thinking" if i % 2 == 0 else "streaming" for i in range(args.clients)] + ["never"]
+            return await asyncio.gather(*(client(base_url, f"harness-{i}", mode) for i, mode in enumerate(modes)))
+
+        started = time.perf_counter()
+        outcomes = asyncio.run(run_clients())
+        elapsed = time.perf_counter() - started
+
+        streams_closed = wait_until(lambda: model.open_streams == 0, args.grace)
+        generated = model.generated
+        time.sleep(0.5)
+        generation_stopped = model.generated == generated
+        tasks_back = wait_until(lambda: server.task_count() <= baseline_tasks, args.grace)
+        final_tasks = server.task_count()
+
+    full_reply_chars = len(REPLY) * (args.clients + 1)
+    print(f"clients={args.clients} (+1 control) first_token_latency={args.first_token_latency}s char_delay={args.char_delay}s")
+    for outcome in sorted(set(outcomes)):
+        print(f"  {outcome:<26} {outcomes.count(outcome)}")
+    print(f"  clients done in           {elapsed:.2f}s")
+    print(f"  characters generated      {generated} of {full_reply_chars} for full replies ({generated / full_reply_chars:.0%})")
+    print(f"  server tasks              baseline={baseline_tasks} after={final_tasks}")
+
+    checks = {
+        "control client completed": outcomes[-1] == "completed",
+        "model streams closed": streams_closed,
+        "generation stopped": generation_stopped,
+        "server tasks back to baseline": tasks_back,
+        "abandoned clients cost under half of full replies": generated < full_reply_chars / 2,
+    }
+    for check, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8792)
+    parser.add_argument("--first-token-latency", type=float, default=1.0)
+    parser.add_argument("--char-delay", type=float, default=0.01, help="seconds per streamed character")
+    parser.add_argument("--grace", type=float, default=3.0, help="seconds allowed for cleanup after the clients are gone")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,156 @@
+# benchmarks/activity_filter_bench.py
+"""
+Token reduction of the local Clockify activity filter on synthetic logs.
+
+Generates --entries time entries the way people log time: development work
+from templates over components ("Implement invoices API"), with
+ticket ids, changed case, extra whitespace, trailing punctuation and the
+odd typo, mixed with meetings, standups and other non-development entries
+(--non-dev-share). Then compares what the context builder's prompt gets:
+
+  baseline  exact duplicates removed (dict.fromkeys), comma-joined
+  filtered  tools/activity_filter: rules, normalization, near-duplicates merged
+
+Reported: estimated input tokens of each (utils.CHARS_PER_TOKEN), the
+filter's time, and its quality against the generator's ground truth:
+non-development entries dropped, development entries wrongly dropped, and
+development topics (template x component) that still have an activity of
+their own rather than being merged into another topic.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.activity_filter_bench --entries 5000
+    python -m benchmarks.activity_filter_bench --entries 5000 --threshold 0.6 --max-items 50
+"""
+import argparse
+import os
+import random
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+}.items():
+    os.environ.setdefault(name, value)
+
+from tools.activity_filter import ActivityClassifier, filter_activities, format_activities, jaccard, normalize, shingles
+from utils import CHARS_PER_TOKEN
+
+DEVELOPMENT_TEMPLATES = [
+    "Implement {c} API",
+    "Fix bug in {c} validation",
+    "Code review for {c}",
+    "Write unit tests for {c}",
+    "Refactor {c} module",
+    "Deploy {c} service to staging",
+    "Debug {c} performance issue",
+    "Migrate {c} schema",
+    "Integrate {c} with payment gateway",
+    "Optimize {c} query",
+]
+COMPONENTS = [
+    "login", "signup", "invoices", "orders", "reports export", "notifications", "user profile", "search",
+    "checkout", "inventory", "audit log", "dashboard", "billing", "file upload", "permissions",
+]
+NON_DEVELOPMENT = [
+    "Daily standup", "Sprint planning meeting", "Sprint retrospective", "Backlog grooming", "1:1 with manager",
+    "Team sync-up", "Client call", "Lunch break", "Timesheet update", "Town hall", "Interview panel",
+    "Onboarding training", "Emails and admin", "Sprint demo prep meeting", "Catch up with team lead",
+]
+TICKET_PREFIXES = ["PAY", "WEB", "CORE", "OPS"]
+
+
+def vary(text: str, rng: random.Random) -> str:
+    """How the same work gets logged differently on different days."""
+    roll = rng.random()
+    if roll < 0.35:
+        text = f"{rng.choice(TICKET_PREFIXES)}-{rng.randint(100, 4999)} {text}"
+    elif roll < 0.45:
+        text = f"{text} #{rng.randint(10, 999)}"
+    roll = rng.random()
+    if roll < 0.15:
+        text = text.lower()
+    elif roll < 0.2:
+        text = text.replace(" ", "  ", 1)
+    elif roll < 0.3:
+        text = text + rng.choice([".", " -", ";"])
+    if rng.random() < 0.05 and len(text) > 8:
+        # A dropped letter
+        position = rng.randrange(4, len(text) - 1)
+        text = text[:position] + text[position + 1:]
+    return text
+
+
+def synthetic_log(entries: int, non_dev_share: float, seed: int):
+    """(entries, ground truth) where the truth is the topic of each entry, None for non-development."""
+    rng = random.Random(seed)
+    # A person works on a subset of topics, some much more than others
+    topics = [(t, c) for t in DEVELOPMENT_TEMPLATES for c in COMPONENTS]
+    rng.shuffle(topics)
+    topics = topics[:60]
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+    log, truth = [], []
+    for _ in range(entries):
+        if rng.random() < non_dev_share:
+            log.append({"description": vary(rng.choice(NON_DEVELOPMENT), rng), "duration": rng.choice([900, 1800, 3600])})
+            truth.append(None)
+        else:
+            template, component = rng.choices(topics, weights)[0]
+            log.append({"description": vary(template.format(c=component), rng), "duration": rng.choice([1800, 3600, 7200])})
+            truth.append((template, component))
+    return log, truth
+
+
+def baseline_text(log) -> str:
+    return ", ".join(dict.fromkeys(entry["description"] for entry in log if entry.get("description")))
+
+
+def tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def main(args):
+    log, truth = synthetic_log(args.entries, args.non_dev_share, args.seed)
+    classifier = ActivityClassifier()
+
+    baseline = baseline_text(log)
+    started = time.perf_counter()
+    result = filter_activities(log, classifier, args.threshold, args.max_items)
+    filtered = format_activities(result)
+    seconds = time.perf_counter() - started
+
+    non_dev = [entry for entry, topic in zip(log, truth) if topic is None]
+    dev = [entry for entry, topic in zip(log, truth) if topic is not None]
+    dropped_non_dev = sum(not classifier.is_development(entry["description"]) for entry in non_dev)
+    dropped_dev = sum(not classifier.is_development(entry["description"]) for entry in dev)
+    # Each activity belongs to the topic its wording is most similar to; a topic survives when some activity does
+    topics = {topic: shingles(normalize(topic[0].format(c=topic[1]))) for topic in set(filter(None, truth))}
+    surviving = {max(topics, key=lambda topic: jaccard(shingles(normalize(a["description"])), topics[topic]))
+                 for a in result["activities"] + result["omitted"]}
+
+    print(f"{args.entries} entries ({len(non_dev)} non-development), {len(topics)} development topics, "
+          f"{len(set(e['description'] for e in log))} distinct descriptions")
+    print(f"{'':<10} {'items':>7} {'chars':>8} {'~tokens':>8}")
+    print(f"{'baseline':<10} {len(set(e['description'] for e in log)):>7} {len(baseline):>8} {tokens(baseline):>8}")
+    print(f"{'filtered':<10} {len(result['activities']):>7} {len(filtered):>8} {tokens(filtered):>8}  "
+          f"({1 - tokens(filtered) / tokens(baseline):.1%} fewer tokens)")
+    print(f"filter time {seconds * 1000:.0f}ms; {result['unique']} normalized descriptions -> "
+          f"{len(result['activities']) + len(result['omitted'])} activities ({len(result['omitted'])} over --max-items)")
+    print(f"non-development entries dropped {dropped_non_dev}/{len(non_dev)} ({dropped_non_dev / max(len(non_dev), 1):.1%}), "
+          f"development entries dropped {dropped_dev}/{len(dev)}")
+    print(f"development topics with their own activity {len(surviving)}/{len(topics)}")
+    if args.show:
+        print("\n" + filtered[:args.show])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--non-dev-share", type=float, default=0.3)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--max-items", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--show", type=int, default=0, help="print this many characters of the filtered list")
+    main(parser.parse_args())
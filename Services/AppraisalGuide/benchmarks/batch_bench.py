@@ -0,0 +1,158 @@
+# benchmarks/batch_bench.py
+"""
+Batch drafting benchmark and resume check.
+
+Writes a manifest of --engineers rows (one feedback workbook each) and runs
+batch.py's pipeline over it against the local mock Clockify server, with a
+fake context builder model that answers after --llm-latency seconds. Drafts
+go to files in a temporary directory.
+
+The first run is killed (its task cancelled) after --crash-after drafts, as
+a crashed process would be; the second run over the same manifest must skip
+exactly the drafts already written and draft the rest. Prints the batch
+report of the resumed run (engineers per minute, per-stage timings) and
+exits non-zero when a check fails.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.batch_bench --engineers 40 --concurrency 8 --llm-rps 10
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.mock_clockify import MockClockifyServer
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+    "LLM_CACHE_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from benchmarks.feedback_parse_bench import build_workbook
+
+REPLY = json.dumps({
+    "development_activities": ["Implemented REST endpoint for feature-1", "Fixed bug in feature-2 validation"],
+    "feedback_summary": "Delivered modules on time with good test coverage.",
+    "project_summary": "",
+    "user_role": "",
+    "technologies": [],
+    "designation": "Senior Software Engineer",
+})
+
+
+class FakeContextModel(BaseChatModel):
+    latency: float = 1.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-context"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=REPLY))])
+
+
+def write_manifest(directory: str, engineers: int, designation: str) -> str:
+    path = os.path.join(directory, "team.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["engineer_id", "engineer_name", "designation", "project_id", "project_name",
+                                               "start_date", "end_date", "feedback_document_path"])
+        writer.writeheader()
+        for i in range(engineers):
+            feedback = os.path.join(directory, f"feedback-{i}.xlsx")
+            build_workbook(feedback, rows=60, sheets=2)
+            writer.writerow({
+                "engineer_id": f"user-{i}", "engineer_name": f"Engineer {i}", "designation": designation,
+                "project_id": f"project-{i % 10}", "project_name": f"Project {i % 10}",
+                "start_date": "2025-06-01T00:00:00.000Z", "end_date": "2025-12-31T23:59:59.000Z",
+                "feedback_document_path": feedback,
+            })
+    return path
+
+
+async def crash_after(batch, rows, drafts: int):
+    task = asyncio.create_task(batch.run(rows))
+    while batch.results["drafted"] < drafts and not task.done():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def main(args) -> int:
+    with MockClockifyServer(port=args.port, entries_per_report=args.entries, latency_seconds=args.clockify_latency) as server:
+        import agents.context_builder as context_builder
+        from batch import BatchRun, DraftWriter, load_manifest, print_report
+        from settings import settings
+        from store import available_designations
+        from tools.clockify_client import close_clockify_client
+
+        settings.clockify_api_base_url = server.api_base_url
+        settings.clockify_reports_base_url = server.reports_base_url
+        settings.context_prefetch_enabled = True
+        model = FakeContextModel(latency=args.llm_latency)
+        context_builder.llm = model
+
+        with tempfile.TemporaryDirectory() as tmp:
+            rows = load_manifest(write_manifest(tmp, args.engineers, available_designations[0].name))
+            out_dir = os.path.join(tmp, "drafts")
+            print(f"{args.engineers} engineers, concurrency {args.concurrency}, {args.llm_rps} LLM calls/s, "
+                  f"{args.llm_latency}s per LLM call, {args.clockify_latency * 1000:.0f}ms Clockify latency")
+
+            crashed = BatchRun(DraftWriter("files", out_dir), args.concurrency, args.llm_rps)
+            await crash_after(crashed, rows, args.crash_after)
+            written = len([name for name in os.listdir(out_dir) if name.endswith(".json")])
+            leftovers = [name for name in os.listdir(out_dir) if name.endswith(".tmp")]
+            print(f"\nfirst run killed after {crashed.results['drafted']} drafts ({written} files written)")
+
+            resumed = BatchRun(DraftWriter("files", out_dir), args.concurrency, args.llm_rps)
+            report = await resumed.run(rows)
+            print_report(report)
+            await close_clockify_client()
+
+            drafts = [json.loads(open(os.path.join(out_dir, name), encoding="utf-8").read())
+                      for name in os.listdir(out_dir) if name.endswith(".json")]
+            checks = {
+                "every engineer has a draft": len(drafts) == args.engineers,
+                "resume skipped exactly the written drafts": report["skipped"] == written,
+                "no row failed": report["failed"] == 0,
+                "no partially written draft": not leftovers,
+                "drafts open at the evaluation": all(d["current_step"] == "evaluation" and d["context_builder_data"] for d in drafts),
+            }
+    print(f"\nmodel calls: {model.calls}, Clockify requests: {server.request_count}")
+    for check, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engineers", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-rps", type=float, default=10.0)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per context builder LLM call")
+    parser.add_argument("--crash-after", type=int, default=10, help="drafts written before the first run is killed")
+    parser.add_argument("--entries", type=int, default=500, help="Clockify entries per report")
+    parser.add_argument("--clockify-latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8766)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,124 @@
+# benchmarks/clockify_bench.py
+"""
+Concurrent-session latency benchmark for the Clockify fetch path.
+
+Starts the local mock Clockify server and runs N concurrent "sessions", each
+fetching a multi-page detailed report, once with the legacy blocking
+implementation (requests.post + time.sleep inside the coroutine) and once with
+the async pooled ClockifyClient. Reports p50/p99 per-session latency and the
+worst event-loop lag observed while the sessions ran.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.clockify_bench --sessions 20 --entries 2500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.mock_clockify import MockClockifyServer
+
+RANGE_START = "2025-06-01T00:00:00.000Z"
+RANGE_END = "2025-12-31T23:59:59.000Z"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def legacy_fetch(reports_base_url, project_id, user_id):
+    import requests
+    url = f"{reports_base_url}/workspaces/bench/reports/detailed"
+    descriptions = []
+    page = 1
+    while True:
+        payload = {
+            "dateRangeStart": RANGE_START,
+            "dateRangeEnd": RANGE_END,
+            "detailedFilter": {"page": page, "pageSize": 1000},
+            "projects": {"ids": [project_id]},
+            "users": {"ids": [user_id]},
+            "amountShown": "HIDE_AMOUNT"
+        }
+        entries = requests.post(url, json=payload).json().get("timeentries", [])
+        if not entries:
+            break
+        descriptions.extend(e["description"] for e in entries if e.get("description"))
+        page += 1
+        time.sleep(0.1)
+    return ", ".join(dict.fromkeys(descriptions))
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_sessions(fetch, sessions: int):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    # Every session "arrives" at the same instant, so a blocked event loop
+    # shows up as queueing delay in the later sessions' latency.
+    started = time.perf_counter()
+
+    async def session(i):
+        await fetch(f"project-{i}", f"user-{i}")
+        return time.perf_counter() - started
+
+    latencies = await asyncio.gather(*(session(i) for i in range(sessions)))
+    wall = time.perf_counter() - started
+    stop.set()
+    return latencies, wall, await lag_task
+
+
+def report(name, latencies, wall, lag):
+    print(
+        f"{name:<8} p50={statistics.median(latencies) * 1000:8.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.1f}ms "
+        f"wall={wall * 1000:8.1f}ms max_loop_lag={lag * 1000:8.1f}ms"
+    )
+
+
+async def main(args):
+    with MockClockifyServer(port=args.port, entries_per_report=args.entries, latency_seconds=args.latency) as server:
+        os.environ.update({
+            "CLOCKIFY_API_KEY": os.environ.get("CLOCKIFY_API_KEY", "bench"),
+            "CLOCKIFY_WORKSPACE_ID": "bench",
+            "CLOCKIFY_USER_ID": os.environ.get("CLOCKIFY_USER_ID", "bench"),
+            "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "bench"),
+            "CLOCKIFY_API_BASE_URL": server.api_base_url,
+            "CLOCKIFY_REPORTS_BASE_URL": server.reports_base_url,
+            "CLOCKIFY_REQUESTS_PER_SECOND": str(args.rate),
+        })
+        from tools.clockify_client import close_clockify_client
+        from tools.clockify_tools import get_all_descriptions
+
+        async def legacy(project_id, user_id):
+            return legacy_fetch(server.reports_base_url, project_id, user_id)
+
+        async def pooled(project_id, user_id):
+            return await get_all_descriptions(project_id, user_id, RANGE_START, RANGE_END)
+
+        print(f"{args.sessions} concurrent sessions, {args.entries} entries/report, "
+              f"{args.latency * 1000:.0f}ms server latency, {args.rate} req/s limit")
+        report("legacy", *await run_sessions(legacy, args.sessions))
+        report("pooled", *await run_sessions(pooled, args.sessions))
+        await close_clockify_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=2500)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server latency per request, seconds")
+    parser.add_argument("--rate", type=float, default=50.0, help="client token-bucket rate, requests/second")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+# benchmarks/duplicate_request_harness.py
+"""
+Duplicate and concurrent request harness.
+
+Runs the app under uvicorn (in-memory sessions, the slow counting model of
+abandoned_client_harness) and sends --duplicates identical chat streams for
+one conversation at once, as a double-click, a retry or a second tab would.
+While they run, a different message for the same conversation is sent.
+
+Checks that the duplicates share one workflow run (the model is streamed once
+and every duplicate receives the full reply), that the different message is
+rejected with 409 instead of running concurrently, and that the conversation
+is free again afterwards. Exits non-zero when a check fails.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.duplicate_request_harness --duplicates 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from benchmarks.abandoned_client_harness import CountingStreamModel, Server, new_conversation
+
+import httpx
+
+CONVERSATION_ID = "duplicates"
+
+
+async def stream(base_url: str, content: str):
+    """(status code, streamed text) of one chat stream read to the end."""
+    text = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        async with http.stream("POST", f"/api/conversations/{CONVERSATION_ID}/messages/stream",
+                               json={"content": content}) as response:
+            if response.status_code != 200:
+                return response.status_code, ""
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    event = json.loads(line[6:])
+                    if event["type"] == "message":
+                        text.append(event["data"])
+                    if event["type"] == "complete":
+                        break
+    return 200, "".join(text)
+
+
+async def scenario(base_url: str, duplicates: int):
+    async def late_duplicate(delay: float):
+        await asyncio.sleep(delay)
+        return await stream(base_url, "Let's start")
+
+    async def other_message():
+        await asyncio.sleep(0.5)
+        return await stream(base_url, "Something else")
+
+    duplicate_results = asyncio.gather(*(late_duplicate(0.2 * i) for i in range(duplicates)))
+    other = await other_message()
+    return await duplicate_results, other
+
+
+def main(args) -> int:
+    import agents.evaluation_agent as evaluation_agent
+    model = CountingStreamModel(first_token_latency=args.first_token_latency, char_delay=args.char_delay)
+    evaluation_agent.llm = model
+
+    with Server(args.port) as server:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server.run(new_conversation(CONVERSATION_ID))
+        duplicates, other = asyncio.run(scenario(base_url, args.duplicates))
+        runs = model.streams
+        after_status, _ = asyncio.run(stream(base_url, "One more thing"))
+
+    print(f"duplicates={args.duplicates} first_token_latency={args.first_token_latency}s char_delay={args.char_delay}s")
+    print(f"  model streams started     {runs}")
+    print(f"  duplicate statuses        {[status for status, _ in duplicates]}")
+    print(f"  different message status  {other[0]}")
+    print(f"  next message status       {after_status}")
+
+    checks = {
+        "one workflow run for the duplicates": runs == 1,
+        "every duplicate got the whole reply": (all(status == 200 for status, _ in duplicates)
+                                                and len({text for _, text in duplicates}) == 1 and duplicates[0][1] != ""),
+        "different message rejected with 409": other[0] == 409,
+        "conversation free after the run": after_status == 200,
+    }
+    for check, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duplicates", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8793)
+    parser.add_argument("--first-token-latency", type=float, default=1.0)
+    parser.add_argument("--char-delay", type=float, default=0.002, help="seconds per streamed character")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+# benchmarks/evaluation_ttft_bench.py
+"""
+Time to first visible token for the intake and evaluation agents.
+
+Each agent is run against a fake model that streams its reply one character
+at a time with a fixed delay per character, standing in for generation
+speed. "first message" is when the first `message` event reaches the stream
+callback. "full text" is when the final `full_text` event does, which is
+also when a non-streaming agent would show anything at all.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.evaluation_ttft_bench --char-delay 0.002
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+DESIGNATION = "Senior Project Engineer"
+
+REPLIES = {
+    "intake question": "Thanks! Could you describe, at a high level, what kind of system the project delivers and who uses it?",
+    "question": json.dumps({
+        "status": "question",
+        "phase": "contribution",
+        "question": "How did you make sure the modules you delivered met the quality bar, for example through reviews or testing?",
+    }, indent=2),
+    "rating_proposal": json.dumps({
+        "status": "rating_proposal",
+        "rating": "MA",
+        "rationale": "You consistently delivered your modules on time, drove code reviews and added integration tests "
+                     "that reduced regressions, which meets all expectations for this outcome.",
+        "question": "Does this rating align with how you view your contribution?",
+    }, indent=2),
+    "complete": json.dumps({
+        "status": "complete",
+        "final_rating": "MA",
+        "summary": "I owned the delivery of the reporting modules this cycle. " * 8,
+    }, indent=2),
+}
+
+
+def state_for(kind: str) -> dict:
+    from state import INITIAL_STATE
+    return {
+        **INITIAL_STATE,
+        "conversation": {"id": f"bench-{kind}"},
+        "designation": DESIGNATION,
+        "messages": [{"role": "user", "content": "I built an API", "created_at": "", "message_section": "General"}],
+        "context_builder_data": {"project_summary": "A reporting platform", "user_role": "Module owner"},
+    }
+
+
+async def measure(kind: str, reply: str, char_delay: float):
+    import agents.evaluation_agent as evaluation_agent
+    import agents.project_intake as project_intake
+
+    model = FakeListChatModel(responses=[reply], sleep=char_delay)
+    timings = {}
+    started = time.perf_counter()
+
+    async def stream_callback(chunk):
+        elapsed = time.perf_counter() - started
+        if chunk["type"] == "message":
+            timings.setdefault("first message", elapsed)
+        elif chunk["type"] == "full_text":
+            timings.setdefault("full text", elapsed)
+
+    if kind == "intake question":
+        project_intake.llm = model
+        await project_intake.project_intake_agent(state_for(kind), stream_callback)
+    else:
+        evaluation_agent.llm = model
+        await evaluation_agent.evaluation_agent(state_for(kind), stream_callback)
+    return timings
+
+
+async def main(args):
+    print(f"{'reply':<16} {'chars':>6} {'first message':>14} {'full text':>10}")
+    for kind, reply in REPLIES.items():
+        timings = await measure(kind, reply, args.char_delay)
+        first = timings.get("first message")
+        print(f"{kind:<16} {len(reply):>6} {f'{first * 1000:.0f}ms' if first is not None else '-':>14} "
+              f"{timings.get('full text', 0) * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--char-delay", type=float, default=0.002, help="seconds per streamed character")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+# benchmarks/fake_chat_model.py
+"""
+Deterministic stand-in for the Gemini chat model, used by the benchmarks.
+
+ScriptedChatModel answers every call with what its `responder` returns for
+the prompt: reply text, or an AIMessage carrying tool calls. Replies are
+streamed token by token (about CHARS_PER_TOKEN characters each, as the
+history budgeting estimates them) after `first_token_latency`, with
+`token_delay` seconds per token, and carry estimated usage_metadata, so
+streaming, tool-calling and usage accounting code paths all run as with the
+real model.
+"""
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from utils import CHARS_PER_TOKEN
+
+# responder(messages, tool_names) -> reply text, or an AIMessage with tool_calls
+Responder = Callable[[List[BaseMessage], List[str]], Union[str, AIMessage]]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ScriptedChatModel(BaseChatModel):
+    responder: Responder
+    first_token_latency: float = 0.0
+    token_delay: float = 0.0
+    tokens_per_chunk: int = 1
+    calls: int = 0
+    streamed_calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": "scripted-fake", "token_delay": self.token_delay}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        self.calls += 1
+        reply = self.responder(messages, [tool["function"]["name"] for tool in tools or []])
+        message = reply if isinstance(reply, AIMessage) else AIMessage(content=reply)
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(message.text) + sum(estimate_tokens(json.dumps(call["args"])) for call in message.tool_calls)
+        message.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": prompt_tokens + output_tokens}
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("ScriptedChatModel is async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         tools: Optional[List[Dict[str, Any]]] = None, **kwargs) -> ChatResult:
+        message = self._reply(messages, tools)
+        await asyncio.sleep(self.first_token_latency + self.token_delay * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       tools: Optional[List[Dict[str, Any]]] = None, **kwargs):
+        message = self._reply(messages, tools)
+        self.streamed_calls += 1
+        await asyncio.sleep(self.first_token_latency)
+        text = message.text
+        step = CHARS_PER_TOKEN * max(self.tokens_per_chunk, 1)
+        for i in range(0, len(text), step):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay * self.tokens_per_chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + step]))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                              for i, call in enumerate(message.tool_calls)],
+            usage_metadata=message.usage_metadata,
+            chunk_position="last",
+        ))
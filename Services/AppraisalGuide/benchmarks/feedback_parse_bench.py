@@ -0,0 +1,89 @@
+# benchmarks/feedback_parse_bench.py
+"""
+Feedback workbook parsing benchmark.
+
+Generates synthetic feedback workbooks (several sheets, 10k rows by default)
+and compares peak memory (tracemalloc) and wall time of:
+  - legacy:  openpyxl full-mode load_workbook, as parse_feedback_excel used to do
+  - stream:  read-only streaming parse (cold, content cache cleared)
+  - cached:  re-reading the unchanged document (stat() hit)
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.feedback_parse_bench --rows 10000 --sheets 3
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from tools import feedback_doc_reader
+
+CATEGORIES = ["Appreciations", "Areas of Improvement", "Action Items"]
+
+
+def build_workbook(path: str, rows: int, sheets: int):
+    wb = openpyxl.Workbook(write_only=True)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Quarter {s + 1}")
+        ws.append(["ENGINEER-LEAD FEEDBACK DOCUMENT"])
+        for i in range(rows):
+            category = CATEGORIES[i * len(CATEGORIES) // rows]
+            key = category if i == 0 or category != CATEGORIES[(i - 1) * len(CATEGORIES) // rows] else None
+            ws.append([key, f"Feedback point {i}: delivered module {i % 50} with good test coverage and clear docs"])
+    wb.save(path)
+
+
+def legacy_parse(path: str):
+    wb = openpyxl.load_workbook(path, data_only=True)
+    all_sheets_data = {}
+    for sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+        sheet_content = {}
+        current_key = None
+        for key_cell, value_cell in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+            if key_cell:
+                current_key = key_cell.strip().lower().replace(" ", "_")
+                sheet_content[current_key] = []
+                if value_cell:
+                    sheet_content[current_key].append(str(value_cell).strip())
+            elif current_key and value_cell:
+                sheet_content[current_key].append(str(value_cell).strip())
+        all_sheets_data[sheet_name] = sheet_content
+    return all_sheets_data
+
+
+def measure(name, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<7} wall={wall * 1000:9.2f}ms peak_mem={peak / 1024 / 1024:8.2f}MiB")
+    return result
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feedback.xlsx")
+        build_workbook(path, args.rows, args.sheets)
+        encoded = base64.b64encode(path.encode("utf-8")).decode("utf-8")
+        print(f"{args.sheets} sheets x {args.rows} rows, {os.path.getsize(path) / 1024:.0f} KiB on disk")
+
+        legacy = measure("legacy", lambda: legacy_parse(path))
+        feedback_doc_reader._stat_cache.clear()
+        feedback_doc_reader._parsed_cache.clear()
+        stream = measure("stream", lambda: feedback_doc_reader.load_feedback(encoded))
+        cached = measure("cached", lambda: feedback_doc_reader.load_feedback(encoded))
+        assert legacy == stream == cached, "parsers disagree"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--sheets", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+# benchmarks/history_replay_bench.py
+"""
+History windowing replay benchmark.
+
+Replays recorded conversations turn by turn and compares the estimated input
+tokens of history each agent call would send with the full history (what the
+agents did before) and with `utils.window_history`. Summarization calls are
+answered by a fake model returning a fixed ~150 word summary; their input
+tokens are reported separately since they are paid too.
+
+Recorded conversations are JSON files holding the message list returned by
+GET /api/conversations/{id}/messages. Without files, synthetic intake and
+evaluation conversations of --turns turns are replayed.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.history_replay_bench --turns 30
+    python -m benchmarks.history_replay_bench conversation1.json conversation2.json
+"""
+import argparse
+import asyncio
+import json
+from itertools import groupby
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from utils import HISTORY_SUMMARY_PROMPT, estimate_tokens, strip_unwanted_properties, window_history
+
+SUMMARY = ("The employee owns the reporting module, migrated it to an event-driven design, "
+           "added integration tests and mentors two juniors during reviews. ") * 5
+ANSWER = ("I led the migration of our reporting module to an event-driven design, "
+          "wrote integration tests for the new consumers and paired with two juniors on reviews. ")
+QUESTION = ("Thanks for sharing that. Could you describe how you ensured the module was delivered "
+            "on time, and what you did when requirements changed mid-sprint? ")
+
+
+def synthetic_conversation(turns: int):
+    messages = []
+    for section in ["project_intake", "evaluation Deliver high-quality, impactful modules to customers on time"]:
+        for turn in range(turns):
+            messages.append({"role": "user", "content": ANSWER * (1 + turn % 3), "created_at": "", "message_section": section})
+            messages.append({"role": "assistant", "content": QUESTION * (1 + turn % 2), "created_at": "", "message_section": section})
+    return messages
+
+
+class CountingSummarizer(FakeListChatModel):
+    """Fake model that answers every call with SUMMARY and counts its input tokens."""
+    calls: int = 0
+    input_tokens: int = 0
+
+    async def ainvoke(self, input, *args, **kwargs):
+        self.calls += 1
+        self.input_tokens += estimate_tokens(input)
+        return await super().ainvoke(input, *args, **kwargs)
+
+
+async def replay_section(messages, keep_last_turns, token_budget, batch_turns):
+    summarizer = CountingSummarizer(responses=[SUMMARY])
+    record = {}
+    full_tokens = windowed_tokens = peak_full = peak_windowed = 0
+    for end in range(1, len(messages) + 1):
+        if messages[end - 1]["role"] != "user":
+            continue
+        history = strip_unwanted_properties(messages[:end])
+        window, record = await window_history(history, record, summarizer, keep_last_turns, token_budget, batch_turns)
+        full, windowed = estimate_tokens(history), estimate_tokens(window)
+        full_tokens += full
+        windowed_tokens += windowed
+        peak_full, peak_windowed = max(peak_full, full), max(peak_windowed, windowed)
+    return full_tokens, windowed_tokens, peak_full, peak_windowed, summarizer.calls, summarizer.input_tokens
+
+
+async def main(args):
+    conversations = {}
+    for path in args.files:
+        with open(path) as f:
+            conversations[path] = json.load(f)
+    if not conversations:
+        conversations["synthetic"] = synthetic_conversation(args.turns)
+
+    print(f"keep_last_turns={args.keep_last_turns} budget={args.budget} batch_turns={args.batch_turns} "
+          f"(summary prompt overhead ~{estimate_tokens([{'content': HISTORY_SUMMARY_PROMPT}])} tokens per call)")
+    print(f"{'conversation':<28} {'section':<24} {'turns':>5} {'full':>8} {'windowed':>9} {'saved':>6} "
+          f"{'peak full':>9} {'peak win':>8} {'sum calls':>9} {'sum input':>9}")
+    for name, messages in conversations.items():
+        for section, section_messages in groupby(messages, key=lambda m: m.get("message_section", "General")):
+            section_messages = list(section_messages)
+            turns = sum(1 for m in section_messages if m["role"] == "user")
+            full, windowed, peak_full, peak_windowed, calls, summary_input = await replay_section(
+                section_messages, args.keep_last_turns, args.budget, args.batch_turns)
+            saved = 1 - (windowed + summary_input) / full if full else 0.0
+            print(f"{name[-28:]:<28} {section[:24]:<24} {turns:>5} {full:>8} {windowed:>9} {saved:>6.0%} "
+                  f"{peak_full:>9} {peak_windowed:>8} {calls:>9} {summary_input:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="recorded message lists (JSON)")
+    parser.add_argument("--turns", type=int, default=30, help="turns per section of the synthetic conversation")
+    parser.add_argument("--keep-last-turns", type=int, default=4)
+    parser.add_argument("--budget", type=int, default=3000, help="history token budget")
+    parser.add_argument("--batch-turns", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
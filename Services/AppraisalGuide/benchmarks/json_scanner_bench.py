@@ -0,0 +1,80 @@
+# benchmarks/json_scanner_bench.py
+"""
+Streaming JSON scanner microbenchmark. The fuzz tests of the scanner are in
+tests/test_json_scanner.py (uv run pytest tests/test_json_scanner.py).
+
+Long streamed outputs are fed in small chunks. The legacy path
+rescans the growing buffer for '"status": "complete"' on every chunk (and
+runs the greedy regex extraction at the end); the scanner consumes each
+chunk once. "question" is a long plain-text turn where the marker never
+appears, so the legacy rescans cover the whole buffer every time;
+"completion" is prose followed by a large completion object, where the
+marker is found early in the buffer and each rescan stops there.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.json_scanner_bench --sizes 10000 100000 300000
+"""
+import argparse
+import json
+import re
+import time
+
+from utils import JSONStreamScanner
+
+
+def long_question(size: int) -> str:
+    sentence = "Could you describe how you coordinated the rollout with the other teams? "
+    return sentence * (size // len(sentence) + 1)
+
+
+def long_completion(size: int) -> str:
+    prose = "Thanks, that gives me a clear picture of the project. " * 4
+    points = []
+    while len(prose) + sum(len(p) for p in points) < size:
+        points.append(f'Owned the "{{module}}" rollout \\ item {len(points)}, with tests and reviews')
+    obj = {"status": "complete", "project_context": {"summary": "A reporting platform", "responsibilities": points}}
+    return prose + json.dumps(obj)
+
+
+def legacy(chunks):
+    full_output = ""
+    for piece in chunks:
+        full_output += piece
+        if '"status": "complete"' in full_output:
+            continue
+    match = re.search(r'\{[\s\S]*\}', full_output)
+    return json.loads(match.group(0)) if match else None
+
+
+def scanned(chunks):
+    scanner = JSONStreamScanner()
+    for piece in chunks:
+        scanner.feed(piece)
+        if scanner.objects and scanner.objects[-1].get("status") == "complete":
+            return scanner.objects[-1]
+    return None
+
+
+def bench(sizes, chunk_size, repeat):
+    print(f"{'output':<10} {'chars':>9} {'chunks':>8} {'legacy':>10} {'scanner':>10}")
+    for name, build in (("question", long_question), ("completion", long_completion)):
+        for size in sizes:
+            text = build(size)
+            chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+            assert legacy(chunks) == scanned(chunks)
+            timings = []
+            for run in (legacy, scanned):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    run(chunks)
+                timings.append((time.perf_counter() - started) / repeat * 1000)
+            print(f"{name:<10} {len(text):>9} {len(chunks):>8} {timings[0]:>8.2f}ms {timings[1]:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--chunk-size", type=int, default=8, help="characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    bench(args.sizes, args.chunk_size, args.repeat)
@@ -0,0 +1,116 @@
+# benchmarks/llm_cache_bench.py
+"""
+LLM response cache: latency of a repeated prompt, live vs. cached.
+
+A fake model takes --first-token-latency seconds to start and then streams
+a reply at --char-delay seconds per character. The same prompt is sent
+through CachedChatModel three times, each with `ainvoke` (like the context
+builder) and with `astream` (like the evaluation agent): a miss, a hit from
+the in-process LRU, and a hit from the Redis tier (fakeredis) with the LRU
+cleared, as another worker would see it. Streamed hits are checked to
+replay the same chunks as the live stream.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.llm_cache_bench --first-token-latency 0.8 --char-delay 0.002
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+REPLY = json.dumps({
+    "development_activities": ["Implemented the reporting API", "Fixed export bugs"] * 10,
+    "feedback_summary": "Consistently delivered on time and mentored new joiners. " * 8,
+}, indent=2)
+MESSAGES = [
+    {"role": "system", "content": "You are a context building agent."},
+    {"role": "user", "content": "Please analyze the following information:\n" + "Implemented feature X, " * 200},
+]
+
+
+class SlowModel(BaseChatModel):
+    first_token_latency: float = 0.8
+    char_delay: float = 0.002
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.first_token_latency + len(REPLY) * self.char_delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=REPLY))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.first_token_latency)
+        for i in range(0, len(REPLY), 8):
+            await asyncio.sleep(self.char_delay * 8)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=REPLY[i:i + 8]))
+
+
+async def timed_invoke(model):
+    started = time.perf_counter()
+    await model.ainvoke(MESSAGES)
+    return time.perf_counter() - started, None, None
+
+
+async def timed_stream(model):
+    started = time.perf_counter()
+    first_token = None
+    chunks = []
+    async for chunk in model.astream(MESSAGES):
+        if first_token is None and chunk.content:
+            first_token = time.perf_counter() - started
+        chunks.append(chunk.content)
+    return time.perf_counter() - started, first_token, chunks
+
+
+async def main(args):
+    import fakeredis
+    from llm_cache import CachedChatModel, LLMResponseCache
+
+    print(f"first_token_latency={args.first_token_latency}s char_delay={args.char_delay}s reply={len(REPLY)} chars")
+    print(f"{'call':<8} {'source':<8} {'total':>9} {'first token':>12} {'model calls':>12}")
+    for call, timed in (("ainvoke", timed_invoke), ("astream", timed_stream)):
+        slow = SlowModel(first_token_latency=args.first_token_latency, char_delay=args.char_delay)
+        cache = LLMResponseCache(ttl_seconds=600, max_entries=64, redis_client=fakeredis.FakeAsyncRedis())
+        model = CachedChatModel(model=slow, response_cache=cache)
+        live_chunks = None
+        for source in ("live", "lru", "redis"):
+            if source == "redis":
+                cache._lru.clear()
+            total, first_token, chunks = await timed(model)
+            if source == "live":
+                live_chunks = chunks
+            elif chunks is not None:
+                assert [c for c in chunks if c] == [c for c in live_chunks if c], "replayed chunks differ from the live stream"
+            first = f"{first_token * 1000:.1f}ms" if first_token is not None else "-"
+            print(f"{call:<8} {source:<8} {total * 1000:>7.1f}ms {first:>12} {slow.calls:>12}")
+    print("streamed hits replay the live chunks: ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-latency", type=float, default=0.8)
+    parser.add_argument("--char-delay", type=float, default=0.002, help="seconds per generated character")
+    asyncio.run(main(parser.parse_args()))
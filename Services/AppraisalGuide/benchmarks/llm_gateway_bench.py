@@ -0,0 +1,175 @@
+# benchmarks/llm_gateway_bench.py
+"""
+LLM gateway under a flaky provider: tail latency, failures and stuck calls.
+
+A fake model answers streams like a loaded provider: the first token after
+a long-tailed (lognormal) delay, then --tokens tokens. A --error-rate
+fraction of requests fail with a 429 and a --stall-rate fraction never
+produce a token. --clients concurrent clients each make streamed calls until
+--calls calls are done, three times:
+
+  direct   straight to the model (a stalled call is given up by the client
+           after --stall-seconds, standing in for "forever")
+  gateway  through LLMGateway: --max-concurrency slots, first-token timeout,
+           jittered retries
+  hedged   the same, plus hedged requests after the p95 first-token latency
+
+Each mode reports time to the first token and to the last (p50/p95/p99),
+failed and stalled calls, and for the gateway modes its queue wait against
+generation time and its retry and hedge counts.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.llm_gateway_bench --calls 400 --clients 12 --max-concurrency 16
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+MESSAGES = [{"role": "user", "content": "Start evaluation for outcome Deliver high-quality impactful features"}]
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+class FlakyModel(BaseChatModel):
+    median_first_token: float = 0.4
+    sigma: float = 0.6
+    error_rate: float = 0.05
+    stall_rate: float = 0.02
+    stall_seconds: float = 30.0
+    tokens: int = 60
+    token_delay: float = 0.005
+    seed: int = 7
+    requests: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # The n-th request behaves the same in every mode
+        rng = random.Random(self.seed * 1_000_003 + self.requests)
+        self.requests += 1
+        roll = rng.random()
+        if roll < self.error_rate:
+            await asyncio.sleep(0.05)
+            raise RateLimited("429 RESOURCE_EXHAUSTED")
+        if roll < self.error_rate + self.stall_rate:
+            await asyncio.sleep(self.stall_seconds)
+        await asyncio.sleep(self.median_first_token * math.exp(rng.gauss(0, self.sigma)))
+        for i in range(self.tokens):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"token{i} "))
+            await asyncio.sleep(self.token_delay)
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_mode(model, calls: int, clients: int, give_up: float):
+    first_tokens, totals = [], []
+    failed = stalled = 0
+    remaining = iter(range(calls))
+
+    async def one_call():
+        nonlocal failed, stalled
+        started = time.perf_counter()
+        first = None
+        try:
+            async with asyncio.timeout(give_up):
+                async for chunk in model.astream(MESSAGES):
+                    if first is None:
+                        first = time.perf_counter() - started
+        except TimeoutError as e:
+            # The client gave up (asyncio.timeout), or the gateway did (LLMTimeoutError)
+            if type(e) is TimeoutError:
+                stalled += 1
+            else:
+                failed += 1
+            return
+        except Exception:
+            failed += 1
+            return
+        first_tokens.append(first)
+        totals.append(time.perf_counter() - started)
+
+    async def client():
+        for _ in remaining:
+            await one_call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return first_tokens, totals, failed, stalled, time.perf_counter() - started
+
+
+async def main(args):
+    from llm_gateway import LLMGateway
+
+    def flaky():
+        return FlakyModel(median_first_token=args.median_first_token, error_rate=args.error_rate, stall_rate=args.stall_rate,
+                          stall_seconds=args.stall_seconds * 2, tokens=args.tokens, token_delay=args.token_delay)
+
+    def gateway(hedge: bool):
+        return LLMGateway(max_concurrency=args.max_concurrency, call_timeout=args.stall_seconds,
+                          first_token_timeout=args.first_token_timeout, stream_idle_timeout=args.first_token_timeout,
+                          max_retries=args.max_retries, retry_base_delay=0.2, retry_max_delay=2.0,
+                          hedge_enabled=hedge, hedge_min_samples=20, hedge_min_delay=0.2)
+
+    print(f"{args.calls} streamed calls from {args.clients} clients; provider: median first token "
+          f"{args.median_first_token}s, {args.error_rate:.0%} 429s, {args.stall_rate:.0%} stalls")
+    print(f"{'mode':<8} {'ttft p50':>9} {'ttft p95':>9} {'ttft p99':>9} {'total p99':>10} {'failed':>7} {'stalled':>8} {'wall':>7}")
+    for mode in ("direct", "gateway", "hedged"):
+        model = flaky()
+        gate = None
+        if mode != "direct":
+            gate = gateway(hedge=mode == "hedged")
+            model = gate.wrap(model)
+        first_tokens, totals, failed, stalled, wall = await run_mode(model, args.calls, args.clients, args.stall_seconds)
+        print(f"{mode:<8} {percentile(first_tokens, 50):>8.2f}s {percentile(first_tokens, 95):>8.2f}s "
+              f"{percentile(first_tokens, 99):>8.2f}s {percentile(totals, 99):>9.2f}s {failed:>7} {stalled:>8} {wall:>6.1f}s")
+        if gate is not None:
+            stats = gate.get_stats()
+            print(f"         queue wait mean={stats['queue_wait'].get('mean_ms', 0):.0f}ms p95={stats['queue_wait'].get('p95_ms', 0):.0f}ms | "
+                  f"generation mean={stats['generation'].get('mean_ms', 0):.0f}ms p95={stats['generation'].get('p95_ms', 0):.0f}ms | "
+                  f"attempts={stats['attempts']} retries={stats['retries']} hedges={stats['hedges']} "
+                  f"hedge_wins={stats['hedge_wins']} timeouts={stats['timeouts']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--median-first-token", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--stall-rate", type=float, default=0.02)
+    parser.add_argument("--stall-seconds", type=float, default=15.0, help="how long a client waits on a stalled call")
+    parser.add_argument("--first-token-timeout", type=float, default=3.0)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    asyncio.run(main(parser.parse_args()))
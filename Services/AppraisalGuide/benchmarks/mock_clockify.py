@@ -0,0 +1,101 @@
+# benchmarks/mock_clockify.py
+"""
+Local stand-in for the Clockify API, used by the benchmarks.
+
+Serves the two endpoints the service calls (workspace projects and the
+detailed report) with a configurable per-request latency, and runs in a
+background thread so a benchmark can point `clockify_*_base_url` at it.
+"""
+import asyncio
+import datetime
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+ACTIVITIES = [
+    "Implemented REST endpoint for {n}",
+    "Fixed bug in {n} validation",
+    "Code review for {n}",
+    "Daily standup",
+    "Sprint planning meeting",
+    "Wrote unit tests for {n}",
+    "Refactored {n} module",
+    "Deployment of {n} to staging",
+]
+
+
+def build_entries(count: int, rangeStart: str, rangeEnd: str):
+    start = datetime.datetime.fromisoformat(rangeStart)
+    end = datetime.datetime.fromisoformat(rangeEnd)
+    step = (end - start) / max(count, 1)
+    return [
+        {
+            "_id": f"entry-{int((start + step * i).timestamp() * 1000)}",
+            "description": ACTIVITIES[i % len(ACTIVITIES)].format(n=f"feature-{i % 97}"),
+            "timeInterval": {
+                "start": (start + step * i).isoformat().replace("+00:00", "Z"),
+                "end": (start + step * i).isoformat().replace("+00:00", "Z"),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def create_app(entries_per_report: int = 2500, latency_seconds: float = 0.05) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/api/v1/workspaces/{workspace_id}/projects")
+    async def projects(workspace_id: str):
+        app.state.requests += 1
+        await asyncio.sleep(latency_seconds)
+        return [{"id": f"project-{i}", "name": f"Project {i}"} for i in range(10)]
+
+    @app.post("/reports/v1/workspaces/{workspace_id}/reports/detailed")
+    async def detailed_report(workspace_id: str, request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        await asyncio.sleep(latency_seconds)
+        page = body["detailedFilter"]["page"]
+        page_size = body["detailedFilter"]["pageSize"]
+        entries = build_entries(entries_per_report, body["dateRangeStart"], body["dateRangeEnd"])
+        return {
+            "totals": [{"_id": "", "entriesCount": len(entries)}],
+            "timeentries": entries[(page - 1) * page_size: page * page_size],
+        }
+
+    return app
+
+
+class MockClockifyServer:
+    """Runs the mock app under uvicorn in a daemon thread."""
+
+    def __init__(self, port: int = 8765, **app_kwargs):
+        self.port = port
+        self.app = create_app(**app_kwargs)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def api_base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    @property
+    def reports_base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/reports/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self.app.state.requests
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
@@ -0,0 +1,386 @@
+# benchmarks/model_tiering_bench.py
+"""
+Per-node model configurations compared on the same recorded conversations.
+
+Each configuration is a value of LLM_NODE_MODELS (settings.llm_node_models):
+model, temperature, max_output_tokens and streaming per workflow node, over
+the LLM_MODEL / LLM_TEMPERATURE / ... defaults. For every configuration the
+app is run under uvicorn (mock Clockify, generated feedback workbook, memory
+session store, LLM response cache off) and every recorded conversation is
+replayed over the HTTP API, one user message per turn, as recorded.
+
+Reported per configuration, with the change from the first one:
+  - latency of each workflow node (node.* spans), turn duration and time to
+    the first streamed text
+  - input and output tokens per node (the usage tracker) and per model
+  - token cost, from --prices (USD per 1M input / output tokens per model)
+
+Conversations come from --conversations, a JSON list of
+{"designation_id", "project", "start_date", "end_date", "messages": [...]}.
+--record ID [ID ...] writes such a file from stored conversations (their
+user messages; needs the session store they are in). Without a file, the
+scripted answers of workflow_bench are replayed for every designation.
+
+By default the configurations call Gemini (GOOGLE_API_KEY); with --offline
+every model is benchmarks/fake_chat_model's ScriptedChatModel with the
+latency of its OFFLINE_PROFILES entry, which checks the harness and shows
+the shape of a comparison without any provider calls.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.model_tiering_bench --offline
+    python -m benchmarks.model_tiering_bench --configs tiers.json --conversations recorded.json
+    python -m benchmarks.model_tiering_bench --record <conversation id> ... --conversations recorded.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "true",
+    "TRACING_EXPORT_PATH": "",
+    "LOG_SAMPLE_RATE": "0",
+    "LLM_CACHE_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from benchmarks.fake_chat_model import ScriptedChatModel
+from benchmarks.feedback_parse_bench import build_workbook
+from benchmarks.mock_clockify import MockClockifyServer
+from benchmarks.workflow_bench import (RESULTS_DIR, USER_ANSWERS, AppraisalScript, SpanCollector, commit,
+                                       completed_outcomes, free_port, node_latencies, stats, stream_turn)
+
+NODES = {
+    "project_intake": "agents.project_intake",
+    "context_builder": "agents.context_builder",
+    "evaluation": "agents.evaluation_agent",
+}
+# Configurations compared when no --configs file is given
+DEFAULT_CONFIGS = {
+    "flash": {},
+    "tiered": {
+        "project_intake": {"model": "gemini-2.5-flash-lite"},
+        "context_builder": {"model": "gemini-2.5-flash-lite", "temperature": 0, "streaming": False},
+    },
+    "flash-lite": {node: {"model": "gemini-2.5-flash-lite"} for node in NODES},
+}
+# USD per 1M input / output tokens (Gemini API list prices, text, standard tier); override with --prices
+DEFAULT_PRICES = {
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40},
+}
+# --offline: first token latency and seconds per output token of each model's stand-in
+OFFLINE_PROFILES = {
+    "gemini-2.5-pro": {"first_token_latency": 1.2, "token_delay": 0.006},
+    "gemini-2.5-flash": {"first_token_latency": 0.5, "token_delay": 0.003},
+    "gemini-2.5-flash-lite": {"first_token_latency": 0.25, "token_delay": 0.0015},
+}
+
+
+class TokenMeter:
+    """Tokens and calls per model, counted where the provider's responses come in."""
+
+    def __init__(self):
+        self.models: Dict[str, Dict[str, int]] = {}
+
+    def add(self, model: str, usage):
+        if not usage:
+            return
+        totals = self.models.setdefault(model, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+        totals["calls"] += 1
+        totals["input_tokens"] += usage.get("input_tokens", 0)
+        totals["output_tokens"] += usage.get("output_tokens", 0)
+
+
+meter = TokenMeter()
+
+
+class MeteredGemini(ChatGoogleGenerativeAI):
+    async def _agenerate(self, *args, **kwargs):
+        result = await super()._agenerate(*args, **kwargs)
+        meter.add(self.model, result.generations[0].message.usage_metadata)
+        return result
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            meter.add(self.model, chunk.message.usage_metadata)
+            yield chunk
+
+
+class OfflineModel(ScriptedChatModel):
+    model: str
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model}
+
+    async def _agenerate(self, *args, **kwargs):
+        result = await super()._agenerate(*args, **kwargs)
+        meter.add(self.model, result.generations[0].message.usage_metadata)
+        return result
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            meter.add(self.model, chunk.message.usage_metadata)
+            yield chunk
+
+
+def offline_provider(script: AppraisalScript):
+    """Builds an OfflineModel where llm.build_llm builds ChatGoogleGenerativeAI."""
+    def build(model: str, **kwargs):
+        profile = OFFLINE_PROFILES.get(model, OFFLINE_PROFILES["gemini-2.5-flash"])
+        return OfflineModel(responder=script, model=model, tokens_per_chunk=4, **profile)
+    return build
+
+
+def scripted_conversations() -> List[Dict[str, Any]]:
+    from store import available_designations, available_outcomes
+
+    conversations = []
+    for name, outcomes in available_outcomes.items():
+        designation = next(d for d in available_designations if d.name == name)
+        # Two intake answers, then per outcome two contribution answers, the rating permission and the confirmation
+        answers = USER_ANSWERS[:2] + USER_ANSWERS[3:] * len(outcomes)
+        conversations.append({
+            "designation_id": designation.id,
+            "project": {"id": "project-1", "name": "Project 1"},
+            "start_date": "2025-06-01T00:00:00.000Z",
+            "end_date": "2025-12-31T23:59:59.000Z",
+            "messages": ["Hi"] + answers,
+        })
+    return conversations
+
+
+async def record(conversation_ids: List[str]) -> List[Dict[str, Any]]:
+    import session_store
+
+    conversations = []
+    for conversation_id in conversation_ids:
+        session = await session_store.load_session(conversation_id)
+        conversation = session.get("conversation")
+        if not conversation:
+            raise SystemExit(f"conversation {conversation_id} not found")
+        conversations.append({
+            "designation_id": conversation["designation_id"],
+            "project": conversation["project"],
+            "start_date": conversation["start_date"],
+            "end_date": conversation["end_date"],
+            "messages": [m["content"] for m in session.get("messages", []) if m.get("role") == "user"],
+        })
+    return conversations
+
+
+def cost(models: Dict[str, Dict[str, int]], prices: Dict[str, Dict[str, float]]) -> float:
+    total = 0.0
+    for model, tokens in models.items():
+        if model not in prices:
+            print(f"warning: no price for {model}, counted as free")
+            continue
+        total += (tokens["input_tokens"] * prices[model]["input"] + tokens["output_tokens"] * prices[model]["output"]) / 1e6
+    return total
+
+
+async def replay(http: httpx.AsyncClient, conversation: Dict[str, Any], feedback_path: str, collector: SpanCollector) -> Dict[str, Any]:
+    from store import available_outcomes, available_designations
+
+    designation = next(d for d in available_designations if d.id == conversation["designation_id"])
+    response = await http.post("/api/conversations", json={
+        "designation_id": conversation["designation_id"],
+        "project": conversation["project"],
+        "start_date": conversation["start_date"],
+        "end_date": conversation["end_date"],
+        "feedback_document_path": feedback_path,
+    })
+    response.raise_for_status()
+    conversation_id = response.json()["id"]
+    outcomes = len(available_outcomes.get(designation.name, []))
+
+    turns = []
+    for content in conversation["messages"]:
+        turn = await stream_turn(http, conversation_id, content)
+        turns.append({"seconds": turn["seconds"], "first_message": turn["first_message"]})
+    return {
+        "designation": designation.name,
+        "turns": turns,
+        "completed_outcomes": await completed_outcomes(conversation_id),
+        "outcomes": outcomes,
+    }
+
+
+async def run_config(name: str, node_models: Dict[str, Any], conversations, http, feedback_path: str,
+                     collector: SpanCollector, prices, verbose: bool) -> Dict[str, Any]:
+    import llm
+    from llm_usage import usage_tracker
+    from settings import settings
+
+    # Fresh clients, built from this configuration, for every node
+    settings.llm_node_models = node_models
+    llm._models.clear()
+    for node, module in NODES.items():
+        importlib.import_module(module).llm = llm.get_llm(node)
+    usage_tracker._totals.clear()
+    meter.models.clear()
+    first_span = len(collector.spans)
+
+    runs = []
+    output = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for conversation in conversations:
+            runs.append(await replay(http, conversation, feedback_path, collector))
+
+    turns = [turn for run in runs for turn in run["turns"]]
+    usage = usage_tracker.get_stats()["nodes"]
+    total_cost = cost(meter.models, prices)
+    return {
+        "name": name,
+        "llm_node_models": node_models,
+        "nodes_config": {node: llm.model_config(node) for node in NODES},
+        "nodes": node_latencies(collector.spans[first_span:]),
+        "turn_seconds": stats([t["seconds"] for t in turns], digits=4),
+        "first_message_seconds": stats([t["first_message"] for t in turns if t["first_message"] is not None], digits=4),
+        "usage": {node: {k: totals[k] for k in ("calls", "input_tokens", "output_tokens")} for node, totals in usage.items()},
+        "models": dict(meter.models),
+        "cost_usd": round(total_cost, 6),
+        "cost_usd_per_conversation": round(total_cost / len(runs), 6) if runs else 0.0,
+        "conversations": [{k: run[k] for k in ("designation", "completed_outcomes", "outcomes")} | {"turn_count": len(run["turns"])}
+                          for run in runs],
+    }
+
+
+def print_config(result: Dict[str, Any], baseline: Dict[str, Any]):
+    def change(after, before):
+        return f"{(after - before) / before * 100:+6.1f}%" if before and result is not baseline else ""
+
+    print(f"\n{result['name']}: " + ", ".join(f"{node}={config['model']}/t{config['temperature']}"
+                                             f"{'' if config['streaming'] else '/no-stream'}"
+                                             f"{'/max' + str(config['max_output_tokens']) if config['max_output_tokens'] else ''}"
+                                             for node, config in result["nodes_config"].items()))
+    for node, timing in result["nodes"].items():
+        before = baseline["nodes"].get(node, {}).get("mean")
+        print(f"  node {node:<16} mean={timing['mean']:>8.1f}ms p95={timing['p95']:>8.1f}ms {change(timing['mean'], before)}")
+    turn, first = result["turn_seconds"].get("mean", 0), result["first_message_seconds"].get("mean", 0)
+    print(f"  turn                  mean={turn * 1000:>8.1f}ms           {change(turn, baseline['turn_seconds'].get('mean', 0))}")
+    print(f"  first text            mean={first * 1000:>8.1f}ms           {change(first, baseline['first_message_seconds'].get('mean', 0))}")
+    for node, usage in result["usage"].items():
+        print(f"  tokens {node:<18} calls={usage['calls']:<4} input={usage['input_tokens']:>8} output={usage['output_tokens']:>7}")
+    for model, tokens in result["models"].items():
+        print(f"  model {model:<23} calls={tokens['calls']:<4} input={tokens['input_tokens']:>8} output={tokens['output_tokens']:>7}")
+    print(f"  cost                  ${result['cost_usd']:.4f} (${result['cost_usd_per_conversation']:.4f}/conversation) "
+          f"{change(result['cost_usd'], baseline['cost_usd'])}")
+    for conversation in result["conversations"]:
+        if conversation["completed_outcomes"] < conversation["outcomes"]:
+            print(f"  note: {conversation['designation']} ended with {conversation['completed_outcomes']} of "
+                  f"{conversation['outcomes']} outcomes after its {conversation['turn_count']} recorded turns")
+
+
+async def run(args, configs: Dict[str, Dict[str, Any]], conversations, prices) -> List[Dict[str, Any]]:
+    import uvicorn
+
+    import llm
+    import main
+    import tracing
+    from settings import settings
+
+    settings.tracing_enabled = True
+    collector = SpanCollector()
+    tracing._exporter = collector
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            feedback_path = os.path.join(tmp, "feedback.xlsx")
+            build_workbook(feedback_path, rows=60, sheets=2)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as http:
+                for name, node_models in configs.items():
+                    print(f"running {name} over {len(conversations)} conversation(s)...")
+                    results.append(await run_config(name, node_models, conversations, http, feedback_path,
+                                                    collector, prices, args.verbose))
+    finally:
+        server.should_exit = True
+        await serving
+        llm._models.clear()
+    return results
+
+
+def load_json(path: str, default):
+    if not path:
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(args) -> int:
+    if args.record:
+        if not args.conversations:
+            raise SystemExit("--record needs --conversations, the file to write")
+        conversations = asyncio.run(record(args.record))
+        with open(args.conversations, "w", encoding="utf-8") as f:
+            json.dump(conversations, f, indent=2)
+        print(f"{len(conversations)} conversation(s) written to {args.conversations}")
+        return 0
+
+    configs = load_json(args.configs, DEFAULT_CONFIGS)
+    prices = {**DEFAULT_PRICES, **load_json(args.prices, {})}
+    conversations = load_json(args.conversations, None) or scripted_conversations()
+
+    import llm
+    llm.ChatGoogleGenerativeAI = offline_provider(AppraisalScript(2, 2)) if args.offline else MeteredGemini
+
+    with MockClockifyServer(port=free_port(), entries_per_report=args.entries, latency_seconds=args.clockify_latency) as clockify:
+        from settings import settings
+        settings.clockify_api_base_url = clockify.api_base_url
+        settings.clockify_reports_base_url = clockify.reports_base_url
+        results = asyncio.run(run(args, configs, conversations, prices))
+
+    for result in results:
+        print_config(result, results[0])
+
+    out = args.out or os.path.join(RESULTS_DIR, f"model_tiering_bench-{commit()['commit']}{'-offline' if args.offline else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            **commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "offline": args.offline,
+            "conversations": len(conversations),
+            "prices": prices,
+            "configs": results,
+        }, f, indent=2)
+    print(f"\nresults written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default=None, help="JSON object: configuration name -> LLM_NODE_MODELS value")
+    parser.add_argument("--conversations", default=None, help="recorded conversations JSON (written by --record)")
+    parser.add_argument("--record", nargs="+", default=None, metavar="ID", help="record these stored conversations and exit")
+    parser.add_argument("--prices", default=None, help="JSON object: model -> {input, output} USD per 1M tokens")
+    parser.add_argument("--offline", action="store_true", help="scripted stand-in models instead of Gemini")
+    parser.add_argument("--entries", type=int, default=500, help="Clockify entries per report")
+    parser.add_argument("--clockify-latency", type=float, default=0.02)
+    parser.add_argument("--out", default=None, help="results JSON path")
+    parser.add_argument("--verbose", action="store_true", help="show the app's output")
+    sys.exit(main(parser.parse_args()))
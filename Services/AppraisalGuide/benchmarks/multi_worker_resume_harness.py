@@ -0,0 +1,171 @@
+# benchmarks/multi_worker_resume_harness.py
+"""
+Multi-worker resume harness.
+
+Starts --workers app processes on their own ports, sharing one Redis (a
+fakeredis TCP server unless --redis-url is given), each with the slow
+counting model of abandoned_client_harness as the evaluation LLM. Then:
+
+1. streams a turn from worker 0 and drops the connection after the first
+   streamed text,
+2. while disconnected, sends a different message to worker 1 (must be
+   rejected with 409: the conversation is leased by worker 0),
+3. after --gap seconds resumes on the last worker with
+   GET .../stream?last_event_id=<last event received>,
+4. replays the whole turn from the last worker without last_event_id.
+
+Checks that the resumed stream completes, that the text received before the
+drop plus the resumed text equals the full replay (nothing lost or repeated),
+and that event ids only increase. Exits non-zero when a check fails.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.multi_worker_resume_harness --workers 2 --gap 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "redis",
+    "TRACING_ENABLED": "false",
+    "LOG_SAMPLE_RATE": "0",
+    "STREAM_RESUME_GRACE_SECONDS": "5",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+
+from benchmarks.abandoned_client_harness import CountingStreamModel, new_conversation
+
+CONVERSATION_ID = "multi-worker"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(args):
+    """Worker process: the app with the counting model."""
+    import uvicorn
+    import agents.evaluation_agent as evaluation_agent
+    import main
+    evaluation_agent.llm = CountingStreamModel(first_token_latency=args.first_token_latency, char_delay=args.char_delay)
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def start_workers(count: int, args):
+    ports = [free_port() for _ in range(count)]
+    workers = [subprocess.Popen([sys.executable, "-m", "benchmarks.multi_worker_resume_harness", "--serve", "--port", str(port),
+                                 "--first-token-latency", str(args.first_token_latency), "--char-delay", str(args.char_delay)])
+               for port in ports]
+    for port in ports:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/designations", timeout=1)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"worker on port {port} did not start")
+                time.sleep(0.2)
+    return workers, [f"http://127.0.0.1:{port}" for port in ports]
+
+
+async def read_stream(response: httpx.Response, stop_after_text: bool = False):
+    """Events of an SSE response; with stop_after_text, returns after the first message event."""
+    events = []
+    async for line in response.aiter_lines():
+        if not line.startswith("data: "):
+            continue
+        events.append(json.loads(line[6:]))
+        if events[-1]["type"] == "complete" or (stop_after_text and events[-1]["type"] == "message"):
+            break
+    return events
+
+
+def text(events) -> str:
+    return "".join(event["data"] for event in events if event["type"] == "message")
+
+
+async def scenario(urls, gap: float):
+    path = f"/api/conversations/{CONVERSATION_ID}/messages/stream"
+    async with httpx.AsyncClient(timeout=60) as http:
+        async with http.stream("POST", urls[0] + path, json={"content": "Let's start"}) as response:
+            before_drop = await read_stream(response, stop_after_text=True)
+
+        other = await http.post(urls[1 % len(urls)] + path, json={"content": "Something else"})
+        await asyncio.sleep(gap)
+
+        started = time.perf_counter()
+        async with http.stream("GET", urls[-1] + path, params={"last_event_id": before_drop[-1]["event_id"]}) as response:
+            resumed = await read_stream(response)
+        resume_seconds = time.perf_counter() - started
+
+        async with http.stream("GET", urls[-1] + path) as response:
+            replay = await read_stream(response)
+    return before_drop, other.status_code, resumed, resume_seconds, replay
+
+
+def main(args) -> int:
+    fake_server = None
+    if args.redis_url is None:
+        from fakeredis import TcpFakeServer
+        port = free_port()
+        fake_server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+        threading.Thread(target=fake_server.serve_forever, daemon=True).start()
+        args.redis_url = f"redis://127.0.0.1:{port}/0"
+    os.environ["REDIS_URL"] = args.redis_url
+
+    asyncio.run(new_conversation(CONVERSATION_ID))
+    workers, urls = start_workers(args.workers, args)
+    try:
+        before_drop, other_status, resumed, resume_seconds, replay = asyncio.run(scenario(urls, args.gap))
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+        if fake_server is not None:
+            fake_server.shutdown()
+
+    ids = [event["event_id"] for event in before_drop + resumed if "event_id" in event]
+    id_keys = [tuple(int(part) for part in event_id.split("-")) for event_id in ids]
+    print(f"workers={args.workers} redis={args.redis_url} gap={args.gap}s")
+    print(f"  events before the drop     {len(before_drop)} (worker 0)")
+    print(f"  different message status   {other_status}")
+    print(f"  events after resuming      {len(resumed)} (worker {args.workers - 1}), read to the end in {resume_seconds:.2f}s")
+    print(f"  events in the full replay  {len(replay)}")
+
+    checks = {
+        "resumed stream completed": bool(resumed) and resumed[-1]["type"] == "complete",
+        "different message rejected with 409": other_status == 409,
+        "no text lost or repeated": text(before_drop) + text(resumed) == text(replay) != "",
+        "event ids only increase": id_keys == sorted(set(id_keys)),
+    }
+    for check, ok in checks.items():
+        print(f"  {'ok  ' if ok else 'FAIL'} {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--redis-url", default=None, help="a Redis to share; a fakeredis TCP server by default")
+    parser.add_argument("--gap", type=float, default=1.0, help="seconds disconnected before resuming")
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--char-delay", type=float, default=0.003, help="seconds per streamed character")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    sys.exit(serve(parsed) if parsed.serve else main(parsed))
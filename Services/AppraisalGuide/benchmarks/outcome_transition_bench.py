@@ -0,0 +1,138 @@
+# benchmarks/outcome_transition_bench.py
+"""
+Wait at an outcome boundary, with and without speculative opening questions.
+
+A "Senior Project Engineer" conversation is driven through the compiled
+workflow (in-memory session backend) with a fake model that takes
+--first-token-latency seconds to start and then generates at a fixed delay
+per character. Turn 1 opens the first outcome; after --think-time
+seconds the employee's answer closes it, and the workflow moves on to the
+second outcome in the same turn. Measured is the time from sending that
+answer until the first streamed text of the second outcome's opening question.
+
+Without speculation this is two sequential generations (the completion
+summary, then the next opening question); with it the opening question was
+generated in the background during the think time.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.outcome_transition_bench --first-token-latency 0.8 --char-delay 0.002 --think-time 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, List, Optional
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DESIGNATION = "Senior Project Engineer"
+OPENING = json.dumps({
+    "status": "question",
+    "phase": "contribution",
+    "question": "Could you walk me through how you kept stakeholders informed about the status of your modules?",
+}, indent=2)
+COMPLETE = json.dumps({
+    "status": "complete",
+    "final_rating": "MA",
+    "summary": "I owned the delivery of the reporting modules this cycle and kept them on schedule. " * 6,
+}, indent=2)
+
+
+class TransitionModel(BaseChatModel):
+    """Answers an outcome's opening turn with a question and anything else with a completion."""
+    first_token_latency: float = 0.8
+    char_delay: float = 0.002
+
+    @property
+    def _llm_type(self) -> str:
+        return "transition-fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        return OPENING if str(messages[-1].content).startswith("Start evaluation for outcome") else COMPLETE
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        reply = self._reply(messages)
+        await asyncio.sleep(self.first_token_latency + len(reply) * self.char_delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_latency)
+        for c in self._reply(messages):
+            await asyncio.sleep(self.char_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=c))
+
+
+async def run_turn(workflow, conversation_id: str, content: str, second_outcome: str) -> Optional[float]:
+    started = time.perf_counter()
+    first_text: List[Any] = []
+
+    async def stream_callback(chunk):
+        if chunk["type"] == "message" and second_outcome in chunk.get("current_step", "") and not first_text:
+            first_text.append(time.perf_counter() - started)
+
+    await workflow.ainvoke(
+        {"messages": [{"role": "user", "content": content, "created_at": "", "message_type": ""}]},
+        config={"configurable": {"thread_id": conversation_id, "stream_callback": stream_callback}},
+    )
+    return first_text[0] if first_text else None
+
+
+async def measure(speculative: bool, run: int, args) -> float:
+    import session_store
+    from settings import settings
+    from state import INITIAL_STATE
+    from store import available_outcomes
+    from workflow import workflow
+
+    settings.speculative_opening_questions = speculative
+    conversation_id = f"bench-{'speculative' if speculative else 'sequential'}-{run}"
+    await session_store.save_session(conversation_id, {
+        **INITIAL_STATE,
+        "conversation": {"id": conversation_id},
+        "designation": DESIGNATION,
+        "current_step": "evaluation",
+        "context_builder_data": {"project_summary": f"A reporting platform ({run})", "user_role": "Module owner"},
+    })
+    second_outcome = available_outcomes[DESIGNATION][1]["outcome"]
+
+    await run_turn(workflow, conversation_id, "Let's start", second_outcome)
+    await asyncio.sleep(args.think_time)
+    elapsed = await run_turn(workflow, conversation_id, "Yes, that rating works for me", second_outcome)
+    assert elapsed is not None, "the second outcome was not reached"
+    return elapsed
+
+
+async def main(args):
+    import agents.evaluation_agent as evaluation_agent
+    evaluation_agent.llm = TransitionModel(first_token_latency=args.first_token_latency, char_delay=args.char_delay)
+
+    print(f"first_token_latency={args.first_token_latency}s char_delay={args.char_delay}s think_time={args.think_time}s runs={args.runs}")
+    print(f"{'mode':<12} {'first text of next outcome (mean)':>34}")
+    for speculative in (False, True):
+        timings = [await measure(speculative, run, args) for run in range(args.runs)]
+        print(f"{'speculative' if speculative else 'sequential':<12} {sum(timings) / len(timings) * 1000:>32.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-latency", type=float, default=0.8, help="seconds before the first character")
+    parser.add_argument("--char-delay", type=float, default=0.002, help="seconds per generated character")
+    parser.add_argument("--think-time", type=float, default=2.0, help="seconds between the two turns")
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+# benchmarks/session_codec_bench.py
+"""
+Session codec microbenchmark.
+
+Builds a realistic 50-turn appraisal session (intake, the context-builder
+metadata message with its JSON-in-string payload, and evaluation turns with
+long LLM outputs) and, for every codec/compression combination, measures the
+time to encode and decode it the way RedisSessionBackend stores it (one value
+per state field and one per message) and the total bytes stored.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.session_codec_bench --turns 50 --repeat 20
+"""
+import argparse
+import datetime
+import json
+import time
+import uuid
+
+from session_codec import SessionCodec, _available, _CODEC_FACTORIES, _COMPRESSION_FACTORIES
+from state import INITIAL_STATE
+
+ANSWER = ("I led the migration of our reporting module to an event-driven design, "
+          "wrote integration tests for the new consumers and paired with two juniors on reviews. ")
+QUESTION = ("Thanks for sharing that. Could you describe how you ensured the module was delivered "
+            "on time, and what you did when requirements changed mid-sprint? ")
+
+
+def message(role, content, section, message_type=""):
+    return {
+        "id": str(uuid.uuid4()),
+        "role": role,
+        "content": content,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "conversation_id": "bench-conversation",
+        "message_section": section,
+        "message_type": message_type,
+    }
+
+
+def build_session(turns: int) -> dict:
+    context = {
+        "development_activities": [f"Implemented feature {i} with unit tests" for i in range(60)],
+        "feedback_summary": "Consistently delivers high quality work. " * 30,
+        "project_summary": "A multi-tenant reporting platform. " * 5,
+        "user_role": ["Module owner", "Reviewer"],
+        "technologies": ["Python", "FastAPI", "Redis", "React"],
+        "designation": "Senior Project Engineer",
+    }
+    messages = []
+    for turn in range(turns):
+        section = "project_intake" if turn < 5 else "evaluation Deliver high-quality, impactful modules to customers on time"
+        messages.append(message("user", ANSWER * (1 + turn % 3), section))
+        messages.append(message("assistant", QUESTION * (1 + turn % 4), section))
+        if turn == 5:
+            messages.append(message("assistant", json.dumps(context, indent=4), "context_builder", "metadata"))
+    return {
+        **INITIAL_STATE,
+        "messages": messages,
+        "context_builder_data": context,
+        "project_context": {"status": "complete", "project_context": {"summary": context["project_summary"]}},
+        "clockify_data": {"descriptions": ", ".join(f"Worked on ticket ABC-{i} refactoring" for i in range(800))},
+        "current_step": "evaluation",
+        "designation": "Senior Project Engineer",
+    }
+
+
+def values_of(session: dict):
+    return [v for k, v in session.items() if k != "messages"] + session["messages"]
+
+
+def main(args):
+    session = build_session(args.turns)
+    values = values_of(session)
+    legacy_bytes = len(json.dumps(session).encode("utf-8"))
+    print(f"{args.turns}-turn session, {len(session['messages'])} messages, legacy single-JSON blob {legacy_bytes} bytes")
+    print(f"{'codec':<8} {'compression':<11} {'bytes':>9} {'ratio':>6} {'encode':>10} {'decode':>10}")
+
+    for codec in _CODEC_FACTORIES:
+        if not _available(_CODEC_FACTORIES[codec]):
+            print(f"{codec:<8} (not installed)")
+            continue
+        for compression in ["none", *_COMPRESSION_FACTORIES]:
+            if compression != "none" and not _available(_COMPRESSION_FACTORIES[compression]):
+                print(f"{codec:<8} {compression:<11} (not installed)")
+                continue
+            session_codec = SessionCodec(codec, compression, args.threshold)
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                encoded = [session_codec.encode(v) for v in values]
+            encode_ms = (time.perf_counter() - started) / args.repeat * 1000
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                decoded = [session_codec.decode(e) for e in encoded]
+            decode_ms = (time.perf_counter() - started) / args.repeat * 1000
+            assert decoded == values
+            stored = sum(len(e) for e in encoded)
+            print(f"{codec:<8} {compression:<11} {stored:>9} {stored / legacy_bytes:>6.2f} "
+                  f"{encode_ms:>8.3f}ms {decode_ms:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threshold", type=int, default=1024, help="compression threshold in bytes")
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+# benchmarks/session_load_bench.py
+"""
+Session-store load test: N concurrent simulated SSE conversations.
+
+Each simulated conversation does what one chat_stream turn does to the
+session store: load the session, append the user message and save, stream a
+reply token by token, then append the assistant message and save again.
+While they run, a ticker measures how late the event loop wakes it up, which
+is what every other open SSE stream would experience.
+
+Backends: "memory" (InMemorySessionBackend), "fakeredis" (in-process fake of
+the async Redis client) or "redis" (a real server at --redis-url).
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.session_load_bench --conversations 500 --backend fakeredis
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+import redis.asyncio as redis
+import session_store
+from session_backends import InMemorySessionBackend, RedisSessionBackend
+
+
+def build_backend(args):
+    if args.backend == "memory":
+        return InMemorySessionBackend()
+    if args.backend == "fakeredis":
+        import fakeredis
+        return RedisSessionBackend(fakeredis.FakeAsyncRedis(
+            decode_responses=False,
+            connection_pool_class=redis.BlockingConnectionPool,
+            max_connections=args.pool_size,
+        ))
+    pool = redis.BlockingConnectionPool.from_url(args.redis_url, max_connections=args.pool_size, decode_responses=True)
+    return RedisSessionBackend(redis.Redis(connection_pool=pool))
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.005):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def conversation(i: int, turns: int, tokens: int, token_delay: float):
+    conversation_id = f"bench-{i}"
+    for turn in range(turns):
+        session = await session_store.load_session(conversation_id)
+        session["messages"].append({"role": "user", "content": f"Answer {turn} " * 20, "message_section": "intake"})
+        await session_store.save_session(conversation_id, session)
+
+        reply = []
+        for t in range(tokens):
+            await asyncio.sleep(token_delay)
+            reply.append(f"token{t} ")
+
+        session["messages"].append({"role": "assistant", "content": "".join(reply), "message_section": "intake"})
+        session["current_step"] = "intake"
+        await session_store.save_session(conversation_id, session)
+
+
+async def main(args):
+    session_store.set_backend(build_backend(args))
+    samples: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lag(stop, samples))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        conversation(i, args.turns, args.tokens, args.token_delay) for i in range(args.conversations)
+    ))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+    await session_store.get_backend().close()
+
+    samples.sort()
+    print(f"backend={args.backend} conversations={args.conversations} turns={args.turns} tokens/turn={args.tokens}")
+    print(f"wall={wall:.2f}s session_ops={args.conversations * args.turns * 3} "
+          f"loop_lag p50={statistics.median(samples) * 1000:.2f}ms "
+          f"p99={samples[int(len(samples) * 0.99) - 1] * 1000:.2f}ms max={samples[-1] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--backend", choices=["memory", "fakeredis", "redis"], default="fakeredis")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--pool-size", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
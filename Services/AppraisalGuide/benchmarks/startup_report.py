@@ -0,0 +1,135 @@
+# benchmarks/startup_report.py
+"""
+Cold start report: what importing the app costs, and how long a new worker
+takes to serve and to be ready.
+
+1. Imports: runs `python -X importtime -c "import main"` (and, for what the
+   warm-up then loads, the workflow and agent modules on top) in a fresh
+   interpreter and reports the total, the slowest modules by cumulative
+   time, and self time per top-level package.
+2. Serving: starts the app under uvicorn in a subprocess (mock Clockify,
+   the memory session store or --redis-url) and polls /api/health/ready,
+   reporting the time until the server answers at all, until it reports
+   ready, and each warm-up step's duration.
+
+Usage (from Services/AppraisalGuide):
+    python -m benchmarks.startup_report
+    python -m benchmarks.startup_report --redis-url redis://localhost:6379/0 --top 30
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.mock_clockify import MockClockifyServer
+from benchmarks.workflow_bench import free_port
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+WARMED_MODULES = ("workflow", "agents.project_intake", "agents.context_builder", "agents.evaluation_agent")
+
+
+def app_env(**overrides) -> Dict[str, str]:
+    env = dict(os.environ)
+    for name, value in {
+        "CLOCKIFY_API_KEY": "bench",
+        "CLOCKIFY_WORKSPACE_ID": "bench",
+        "CLOCKIFY_USER_ID": "bench",
+        "GOOGLE_API_KEY": "bench",
+        "SESSION_BACKEND": "memory",
+        "TRACING_ENABLED": "false",
+    }.items():
+        env.setdefault(name, value)
+    env.update(overrides)
+    return env
+
+
+def import_times(statement: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) for every module the statement imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=APP_DIR, env=app_env(),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return modules
+
+
+def print_imports(title: str, modules: List[Tuple[str, int, int, int]], top: int):
+    total = sum(self_us for _, self_us, _, _ in modules)
+    print(f"\n{title}: {total / 1e6:.2f}s, {len(modules)} modules")
+    print("  slowest by cumulative time:")
+    for name, _, cumulative, depth in sorted(modules, key=lambda m: -m[2])[:top]:
+        print(f"    {cumulative / 1000:>8.1f}ms  {'  ' * min(depth, 6)}{name}")
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        by_package[name.split(".", 1)[0]] += self_us
+    print("  self time by top-level package:")
+    for package, self_us in sorted(by_package.items(), key=lambda p: -p[1])[:top]:
+        print(f"    {self_us / 1000:>8.1f}ms  {package}")
+
+
+def serve(args, clockify: MockClockifyServer) -> int:
+    port = free_port()
+    overrides = {"CLOCKIFY_API_BASE_URL": clockify.api_base_url, "CLOCKIFY_REPORTS_BASE_URL": clockify.reports_base_url}
+    overrides.update({"SESSION_BACKEND": "redis", "REDIS_URL": args.redis_url} if args.redis_url else {"SESSION_BACKEND": "memory"})
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=APP_DIR, env=app_env(**overrides), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    answering = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as http:
+            while time.perf_counter() - started < args.timeout:
+                if server.poll() is not None:
+                    raise SystemExit(f"the server exited:\n{server.stderr.read()[-2000:]}")
+                try:
+                    response = http.get("/api/health/ready")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if answering is None:
+                    answering = time.perf_counter() - started
+                if response.status_code == 200:
+                    ready = time.perf_counter() - started
+                    break
+                time.sleep(0.01)
+            else:
+                print(f"\nnot ready within {args.timeout}s: {response.json()}")
+                return 1
+    finally:
+        server.terminate()
+        server.wait()
+
+    status = response.json()
+    print(f"\nserving ({'redis' if args.redis_url else 'memory'} session store)")
+    print(f"  process start -> first response   {answering:>7.2f}s")
+    print(f"  process start -> ready            {ready:>7.2f}s (warm-up {status['seconds']}s)")
+    for name, step in status["steps"].items():
+        error = f"  {step['error']}" if step["error"] else ""
+        print(f"    {name:<16} {step['status']:<8} {step['seconds']}s, {step['attempts']} attempt(s){error}")
+    return 0
+
+
+def main(args) -> int:
+    print_imports("import main", import_times("import main"), args.top)
+    print_imports("import main and what the warm-up loads",
+                  import_times("import main; " + "; ".join(f"import {module}" for module in WARMED_MODULES)), args.top)
+    with MockClockifyServer(port=free_port(), entries_per_report=10, latency_seconds=0.01) as clockify:
+        return serve(args, clockify)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="rows per listing")
+    parser.add_argument("--redis-url", default=None, help="run the server against this Redis")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for readiness")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,522 @@
+# benchmarks/workflow_bench.py
+"""
+Full-workflow benchmark, offline.
+
+Runs the app under uvicorn with ScriptedChatModel (benchmarks/fake_chat_model)
+in place of Gemini, the mock Clockify server and fakeredis (or --redis-url),
+and for every designation in store.available_outcomes drives a conversation
+over the HTTP API from intake through context building to the last outcome's
+evaluation. The script replies like the model would: --intake-questions
+intake questions, then the project context, then per outcome
+--contribution-questions questions, the rating permission and proposal, and
+the summary. With --no-prefetch the context builder goes through its tool
+calls instead of prefetched inputs.
+
+Reported per designation and overall:
+  - latency of each workflow node (from the node.* spans)
+  - per turn: duration, time to the first streamed text, SSE events and
+    events per second, bytes written to the session (state and checkpoint
+    writes) and to the stream event log
+
+Results are written as JSON (--out, by default results/workflow_bench-<commit>.json
+under this directory); --compare prints the change from an earlier result,
+e.g. one taken at another commit.
+
+Usage (from Services/AppraisalGuide; fakeredis is in the dev dependency group, `uv sync`):
+    python -m benchmarks.workflow_bench --token-delay 0.005
+    python -m benchmarks.workflow_bench --compare benchmarks/results/workflow_bench-<commit>.json
+
+The tests (tests/, same group) run with `uv run pytest`.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import importlib
+import io
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+for name, value in {
+    "CLOCKIFY_API_KEY": "bench",
+    "CLOCKIFY_WORKSPACE_ID": "bench",
+    "CLOCKIFY_USER_ID": "bench",
+    "GOOGLE_API_KEY": "bench",
+    "SESSION_BACKEND": "redis",
+    "TRACING_ENABLED": "true",
+    "LOG_SAMPLE_RATE": "0",
+    "LLM_CACHE_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from benchmarks.fake_chat_model import ScriptedChatModel
+from benchmarks.feedback_parse_bench import build_workbook
+from benchmarks.mock_clockify import MockClockifyServer
+from session_backends import RedisSessionBackend
+from session_codec import SessionCodec
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+NODE_SPANS = ("node.intake", "node.context_builder", "node.evaluation")
+OPENING = "Start evaluation for outcome"
+SUMMARY_MESSAGE = "Summary of our earlier conversation"
+
+INTAKE_QUESTIONS = [
+    "Thanks! At a high level, what kind of product or system did the project build?",
+    "What were your main responsibilities on the project?",
+    "Which technical areas or technologies did you work with most?",
+]
+CONTRIBUTION_QUESTIONS = [
+    "Could you share an example of a feature or module you delivered for this outcome and the impact it had?",
+    "How did you make sure your work was of high quality and delivered on time?",
+    "How did you keep your stakeholders informed about progress and risks?",
+]
+USER_ANSWERS = [
+    "I worked on a reporting platform that lets customers export and schedule reports.",
+    "I owned the export module end to end, from design and implementation to code reviews and releases.",
+    "Mostly REST APIs, a React front end, PostgreSQL and CI pipelines on Kubernetes.",
+    "I rebuilt the export pipeline so large reports finish in minutes instead of hours, which cut support tickets.",
+    "I wrote unit and integration tests for every change and planned the work in small, reviewable increments.",
+    "Yes, please suggest a rating.",
+    "Yes, that matches how I see it.",
+]
+
+
+class AppraisalScript:
+    """Replies of each agent's prompt, decided by the conversation so far; the same prompt always gets the same reply."""
+
+    def __init__(self, intake_questions: int, contribution_questions: int):
+        self.intake_questions = intake_questions
+        self.contribution_questions = contribution_questions
+
+    def __call__(self, messages, tool_names: List[str]):
+        prompt = str(messages[0].content)
+        if "You are an Intake Agent" in prompt:
+            return self.intake(messages)
+        if "You are a context building agent" in prompt:
+            return self.context(messages, tool_names)
+        if "Outcome Evaluation Agent" in prompt:
+            return self.evaluation(messages)
+        if "running summary" in prompt:
+            return self.summary(prompt)
+        raise ValueError(f"no scripted reply for the prompt {prompt[:80]!r}")
+
+    @staticmethod
+    def answers(messages) -> int:
+        """The employee's messages in the history, including those folded into a history summary."""
+        count = 0
+        for message in messages:
+            if not isinstance(message, HumanMessage):
+                continue
+            content = str(message.content)
+            if content.startswith(SUMMARY_MESSAGE):
+                match = re.search(r"Answers so far: (\d+)", content)
+                count += int(match.group(1)) if match else 0
+            elif not content.startswith(OPENING):
+                count += 1
+        return count
+
+    def intake(self, messages) -> str:
+        # The first message only starts the conversation
+        asked = self.answers(messages) - 1
+        if asked < self.intake_questions:
+            return INTAKE_QUESTIONS[asked % len(INTAKE_QUESTIONS)]
+        return json.dumps({"status": "complete", "project_context": {
+            "summary": "A reporting platform that lets customers export and schedule large reports.",
+            "responsibilities": ["Owned the export module", "Code reviews", "Release planning"],
+            "tech_stack": ["REST APIs", "React", "PostgreSQL", "Kubernetes"],
+        }}, indent=2)
+
+    def context(self, messages, tool_names: List[str]):
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        if tool_names and not tool_results:
+            args = dict(re.findall(r"- (\w+): (.*)", str(messages[-1].content)))
+            return AIMessage(content="", tool_calls=[
+                {"name": "get_clockify_work_descriptions", "id": "call-clockify",
+                 "args": {key: args.get(key, "") for key in ("project_id", "user_id", "rangeStart", "rangeEnd")}},
+                {"name": "get_feedback_summary", "id": "call-feedback", "args": {"file_path": args.get("file_path", "")}},
+            ])
+        if tool_results:
+            descriptions = str(tool_results[0].content)
+        else:
+            match = re.search(r"\(comma-separated\):\n(.*)", str(messages[-1].content))
+            descriptions = match.group(1) if match else ""
+        activities = [d for d in descriptions.split(", ") if d and not re.search(r"standup|meeting|planning", d, re.I)]
+        return json.dumps({
+            "development_activities": activities[:25],
+            "feedback_summary": "Consistently delivered modules on time with good test coverage and clear documentation. " * 4,
+            "project_summary": "A reporting platform that lets customers export and schedule large reports.",
+            "user_role": ["Owned the export module", "Code reviews"],
+            "technologies": ["REST APIs", "React", "PostgreSQL"],
+            "designation": "",
+        }, indent=2)
+
+    def evaluation(self, messages) -> str:
+        answered = self.answers(messages)
+        if answered < self.contribution_questions:
+            reply = {"status": "question", "phase": "contribution",
+                     "question": CONTRIBUTION_QUESTIONS[answered % len(CONTRIBUTION_QUESTIONS)]}
+        elif answered == self.contribution_questions:
+            reply = {"status": "question", "phase": "rating_permission",
+                     "question": "Would you like me to suggest a rating based on what you've shared so far?"}
+        elif answered == self.contribution_questions + 1:
+            reply = {"status": "rating_proposal", "rating": "MA",
+                     "rationale": "You delivered the export module on time with measurable impact and kept quality high through testing.",
+                     "question": "Does this rating align with how you view your contribution?"}
+        else:
+            reply = {"status": "complete", "final_rating": "MA",
+                     "summary": "I owned the export module of our reporting platform end to end. " * 6
+                                + "I kept my stakeholders informed and delivered every milestone on time."}
+        return json.dumps(reply, indent=2)
+
+    @staticmethod
+    def summary(prompt: str) -> str:
+        existing, _, new = prompt.partition("New messages:")
+        match = re.search(r"Answers so far: (\d+)", existing)
+        answered = (int(match.group(1)) if match else 0) + sum(
+            1 for line in new.splitlines() if line.startswith("user: ") and not line.startswith("user: " + OPENING))
+        return f"Answers so far: {answered}. The employee owns the export module and described its delivery and impact."
+
+
+_metering: contextvars.ContextVar = contextvars.ContextVar("metering", default=None)
+
+
+class MeteredCodec:
+    """Counts the bytes the backend encodes, by what they are written for."""
+
+    def __init__(self, codec: SessionCodec):
+        self.codec = codec
+        self.bytes_written: Dict[str, int] = defaultdict(int)
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.encode(value)
+        category = _metering.get()
+        if category:
+            self.bytes_written[category] += len(data)
+        return data
+
+    def decode(self, data):
+        return self.codec.decode(data)
+
+
+class MeteredRedisBackend(RedisSessionBackend):
+    async def _metered(self, category: str, write):
+        token = _metering.set(category)
+        try:
+            return await write
+        finally:
+            _metering.reset(token)
+
+    async def save_session(self, session_id, state):
+        return await self._metered("session", super().save_session(session_id, state))
+
+    async def save_checkpoint(self, *args, **kwargs):
+        return await self._metered("session", super().save_checkpoint(*args, **kwargs))
+
+    async def append_events(self, *args, **kwargs):
+        return await self._metered("event_log", super().append_events(*args, **kwargs))
+
+
+class SpanCollector:
+    """Takes the place of the tracing exporter and keeps finished spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def commit() -> Dict[str, Any]:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+        return {"commit": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": False}
+
+
+def stats(samples: List[float], scale: float = 1.0, digits: int = 2) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * scale, digits),
+        "p50": round(ordered[len(ordered) // 2] * scale, digits),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * scale, digits),
+        "max": round(ordered[-1] * scale, digits),
+    }
+
+
+def node_latencies(spans) -> Dict[str, Dict[str, float]]:
+    by_node = defaultdict(list)
+    for finished in spans:
+        if finished.name in NODE_SPANS:
+            by_node[finished.name.split(".", 1)[1]].append((finished.end_ns - finished.start_ns) / 1e9)
+    return {node: stats(samples, scale=1000) for node, samples in by_node.items()}
+
+
+async def stream_turn(http: httpx.AsyncClient, conversation_id: str, content: str) -> Dict[str, Any]:
+    events = []
+    first_message = None
+    started = time.perf_counter()
+    async with http.stream("POST", f"/api/conversations/{conversation_id}/messages/stream", json={"content": content}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            events.append(json.loads(line[6:]))
+            if first_message is None and events[-1]["type"] == "message":
+                first_message = time.perf_counter() - started
+            if events[-1]["type"] == "complete":
+                break
+    seconds = time.perf_counter() - started
+    return {"events": events, "seconds": seconds, "first_message": first_message}
+
+
+async def completed_outcomes(conversation_id: str) -> int:
+    import session_store
+    session = await session_store.load_session(conversation_id, include_messages=False)
+    return len(session.get("completed_outcomes", []))
+
+
+async def run_designation(http, designation, outcomes: int, feedback_path: str, codec: MeteredCodec,
+                          collector: SpanCollector, max_turns: int) -> Dict[str, Any]:
+    response = await http.post("/api/conversations", json={
+        "designation_id": designation.id,
+        "project": {"id": "project-1", "name": "Project 1"},
+        "start_date": "2025-06-01T00:00:00.000Z",
+        "end_date": "2025-12-31T23:59:59.000Z",
+        "feedback_document_path": feedback_path,
+    })
+    response.raise_for_status()
+    conversation_id = response.json()["id"]
+    first_span = len(collector.spans)
+
+    turns = []
+    completed = False
+    for number in range(max_turns):
+        content = "Hi" if number == 0 else USER_ANSWERS[(number - 1) % len(USER_ANSWERS)]
+        written = dict(codec.bytes_written)
+        turn_span = len(collector.spans)
+        turn = await stream_turn(http, conversation_id, content)
+        events = turn["events"]
+        turns.append({
+            "turn": number + 1,
+            "nodes": [s.name.split(".", 1)[1] for s in collector.spans[turn_span:] if s.name in NODE_SPANS],
+            "seconds": round(turn["seconds"], 4),
+            "first_message_seconds": round(turn["first_message"], 4) if turn["first_message"] is not None else None,
+            "events": len(events),
+            "events_per_second": round(len(events) / turn["seconds"], 1),
+            "session_bytes": codec.bytes_written["session"] - written.get("session", 0),
+            "event_log_bytes": codec.bytes_written["event_log"] - written.get("event_log", 0),
+        })
+        if await completed_outcomes(conversation_id) >= outcomes:
+            completed = True
+            break
+
+    events = sum(t["events"] for t in turns)
+    stream_seconds = sum(t["seconds"] for t in turns)
+    return {
+        "designation": designation.name,
+        "outcomes": outcomes,
+        "completed": completed,
+        "turn_count": len(turns),
+        "nodes": node_latencies(collector.spans[first_span:]),
+        "turn_seconds": stats([t["seconds"] for t in turns], digits=4),
+        "first_message_seconds": stats([t["first_message_seconds"] for t in turns if t["first_message_seconds"] is not None], digits=4),
+        "session_bytes_per_turn": stats([t["session_bytes"] for t in turns], digits=0),
+        "event_log_bytes_per_turn": stats([t["event_log_bytes"] for t in turns], digits=0),
+        "sse_events": events,
+        "sse_events_per_second": round(events / stream_seconds, 1) if stream_seconds else 0.0,
+        "turns": turns,
+    }
+
+
+def summarize(runs: List[Dict[str, Any]], spans) -> Dict[str, Any]:
+    turns = [turn for run in runs for turn in run["turns"]]
+    events = sum(t["events"] for t in turns)
+    stream_seconds = sum(t["seconds"] for t in turns)
+    return {
+        "nodes": node_latencies(spans),
+        "turn_seconds": stats([t["seconds"] for t in turns], digits=4),
+        "first_message_seconds": stats([t["first_message_seconds"] for t in turns if t["first_message_seconds"] is not None], digits=4),
+        "session_bytes_per_turn": stats([t["session_bytes"] for t in turns], digits=0),
+        "event_log_bytes_per_turn": stats([t["event_log_bytes"] for t in turns], digits=0),
+        "sse_events_per_second": round(events / stream_seconds, 1) if stream_seconds else 0.0,
+    }
+
+
+def print_result(name: str, result: Dict[str, Any]):
+    print(f"\n{name}")
+    for node, timing in result["nodes"].items():
+        print(f"  node {node:<16} n={timing['count']:<3} mean={timing['mean']:>8.1f}ms p95={timing['p95']:>8.1f}ms max={timing['max']:>8.1f}ms")
+    print(f"  turn                  mean={result['turn_seconds'].get('mean', 0) * 1000:>8.1f}ms "
+          f"first text mean={result['first_message_seconds'].get('mean', 0) * 1000:.1f}ms")
+    print(f"  session bytes/turn    mean={result['session_bytes_per_turn'].get('mean', 0):>8.0f}  max={result['session_bytes_per_turn'].get('max', 0):.0f}")
+    print(f"  event log bytes/turn  mean={result['event_log_bytes_per_turn'].get('mean', 0):>8.0f}  max={result['event_log_bytes_per_turn'].get('max', 0):.0f}")
+    print(f"  SSE events/s          {result['sse_events_per_second']}")
+
+
+def comparable(result: Dict[str, Any]) -> Dict[str, float]:
+    """The headline numbers of a result, flattened for comparing two results."""
+    summary = result["summary"]
+    metrics = {f"node {node} mean ms": timing["mean"] for node, timing in summary["nodes"].items()}
+    metrics.update({
+        "turn mean ms": summary["turn_seconds"].get("mean", 0) * 1000,
+        "first text mean ms": summary["first_message_seconds"].get("mean", 0) * 1000,
+        "session bytes/turn": summary["session_bytes_per_turn"].get("mean", 0),
+        "event log bytes/turn": summary["event_log_bytes_per_turn"].get("mean", 0),
+        "SSE events/s": summary["sse_events_per_second"],
+    })
+    return metrics
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]):
+    print(f"\nchange from {baseline['commit']}{' (dirty)' if baseline.get('dirty') else ''} "
+          f"to {current['commit']}{' (dirty)' if current.get('dirty') else ''}")
+    before, after = comparable(baseline), comparable(current)
+    for metric in after:
+        if metric not in before:
+            continue
+        change = f"{(after[metric] - before[metric]) / before[metric] * 100:+.1f}%" if before[metric] else "-"
+        print(f"  {metric:<28} {before[metric]:>12.1f} -> {after[metric]:>12.1f}  {change}")
+
+
+async def run(args, fake: ScriptedChatModel) -> Dict[str, Any]:
+    import uvicorn
+    import fakeredis
+    import redis.asyncio as redis
+
+    import main
+    import session_store
+    import tracing
+    from settings import settings
+    from store import available_designations, available_outcomes
+
+    for module in ("agents.project_intake", "agents.context_builder", "agents.evaluation_agent"):
+        importlib.import_module(module).llm = fake
+    settings.context_prefetch_enabled = not args.no_prefetch
+    settings.speculative_opening_questions = args.speculative
+    settings.tracing_enabled = True
+    collector = SpanCollector()
+    tracing._exporter = collector
+
+    client = redis.Redis.from_url(args.redis_url) if args.redis_url else fakeredis.FakeAsyncRedis()
+    codec = MeteredCodec(SessionCodec(codec=settings.session_codec, compression=settings.session_compression,
+                                      compression_threshold=settings.session_compression_threshold))
+    session_store.set_backend(MeteredRedisBackend(client, codec))
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            feedback_path = os.path.join(tmp, "feedback.xlsx")
+            build_workbook(feedback_path, rows=60, sheets=2)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as http:
+                for name, outcomes in available_outcomes.items():
+                    designation = next(d for d in available_designations if d.name == name)
+                    # The app prints every agent call; only the results are shown
+                    output = io.StringIO() if not args.verbose else sys.stdout
+                    with contextlib.redirect_stdout(output):
+                        runs.append(await run_designation(http, designation, len(outcomes), feedback_path, codec,
+                                                          collector, args.max_turns))
+    finally:
+        server.should_exit = True
+        await serving
+
+    return {
+        **commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "first_token_latency": args.first_token_latency,
+            "token_delay": args.token_delay,
+            "tokens_per_chunk": args.tokens_per_chunk,
+            "intake_questions": args.intake_questions,
+            "contribution_questions": args.contribution_questions,
+            "context_prefetch": not args.no_prefetch,
+            "speculative_opening_questions": args.speculative,
+            "session_codec": settings.session_codec,
+            "session_compression": settings.session_compression,
+            "redis": args.redis_url or "fakeredis",
+        },
+        "model_calls": fake.calls,
+        "summary": summarize(runs, collector.spans),
+        "designations": runs,
+    }
+
+
+def main(args) -> int:
+    with MockClockifyServer(port=free_port(), entries_per_report=args.entries, latency_seconds=args.clockify_latency) as clockify:
+        from settings import settings
+        settings.clockify_api_base_url = clockify.api_base_url
+        settings.clockify_reports_base_url = clockify.reports_base_url
+        fake = ScriptedChatModel(
+            responder=AppraisalScript(args.intake_questions, args.contribution_questions),
+            first_token_latency=args.first_token_latency,
+            token_delay=args.token_delay,
+            tokens_per_chunk=args.tokens_per_chunk,
+        )
+        result = asyncio.run(run(args, fake))
+
+    for run_result in result["designations"]:
+        state = "completed" if run_result["completed"] else f"NOT completed in {args.max_turns} turns"
+        print_result(f"{run_result['designation']}: {run_result['outcomes']} outcome(s), {run_result['turn_count']} turns, {state}",
+                     run_result)
+    print_result(f"all designations ({result['model_calls']} model calls)", result["summary"])
+
+    out = args.out or os.path.join(RESULTS_DIR, f"workflow_bench-{result['commit']}{'-dirty' if result['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+    return 0 if all(r["completed"] for r in result["designations"]) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.002, help="seconds per generated token")
+    parser.add_argument("--tokens-per-chunk", type=int, default=4, help="tokens per streamed chunk")
+    parser.add_argument("--intake-questions", type=int, default=2)
+    parser.add_argument("--contribution-questions", type=int, default=2)
+    parser.add_argument("--no-prefetch", action="store_true", help="context builder calls its tools instead")
+    parser.add_argument("--speculative", action="store_true", help="enable speculative opening questions")
+    parser.add_argument("--max-turns", type=int, default=40, help="per designation")
+    parser.add_argument("--entries", type=int, default=500, help="Clockify entries per report")
+    parser.add_argument("--clockify-latency", type=float, default=0.02)
+    parser.add_argument("--redis-url", default=None, help="a Redis to run against instead of fakeredis")
+    parser.add_argument("--out", default=None, help="results JSON path")
+    parser.add_argument("--compare", default=None, help="an earlier results JSON to compare with")
+    parser.add_argument("--verbose", action="store_true", help="show the app's output")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+# checkpointer.py
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    empty_checkpoint,
+    get_checkpoint_id,
+)
+
+import session_store
+from session_backends import MESSAGES_FIELD, SessionConflictError
+from state import AppState
+
+# Graph channels that are session fields. Other channels (LangGraph's own
+# "__start__" and "branch:to:<node>") are small and kept in the checkpoint record.
+STATE_FIELDS = frozenset(AppState.__annotations__)
+MAX_CACHED_HEADS = 1024
+
+
+class SessionCheckpointSaver(BaseCheckpointSaver[int]):
+    """
+    LangGraph checkpointer that stores the graph state in the conversation's
+    session, with thread_id = conversation id, so the session endpoints read
+    what the workflow wrote.
+
+    Each checkpoint writes only the channels updated in that superstep: the
+    changed state fields, and the messages appended since the previous
+    checkpoint (the messages channel is append-only). The rest of the record
+    (checkpoint id, channel versions, LangGraph's own channels and the stored
+    message count) is a small blob next to the session.
+
+    Writes are versioned: each one expects the session version of the
+    checkpoint it follows and fails with SessionConflictError if another
+    writer (e.g. a second worker running the same conversation) moved it on.
+
+    Only the latest checkpoint is kept, so there is no history to list or
+    time-travel through. Pending writes of a superstep are kept in memory;
+    they only matter for retrying a superstep that failed half way in this
+    process. A session created before checkpoints existed is read as a
+    checkpoint of its current fields.
+    """
+
+    def __init__(self, serde=None, max_cached_heads: int = MAX_CACHED_HEADS):
+        super().__init__(serde=serde)
+        # Latest (record, session version) per thread, so a put knows how many messages
+        # are stored and which version it follows
+        self._heads: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._max_cached_heads = max_cached_heads
+        # thread_id -> (checkpoint_id, [(task_id, channel, value)])
+        self._writes: Dict[str, Tuple[str, List[Tuple[str, str, Any]]]] = {}
+
+    def _encode(self, record: Dict[str, Any]) -> bytes:
+        type_, data = self.serde.dumps_typed(record)
+        return type_.encode() + b"\n" + data
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        type_, data = raw.split(b"\n", 1)
+        return self.serde.loads_typed((type_.decode(), data))
+
+    def _remember(self, thread_id: str, record: Dict[str, Any], version: int):
+        self._heads[thread_id] = (record, version)
+        self._heads.move_to_end(thread_id)
+        while len(self._heads) > self._max_cached_heads:
+            self._heads.popitem(last=False)
+
+    async def _head(self, thread_id: str) -> Tuple[Dict[str, Any], int]:
+        if thread_id not in self._heads:
+            raw, version = await session_store.load_checkpoint(thread_id)
+            if raw is not None:
+                self._remember(thread_id, self._decode(raw), version)
+            else:
+                state = await session_store.load_session(thread_id)
+                self._remember(thread_id, self._record_for_session(state), version)
+        return self._heads[thread_id]
+
+    @staticmethod
+    def _record_for_session(state: Dict[str, Any]) -> Dict[str, Any]:
+        checkpoint = empty_checkpoint()
+        return {
+            "v": checkpoint["v"],
+            "id": checkpoint["id"],
+            "ts": checkpoint["ts"],
+            "channel_versions": {field: 1 for field in state if field in STATE_FIELDS},
+            "versions_seen": {},
+            "updated_channels": None,
+            "channels": {},
+            "messages": len(state.get(MESSAGES_FIELD, [])),
+            "metadata": {"source": "input", "step": -1, "parents": {}},
+            "parent_id": None,
+        }
+
+    @staticmethod
+    def _config(thread_id: str, checkpoint_id: str) -> RunnableConfig:
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": checkpoint_id}}
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        state = await session_store.load_session(thread_id)
+        raw, version = await session_store.load_checkpoint(thread_id)
+        record = self._decode(raw) if raw is not None else self._record_for_session(state)
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id != record["id"]:
+            return None
+        self._remember(thread_id, record, version)
+
+        channel_versions = dict(record["channel_versions"])
+        channel_values = dict(record["channels"])
+        for field, value in state.items():
+            if field in STATE_FIELDS:
+                channel_values[field] = value
+                channel_versions.setdefault(field, 1)
+        checkpoint: Checkpoint = {
+            "v": record["v"],
+            "id": record["id"],
+            "ts": record["ts"],
+            "channel_values": channel_values,
+            "channel_versions": channel_versions,
+            "versions_seen": record["versions_seen"],
+            "updated_channels": record["updated_channels"],
+        }
+        writes_id, writes = self._writes.get(thread_id, ("", []))
+        return CheckpointTuple(
+            config=self._config(thread_id, record["id"]),
+            checkpoint=checkpoint,
+            metadata=record["metadata"],
+            parent_config=self._config(thread_id, record["parent_id"]) if record["parent_id"] else None,
+            pending_writes=list(writes) if writes_id == record["id"] else [],
+        )
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        if config is None:
+            return
+        latest = await self.aget_tuple(config)
+        if latest is not None:
+            yield latest
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        head, version = await self._head(thread_id)
+        values = checkpoint["channel_values"]
+
+        fields = {channel: values[channel] for channel in new_versions
+                  if channel in STATE_FIELDS and channel != MESSAGES_FIELD and channel in values}
+        stored_messages = head["messages"]
+        messages = values.get(MESSAGES_FIELD, [])
+        replace_messages = len(messages) < stored_messages
+        new_messages = messages if replace_messages else messages[stored_messages:]
+
+        record = {
+            "v": checkpoint["v"],
+            "id": checkpoint["id"],
+            "ts": checkpoint["ts"],
+            "channel_versions": checkpoint["channel_versions"],
+            "versions_seen": checkpoint["versions_seen"],
+            "updated_channels": checkpoint.get("updated_channels"),
+            "channels": {channel: value for channel, value in values.items() if channel not in STATE_FIELDS},
+            "messages": len(messages),
+            "metadata": {"source": metadata.get("source"), "step": metadata.get("step"), "parents": metadata.get("parents", {})},
+            "parent_id": config["configurable"].get("checkpoint_id"),
+        }
+        try:
+            version = await session_store.save_checkpoint(thread_id, fields, new_messages, self._encode(record),
+                                                          version, replace_messages)
+        except SessionConflictError:
+            # Reload on the next read instead of building on a stale head
+            self._heads.pop(thread_id, None)
+            raise
+        self._remember(thread_id, record, version)
+        self._writes.pop(thread_id, None)
+        return self._config(thread_id, checkpoint["id"])
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        writes_id, pending = self._writes.get(thread_id, ("", []))
+        if writes_id != checkpoint_id:
+            pending = []
+            self._writes[thread_id] = (checkpoint_id, pending)
+        pending.extend((task_id, channel, value) for channel, value in writes)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        # The state itself is the session; only the in-process bookkeeping is dropped
+        self._heads.pop(thread_id, None)
+        self._writes.pop(thread_id, None)
+
+
+checkpointer = SessionCheckpointSaver()
@@ -0,0 +1,79 @@
+# context_prefetch.py
+import asyncio
+from typing import Any, Dict
+
+import session_store
+from tools.clockify_tools import get_all_descriptions
+from tools.feedback_doc_reader import aparse_feedback_excel
+from tracing import span
+
+# Prefetches still running in this process, keyed by conversation id.
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+async def fetch_context_inputs(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fetch the Clockify descriptions and the feedback document concurrently.
+
+    Everything the context builder's tools would be called with is already in
+    the conversation, so there is no need to wait for the model to ask for it.
+    Returns the state fields the context builder reads its inputs from.
+    """
+    descriptions, feedback = await asyncio.gather(
+        get_all_descriptions(
+            conversation.get("project_id", ""),
+            conversation.get("clockify_user_id", ""),
+            conversation.get("start_date", ""),
+            conversation.get("end_date", ""),
+        ),
+        aparse_feedback_excel(conversation.get("feedback_document_path", "")),
+    )
+    return {
+        "clockify_data": {"descriptions": descriptions},
+        "feedback_data": {"content": feedback},
+    }
+
+
+async def _prefetch(conversation_id: str, conversation: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        with span("context_prefetch", {"conversation.id": conversation_id}):
+            inputs = await fetch_context_inputs(conversation)
+            # Both tools return "" on failure; leave those out so they are fetched again later.
+            session = await session_store.load_session(conversation_id, include_messages=False)
+            if inputs["clockify_data"]["descriptions"]:
+                session["clockify_data"] = inputs["clockify_data"]
+            if inputs["feedback_data"]["content"]:
+                session["feedback_data"] = inputs["feedback_data"]
+            await session_store.save_session(conversation_id, session)
+            return inputs
+    finally:
+        _inflight.pop(conversation_id, None)
+
+
+def start_prefetch(conversation: Dict[str, Any]):
+    """Start fetching the context-builder inputs for a new conversation in the background."""
+    conversation_id = conversation["id"]
+    if conversation_id not in _inflight:
+        _inflight[conversation_id] = asyncio.create_task(_prefetch(conversation_id, conversation))
+
+
+async def get_context_inputs(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the prefetched context-builder inputs for this conversation.
+
+    Uses what is already in the session, waits for a prefetch still running in
+    this process, and only fetches inline when neither is available
+    (e.g. the prefetch failed or ran in another worker).
+    """
+    if state.get("clockify_data", {}).get("descriptions") and state.get("feedback_data", {}).get("content"):
+        return {"clockify_data": state["clockify_data"], "feedback_data": state["feedback_data"]}
+
+    conversation = state.get("conversation", {})
+    task = _inflight.get(conversation.get("id", ""))
+    if task is not None:
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            print(f"Context prefetch failed, fetching again: {str(e)}")
+
+    return await fetch_context_inputs(conversation)
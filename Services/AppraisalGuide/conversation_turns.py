@@ -0,0 +1,315 @@
+# conversation_turns.py
+import asyncio
+import hashlib
+import os
+import secrets
+import socket
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import session_store
+from session_backends import event_id_key
+from settings import settings
+from stream_events import EventQueue
+
+# Lease owners are unique per turn, prefixed with the worker that runs it
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Workflow events only the server needs: they become stored messages, which the client
+# refetches once the turn completes
+SERVER_EVENT_TYPES = ("full_text", "metadata")
+# First event in every turn's log, with the turn's owner as data; not sent to clients
+TURN_EVENT = "turn"
+START_OF_LOG = "0-0"
+
+
+def content_digest(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+class ConversationTurn:
+    """
+    One workflow run for a user message, publishing its events to the
+    conversation's event log in the session store, where any worker's
+    responses follow them (see follow_events).
+
+    A turn holds the conversation's lease while it runs, renewing it every
+    third of `conversation_lease_seconds`, so no other worker starts a second
+    run of the same conversation; the owner string ends with a digest of the
+    message, so a duplicate request on any worker can tell it is the same one.
+
+    The run does not depend on any one HTTP response: it is cancelled when no
+    response has followed it for `stream_resume_grace_seconds` (so a client
+    can reconnect and resume), or when the lease is lost. Message chunks are
+    appended at most once per `stream_event_flush_seconds`, merged; the
+    `complete` event is held back until the run, including its last
+    checkpoint write, is over.
+    """
+
+    def __init__(self, conversation_id: str, content: str):
+        self.conversation_id = conversation_id
+        self.owner = f"{WORKER_ID}:{secrets.token_hex(4)}:{content_digest(content)}"
+        self.task: Optional[asyncio.Task] = None
+        # Not yet appended; the first append of a turn starts a new log with the turn event
+        self._pending: List[Dict[str, Any]] = [{"type": TURN_EVENT, "data": self.owner}]
+        self._reset_log = True
+        self._complete: Optional[Dict[str, Any]] = None
+        self._flush_lock = asyncio.Lock()
+        self._flushed_at = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def publish(self, event: Dict[str, Any]):
+        if event["type"] in SERVER_EVENT_TYPES:
+            return
+        if event["type"] == "complete":
+            self._complete = event
+            return
+        tail = self._pending[-1] if self._pending else None
+        if (event["type"] == "message" and tail and tail["type"] == "message"
+                and tail.get("current_step") == event.get("current_step")):
+            self._pending[-1] = {**tail, "data": tail["data"] + event["data"]}
+        else:
+            self._pending.append(event)
+
+        wait = self._flushed_at + settings.stream_event_flush_seconds - time.monotonic()
+        if event["type"] != "message" or wait <= 0:
+            await self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        try:
+            await self._flush()
+        except Exception as e:
+            print(f"Appending events of conversation {self.conversation_id} failed: {e}")
+
+    async def _flush(self):
+        async with self._flush_lock:
+            events, self._pending = self._pending, []
+            if not events:
+                return
+            reset, self._reset_log = self._reset_log, False
+            await session_store.append_events(self.conversation_id, events, reset=reset)
+            self._flushed_at = time.monotonic()
+
+    def start(self, run: Callable[[Callable[[Dict[str, Any]], Awaitable[None]]], Awaitable[Any]]):
+        """Run `run(stream_callback)` under the lease; the caller must have acquired it."""
+        self.task = asyncio.create_task(self._run(run))
+        self.task.add_done_callback(self._log_failure)
+
+    def _log_failure(self, task: asyncio.Task):
+        # Nothing awaits the task; retrieve its exception so it is reported here, once
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Turn of conversation {self.conversation_id} failed: {task.exception()!r}")
+
+    async def _run(self, run):
+        workflow_task = asyncio.create_task(run(self.publish))
+        renew_at = time.monotonic() + settings.conversation_lease_seconds / 3
+        try:
+            while True:
+                done, _ = await asyncio.wait({workflow_task}, timeout=settings.stream_disconnect_poll_seconds)
+                if done:
+                    if not workflow_task.cancelled() and workflow_task.exception():
+                        print(f"Workflow failed for conversation {self.conversation_id}: {workflow_task.exception()}")
+                    return None if workflow_task.cancelled() or workflow_task.exception() else workflow_task.result()
+                if time.monotonic() >= renew_at:
+                    if not await session_store.renew_lease(self.conversation_id, self.owner, settings.conversation_lease_seconds):
+                        print(f"Lost the lease of conversation {self.conversation_id}, cancelling its workflow")
+                        return None
+                    renew_at = time.monotonic() + settings.conversation_lease_seconds / 3
+                if not await session_store.has_followers(self.conversation_id):
+                    print(f"No response followed conversation {self.conversation_id} for "
+                          f"{settings.stream_resume_grace_seconds:.0f}s, cancelling its workflow")
+                    return None
+        finally:
+            try:
+                if not workflow_task.done():
+                    workflow_task.cancel()
+                    await asyncio.wait({workflow_task})
+                if self._flush_task is not None:
+                    self._flush_task.cancel()
+                    self._flush_task = None
+                # Also when the workflow failed or was cancelled, so followers stop waiting
+                self._pending.append(self._complete or {"type": "complete", "data": ""})
+                try:
+                    await self._flush()
+                except Exception as e:
+                    print(f"Appending the last events of conversation {self.conversation_id} failed: {e}")
+            finally:
+                try:
+                    await session_store.release_lease(self.conversation_id, self.owner)
+                except Exception as e:
+                    # The lease then runs out after conversation_lease_seconds
+                    print(f"Releasing the lease of conversation {self.conversation_id} failed: {e}")
+
+
+async def join_or_start_turn(conversation_id: str, content: str) -> Tuple[Optional[str], Optional[ConversationTurn]]:
+    """
+    The owner of the turn whose events answer this message, and the new turn
+    when the caller must start it. A duplicate of the message a turn is
+    running for, on any worker, gets that turn's owner and no turn to start.
+    Returns (None, None) when the conversation is busy with another message.
+    """
+    turn = ConversationTurn(conversation_id, content)
+    if await session_store.acquire_lease(conversation_id, turn.owner, settings.conversation_lease_seconds):
+        # Followed from the start, before the caller's response gets to mark it
+        await session_store.touch_followers(conversation_id)
+        return turn.owner, turn
+    owner = await session_store.lease_owner(conversation_id)
+    if owner is not None and owner.rsplit(":", 1)[-1] == content_digest(content):
+        return owner, None
+    return None, None
+
+
+class _Subscription:
+    def __init__(self, conversation_id: str, after: str):
+        self.conversation_id = conversation_id
+        self.after = after
+        self.queue = EventQueue(settings.stream_queue_max_events)
+
+
+class EventLogReader:
+    """
+    Fans the event logs of the conversations this worker's responses follow
+    out to them. A single task reads all of them with one blocking read, so
+    the worker holds one store connection for any number of followers.
+
+    Each subscription gets the events after its own position. A subscription
+    whose queue is full is dropped (its queue closed) rather than holding up
+    the others; its follower catches up from the log and subscribes again.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[_Subscription]] = {}
+        # Read position per conversation: at or before every subscription's position
+        self._cursors: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, conversation_id: str, after: str) -> _Subscription:
+        subscription = _Subscription(conversation_id, after)
+        self._subscriptions.setdefault(conversation_id, set()).add(subscription)
+        cursor = self._cursors.get(conversation_id)
+        if cursor is None or event_id_key(after) < event_id_key(cursor):
+            self._cursors[conversation_id] = after
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._read_loop())
+        return subscription
+
+    def unsubscribe(self, subscription: _Subscription):
+        subscriptions = self._subscriptions.get(subscription.conversation_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.conversation_id]
+            del self._cursors[subscription.conversation_id]
+
+    async def _read_loop(self):
+        while self._cursors:
+            cursors = dict(self._cursors)
+            try:
+                batches = await session_store.read_events(cursors, settings.stream_event_read_block_seconds)
+            except Exception as e:
+                print(f"Reading conversation event logs failed: {e}")
+                await asyncio.sleep(settings.stream_event_read_block_seconds)
+                continue
+            for conversation_id, entries in batches.items():
+                # Unless a new subscription moved it back meanwhile
+                if self._cursors.get(conversation_id) == cursors[conversation_id]:
+                    self._cursors[conversation_id] = entries[-1][0]
+                for subscription in list(self._subscriptions.get(conversation_id, ())):
+                    self._deliver(subscription, entries)
+
+    def _deliver(self, subscription: _Subscription, entries: List[Tuple[str, Dict[str, Any]]]):
+        after = event_id_key(subscription.after)
+        for event_id, event in entries:
+            if event_id_key(event_id) <= after:
+                continue
+            if not subscription.queue.offer({**event, "event_id": event_id}):
+                self.unsubscribe(subscription)
+                subscription.queue.close()
+                return
+            subscription.after = event_id
+
+
+_reader: Optional[EventLogReader] = None
+
+
+def get_event_log_reader() -> EventLogReader:
+    global _reader
+    if _reader is None:
+        _reader = EventLogReader()
+    return _reader
+
+
+async def follow_events(conversation_id: str, last_event_id: Optional[str] = None,
+                        turn_owner: Optional[str] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Client events of the conversation's log after `last_event_id` (from the
+    start of the log when None), replayed and then live, each with its
+    `event_id`. With `turn_owner`, events before that turn's start (left from
+    the previous turn) are skipped.
+
+    Yields None after each `stream_disconnect_poll_seconds` without events,
+    so the caller can check on its client. Ends after the `complete` event,
+    or, when no turn holds the conversation's lease any more, once the log
+    has nothing left. While iterated, the conversation is marked followed.
+    """
+    after = last_event_id or START_OF_LOG
+    in_turn = turn_owner is None
+    touched_at = 0.0
+    reader = get_event_log_reader()
+
+    def visible(event: Dict[str, Any]) -> bool:
+        nonlocal in_turn
+        if event["type"] == TURN_EVENT:
+            in_turn = in_turn or event["data"] == turn_owner
+            return False
+        return in_turn
+
+    while True:
+        # Catch up from the log, then follow it live through the worker's reader
+        while True:
+            entries = (await session_store.read_events({conversation_id: after})).get(conversation_id, [])
+            for event_id, event in entries:
+                after = event_id
+                if visible(event):
+                    yield {**event, "event_id": event_id}
+                    if event["type"] == "complete":
+                        return
+            if len(entries) < settings.stream_event_read_count:
+                break
+
+        turn_over = False
+        subscription = reader.subscribe(conversation_id, after)
+        try:
+            while True:
+                now = time.monotonic()
+                if now - touched_at >= settings.stream_disconnect_poll_seconds:
+                    touched_at = now
+                    await session_store.touch_followers(conversation_id)
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.stream_disconnect_poll_seconds)
+                except asyncio.TimeoutError:
+                    if await session_store.lease_owner(conversation_id) is None:
+                        turn_over = True
+                        break
+                    yield None
+                    continue
+                if event is None:
+                    # Dropped for falling behind
+                    break
+                after = event["event_id"]
+                if visible(event):
+                    yield event
+                    if event["type"] == "complete":
+                        return
+        finally:
+            reader.unsubscribe(subscription)
+
+        if turn_over and not (await session_store.read_events({conversation_id: after})).get(conversation_id):
+            # No turn is running and the log has nothing left, e.g. its worker died
+            yield {"type": "complete", "data": ""}
+            return
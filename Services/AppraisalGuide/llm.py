@@ -1,8 +1,60 @@
 # llm.py
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0.3,
-    streaming=True
-)
+from llm_cache import CachedChatModel
+from llm_gateway import get_llm_gateway
+from settings import settings
+
+MODEL_CONFIG_KEYS = ("model", "temperature", "max_output_tokens", "streaming")
+
+# One client per distinct configuration, shared by the nodes that use it
+_models: Dict[Tuple[Any, ...], BaseChatModel] = {}
+
+
+def model_config(node: Optional[str] = None) -> Dict[str, Any]:
+    """The model settings of a workflow node: the defaults, with the node's overrides from settings.llm_node_models."""
+    config = {
+        "model": settings.llm_model,
+        "temperature": settings.llm_temperature,
+        "max_output_tokens": settings.llm_max_output_tokens,
+        "streaming": settings.llm_streaming,
+    }
+    overrides = settings.llm_node_models.get(node, {}) if node else {}
+    unknown = set(overrides) - set(MODEL_CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown model settings for node {node}: {', '.join(sorted(unknown))}")
+    config.update(overrides)
+    return config
+
+
+def build_llm(config: Dict[str, Any]) -> BaseChatModel:
+    model = ChatGoogleGenerativeAI(
+        model=config["model"],
+        temperature=config["temperature"],
+        max_output_tokens=config["max_output_tokens"],
+        streaming=config["streaming"],
+        # A single attempt per request; the gateway retries, with backoff and within the call's deadline
+        max_retries=1
+    )
+    # Concurrency limit, deadlines, retries and hedging for every call
+    model = get_llm_gateway().wrap(model)
+    if settings.llm_cache_enabled:
+        # Repeated prompts (context builder reruns, retried turns) are answered from the cache
+        model = CachedChatModel(model=model)
+    if not config["streaming"]:
+        # astream() then makes one call and yields the whole reply as a single chunk
+        model.disable_streaming = True
+    return model
+
+
+def get_llm(node: Optional[str] = None) -> BaseChatModel:
+    """The chat model of a workflow node (see model_config), built on first use."""
+    config = model_config(node)
+    key = tuple(config[name] for name in MODEL_CONFIG_KEYS)
+    if key not in _models:
+        print(f"LLM client for {node or 'default'}: {config}")
+        _models[key] = build_llm(config)
+    return _models[key]
@@ -0,0 +1,256 @@
+# llm_cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import redis
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from settings import settings
+from tracing import current_span
+
+CACHE_PREFIX = "llm_cache:"
+# Per-call keyword argument that skips the cache for that call (neither read nor written)
+BYPASS_KWARG = "bypass_cache"
+
+# A cached response: {"content": str | list, "tool_calls": [...], "chunks": [content, ...] or None}.
+# "chunks" is the content of each streamed chunk, so a streamed call is replayed as streamed.
+Entry = Dict[str, Any]
+
+
+def _normalize_text(text: str) -> str:
+    # Line endings and trailing whitespace never change what the model is asked
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+def _normalize_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return _normalize_text(content)
+    return [_normalize_text(part) if isinstance(part, str)
+            else {**part, "text": _normalize_text(part["text"])} if isinstance(part, dict) and isinstance(part.get("text"), str)
+            else part
+            for part in content]
+
+
+def _normalize_message(message: BaseMessage) -> Dict[str, Any]:
+    # Message ids, timestamps and response metadata are not part of the prompt
+    normalized = {"type": message.type, "content": _normalize_content(message.content)}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        normalized["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in message.tool_calls]
+    for field in ("tool_call_id", "name"):
+        if getattr(message, field, None):
+            normalized[field] = getattr(message, field)
+    return normalized
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+def cache_key(model_params: Dict[str, Any], messages: Sequence[BaseMessage], call_kwargs: Dict[str, Any],
+              stop: Optional[List[str]] = None) -> str:
+    """
+    Hash of what determines the response: the model settings (model, temperature, ...),
+    the normalized messages, and the call's keyword arguments, e.g. the bound tool
+    schemas or a provider context cache name.
+    """
+    payload = {
+        "model": model_params,
+        "messages": [_normalize_message(m) for m in messages],
+        "kwargs": call_kwargs,
+        "stop": stop,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=_jsonable).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache of LLM responses: an in-process LRU in front of a Redis
+    tier, both with a TTL. Without a Redis client only the LRU is used.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, redis_client=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._lru: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "lru_hits": 0, "redis_hits": 0, "stores": 0, "bypassed": 0}
+
+    async def get(self, key: str) -> Optional[Entry]:
+        cached = self._lru.get(key)
+        if cached is not None:
+            expires_at, entry = cached
+            if expires_at > time.monotonic():
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["lru_hits"] += 1
+                return entry
+            del self._lru[key]
+
+        raw = None
+        if self.redis_client is not None:
+            try:
+                raw = await self.redis_client.get(CACHE_PREFIX + key)
+            except redis.RedisError as e:
+                print(f"LLM cache read failed: {str(e)}")
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["redis_hits"] += 1
+        entry = json.loads(raw)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Entry):
+        self._lru[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def put(self, key: str, entry: Entry):
+        self._remember(key, entry)
+        self.stats["stores"] += 1
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.set(CACHE_PREFIX + key, json.dumps(entry), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            print(f"LLM cache write failed: {str(e)}")
+
+    async def clear(self):
+        self._lru.clear()
+        if self.redis_client is None:
+            return
+        try:
+            keys = [key async for key in self.redis_client.scan_iter(match=f"{CACHE_PREFIX}*", count=500)]
+            if keys:
+                await self.redis_client.delete(*keys)
+        except redis.RedisError as e:
+            print(f"LLM cache clear failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0, "lru_size": len(self._lru)}
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    global _cache
+    if _cache is None:
+        redis_client = None
+        if settings.session_backend == "redis":
+            from redis_client import redis_client
+        _cache = LLMResponseCache(
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            max_entries=settings.llm_cache_max_entries,
+            redis_client=redis_client,
+        )
+    return _cache
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that answers repeated prompts from LLMResponseCache.
+
+    Both `ainvoke` and `astream` go through the cache; a streamed response is
+    stored chunk by chunk and replayed the same way, so consumers (and the SSE
+    stream) see the same chunks as live. Cached responses carry no
+    usage_metadata, as they cost no tokens. Only complete responses are
+    stored. Pass `bypass_cache=True` to a call to skip the cache for it.
+    """
+
+    model: BaseChatModel
+    response_cache: Any = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def _cache(self) -> LLMResponseCache:
+        return self.response_cache or get_llm_response_cache()
+
+    def bind_tools(self, tools, **kwargs):
+        # The wrapped model formats the tool schemas; they are then bound to the wrapper
+        # so they reach it as call arguments, and become part of the cache key
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+
+    def _lookup_key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        if kwargs.pop(BYPASS_KWARG, False):
+            self._cache().stats["bypassed"] += 1
+            current_span().set_attribute("llm.cache", "bypass")
+            return None
+        return cache_key(self._identifying_params, messages, kwargs, stop)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("CachedChatModel is async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs) -> ChatResult:
+        key = self._lookup_key(messages, stop, kwargs)
+        entry = await self._cache().get(key) if key else None
+        if entry is not None:
+            current_span().set_attribute("llm.cache", "hit")
+            message = AIMessage(content=entry["content"], tool_calls=entry["tool_calls"], response_metadata={"llm_cache": "hit"})
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        if key:
+            current_span().set_attribute("llm.cache", "miss")
+        message = await self.model.ainvoke(messages, stop=stop, **kwargs)
+        if key and (message.content or message.tool_calls):
+            await self._cache().put(key, {"content": message.content, "tool_calls": message.tool_calls, "chunks": None})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._lookup_key(messages, stop, kwargs)
+        entry = await self._cache().get(key) if key else None
+        if entry is not None:
+            current_span().set_attribute("llm.cache", "hit")
+            chunks = [AIMessageChunk(content=content, response_metadata={"llm_cache": "hit"})
+                      for content in (entry["chunks"] if entry["chunks"] is not None else [entry["content"]])]
+            if entry["tool_calls"]:
+                chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call.get("id"), "index": i}
+                    for i, call in enumerate(entry["tool_calls"])
+                ]))
+            chunks[-1].chunk_position = "last"
+            for chunk in chunks:
+                yield ChatGenerationChunk(message=chunk)
+            return
+
+        if key:
+            current_span().set_attribute("llm.cache", "miss")
+        chunks = []
+        full: Optional[AIMessageChunk] = None
+        async for chunk in self.model.astream(messages, stop=stop, **kwargs):
+            chunks.append(chunk.content)
+            full = chunk if full is None else full + chunk
+            yield ChatGenerationChunk(message=chunk)
+        # Reached only when the stream completed, not when the consumer stopped early
+        if key and full is not None and (full.content or full.tool_calls):
+            await self._cache().put(key, {"content": full.content, "tool_calls": full.tool_calls,
+                                          "chunks": [c for c in chunks if c]})
+
+
+def unwrap(model: BaseChatModel) -> BaseChatModel:
+    """The provider model behind wrappers (CachedChatModel, GatewayChatModel), e.g. for provider-specific APIs."""
+    # Wrappers keep the model they wrap in `model`; a provider model's `model` is its name
+    while isinstance(getattr(model, "model", None), BaseChatModel):
+        model = model.model
+    return model
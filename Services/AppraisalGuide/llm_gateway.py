@@ -0,0 +1,327 @@
+# llm_gateway.py
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.exceptions import ModelRateLimitError
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from settings import settings
+from tracing import current_span
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+LATENCY_WINDOW = 500
+
+# First result of a stream that ended without a chunk
+_END = object()
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call did not finish (or a stream did not produce its next chunk) in time."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, provider 5xx, timeouts and connection failures; not bad requests."""
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError, ModelRateLimitError)):
+        return True
+    # google.genai APIError carries the HTTP status as `code`
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS_CODES
+
+
+class LatencyWindow:
+    """The last `size` latencies, for percentiles."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: "deque[float]" = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def summary(self) -> Dict[str, Any]:
+        if not self._samples:
+            return {"count": 0}
+        return {
+            "count": len(self._samples),
+            "mean_ms": round(sum(self._samples) / len(self._samples) * 1000, 1),
+            "p50_ms": round(self.quantile(0.5) * 1000, 1),
+            "p95_ms": round(self.quantile(0.95) * 1000, 1),
+        }
+
+
+class _Attempt:
+    """One request to the provider. It holds a concurrency slot until stopped."""
+
+    def __init__(self, slot: asyncio.Semaphore, reply: Optional[Awaitable] = None,
+                 stream: Optional[AsyncIterator[AIMessageChunk]] = None):
+        self._slot = slot
+        self.stream = stream
+        self.started = time.monotonic()
+        self.task = asyncio.create_task(self.next() if stream is not None else reply)
+
+    async def next(self):
+        try:
+            return await self.stream.__anext__()
+        except StopAsyncIteration:
+            return _END
+
+    async def stop(self):
+        """Cancel the request if it is still running and give its slot back."""
+        if self._slot is None:
+            return
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.wait([self.task])
+        if not self.task.cancelled():
+            self.task.exception()
+        if self.stream is not None:
+            await self.stream.aclose()
+        self._slot.release()
+        self._slot = None
+
+
+class LLMGateway:
+    """
+    Admission and timing policy for LLM requests, shared by every model it wraps.
+
+    A call waits for one of `max_concurrency` slots, then must finish within
+    `call_timeout` of being made, queueing and retries included. A stream
+    must produce its first chunk within `first_token_timeout` and every next
+    chunk within `stream_idle_timeout`, so a stuck request fails instead of
+    holding up the conversation. Retryable errors (see is_retryable) are
+    retried up to `max_retries` times with full-jitter exponential backoff,
+    as long as a stream has not produced anything yet.
+
+    With hedging, a call whose first result is later than the p95 of recent
+    calls of its kind gets a duplicate request, if a slot is free right away.
+    The first to answer is used and the other is cancelled.
+    """
+
+    def __init__(self, max_concurrency: int, call_timeout: float, first_token_timeout: float, stream_idle_timeout: float,
+                 max_retries: int, retry_base_delay: float, retry_max_delay: float,
+                 hedge_enabled: bool = False, hedge_min_samples: int = 20, hedge_min_delay: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.call_timeout = call_timeout
+        self.first_token_timeout = first_token_timeout
+        self.stream_idle_timeout = stream_idle_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.stats = {"calls": 0, "streams": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                      "timeouts": 0, "failures": 0}
+        self.queue_wait = LatencyWindow()
+        self.generation = LatencyWindow()
+        # Time to the reply of ainvoke calls and to the first chunk of streams; the hedging thresholds
+        self.first_result = {"invoke": LatencyWindow(), "stream": LatencyWindow()}
+
+    def wrap(self, model: BaseChatModel) -> "GatewayChatModel":
+        return GatewayChatModel(model=model, gateway=self)
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        window = self.first_result[kind]
+        if not self.hedge_enabled or len(window) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, window.quantile(0.95))
+
+    async def _acquire(self, deadline: float):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - started))
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise LLMTimeoutError("No LLM slot became free before the call's deadline")
+        waited = time.monotonic() - started
+        self.queue_wait.add(waited)
+        current_span().add_to_attribute("llm.queue_wait_ms", round(waited * 1000, 1))
+
+    async def _race(self, start: Callable[[], _Attempt], kind: str, first_timeout: float,
+                    deadline: float) -> Tuple[_Attempt, Any]:
+        """
+        Make a request and return it with its first result: the reply, or the first
+        chunk of a stream. With hedging a duplicate may race it; the loser is stopped.
+        """
+        await self._acquire(deadline)
+        started = time.monotonic()
+        limit = min(started + first_timeout, deadline)
+        attempts = [start()]
+        self.stats["attempts"] += 1
+        hedge_delay = self._hedge_delay(kind)
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                running = [a for a in attempts if not a.task.done()]
+                if not running:
+                    raise error
+                wake = limit if hedge_delay is None else min(limit, started + hedge_delay)
+                done, _ = await asyncio.wait([a.task for a in running], timeout=max(0.0, wake - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for attempt in attempts:
+                    if attempt.task not in done:
+                        continue
+                    if attempt.task.exception() is None:
+                        self.first_result[kind].add(time.monotonic() - started)
+                        if attempt is not attempts[0]:
+                            self.stats["hedge_wins"] += 1
+                        attempts.remove(attempt)
+                        return attempt, attempt.task.result()
+                    error = attempt.task.exception()
+                    await attempt.stop()
+                if done:
+                    continue
+                if time.monotonic() >= limit:
+                    self.stats["timeouts"] += 1
+                    raise LLMTimeoutError(f"No {'first token' if kind == 'stream' else 'reply'} from the LLM "
+                                          f"after {time.monotonic() - started:.1f}s")
+                if hedge_delay is not None:
+                    # One hedge per call, and only with a free slot: hedging must not add to a queue
+                    hedge_delay = None
+                    if not self._slots.locked():
+                        await self._slots.acquire()
+                        attempts.append(start())
+                        self.stats["attempts"] += 1
+                        self.stats["hedges"] += 1
+                        current_span().set_attribute("llm.hedged", True)
+        finally:
+            for attempt in attempts:
+                await attempt.stop()
+
+    async def _call(self, start: Callable[[], _Attempt], kind: str, first_timeout: float,
+                    deadline: float) -> Tuple[_Attempt, Any]:
+        retry = 0
+        while True:
+            try:
+                return await self._race(start, kind, first_timeout, deadline)
+            except Exception as e:
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** retry))
+                if retry >= self.max_retries or not is_retryable(e) or time.monotonic() + delay >= deadline:
+                    self.stats["failures"] += 1
+                    raise
+                retry += 1
+                self.stats["retries"] += 1
+                current_span().set_attribute("llm.retries", retry)
+                print(f"LLM call failed ({type(e).__name__}: {str(e)[:200]}), retry {retry} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def ainvoke(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                      **kwargs) -> BaseMessage:
+        self.stats["calls"] += 1
+        deadline = time.monotonic() + self.call_timeout
+        attempt, reply = await self._call(
+            lambda: _Attempt(self._slots, reply=model.ainvoke(messages, stop=stop, **kwargs)), "invoke",
+            self.call_timeout, deadline
+        )
+        self.generation.add(time.monotonic() - attempt.started)
+        await attempt.stop()
+        return reply
+
+    async def astream(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                      **kwargs) -> AsyncIterator[AIMessageChunk]:
+        self.stats["streams"] += 1
+        deadline = time.monotonic() + self.call_timeout
+        attempt, chunk = await self._call(
+            lambda: _Attempt(self._slots, stream=model.astream(messages, stop=stop, **kwargs)), "stream",
+            self.first_token_timeout, deadline
+        )
+        try:
+            while chunk is not _END:
+                yield chunk
+                timeout = min(self.stream_idle_timeout, deadline - time.monotonic())
+                try:
+                    chunk = await asyncio.wait_for(attempt.next(), timeout=max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    raise LLMTimeoutError(f"The LLM stream stalled for {timeout:.1f}s")
+        finally:
+            self.generation.add(time.monotonic() - attempt.started)
+            await attempt.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self.max_concurrency - self._slots._value,
+            "queued": len(self._slots._waiters or ()),
+            "max_concurrency": self.max_concurrency,
+            "queue_wait": self.queue_wait.summary(),
+            "generation": self.generation.summary(),
+            "first_reply": self.first_result["invoke"].summary(),
+            "first_token": self.first_result["stream"].summary(),
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(
+            max_concurrency=settings.llm_max_concurrency,
+            call_timeout=settings.llm_call_timeout_seconds,
+            first_token_timeout=settings.llm_first_token_timeout_seconds,
+            stream_idle_timeout=settings.llm_stream_idle_timeout_seconds,
+            max_retries=settings.llm_max_retries,
+            retry_base_delay=settings.llm_retry_base_delay_seconds,
+            retry_max_delay=settings.llm_retry_max_delay_seconds,
+            hedge_enabled=settings.llm_hedge_enabled,
+            hedge_min_samples=settings.llm_hedge_min_samples,
+            hedge_min_delay=settings.llm_hedge_min_delay_seconds,
+        )
+    return _gateway
+
+
+class GatewayChatModel(BaseChatModel):
+    """Chat model wrapper that sends every `ainvoke` and `astream` of `model` through an LLMGateway."""
+
+    model: BaseChatModel
+    gateway: Any = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def _gateway(self) -> LLMGateway:
+        return self.gateway or get_llm_gateway()
+
+    def bind_tools(self, tools, **kwargs):
+        # As CachedChatModel: the wrapped model formats the tool schemas, which reach it as call arguments
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("GatewayChatModel is async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs) -> ChatResult:
+        message = await self._gateway().ainvoke(self.model, messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        stream = self._gateway().astream(self.model, messages, stop=stop, **kwargs)
+        try:
+            async for chunk in stream:
+                yield ChatGenerationChunk(message=chunk)
+        finally:
+            await stream.aclose()
@@ -0,0 +1,70 @@
+# llm_usage.py
+from collections import deque
+from typing import Any, Dict, Optional
+
+from tracing import current_span, sampled_log
+
+RECENT_TURNS = 100
+
+
+class LLMUsageTracker:
+    """
+    Per-turn token and latency accounting for LLM calls, from the usage_metadata
+    of the response (summed over chunks for streamed calls). `cached_input_tokens`
+    are input tokens served from the provider's context cache (explicit or
+    implicit), i.e. the saved input. For streamed calls `first_token_seconds`
+    is the time until the first text reached the user.
+    """
+
+    def __init__(self, recent_turns: int = RECENT_TURNS):
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._recent = deque(maxlen=recent_turns)
+
+    def record(self, node: str, usage: Optional[Dict[str, Any]], latency_seconds: float, session_id: str = "",
+               prompt_cache: str = "", first_token_seconds: Optional[float] = None) -> Dict[str, Any]:
+        usage = usage or {}
+        turn = {
+            "node": node,
+            "session_id": session_id,
+            "prompt_cache": prompt_cache,
+            "input_tokens": usage.get("input_tokens", 0),
+            "cached_input_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "latency_seconds": round(latency_seconds, 4),
+            "first_token_seconds": round(first_token_seconds, 4) if first_token_seconds is not None else None,
+        }
+        self._recent.append(turn)
+        current_span().set_attributes({
+            "llm.input_tokens": turn["input_tokens"],
+            "llm.cached_input_tokens": turn["cached_input_tokens"],
+            "llm.output_tokens": turn["output_tokens"],
+            "llm.first_token_seconds": turn["first_token_seconds"],
+        })
+
+        totals = self._totals.setdefault(node, {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0,
+                                                "latency_seconds": 0.0, "streamed_calls": 0, "first_token_seconds": 0.0})
+        totals["calls"] += 1
+        for field in ("input_tokens", "cached_input_tokens", "output_tokens", "latency_seconds"):
+            totals[field] += turn[field]
+        if first_token_seconds is not None:
+            totals["streamed_calls"] += 1
+            totals["first_token_seconds"] += first_token_seconds
+
+        sampled_log("llm.usage", **turn)
+        return turn
+
+    def get_stats(self) -> Dict[str, Any]:
+        nodes = {}
+        for node, totals in self._totals.items():
+            nodes[node] = {
+                **totals,
+                "latency_seconds": round(totals["latency_seconds"], 4),
+                "avg_latency_seconds": round(totals["latency_seconds"] / totals["calls"], 4),
+                "first_token_seconds": round(totals["first_token_seconds"], 4),
+                "avg_first_token_seconds": round(totals["first_token_seconds"] / totals["streamed_calls"], 4) if totals["streamed_calls"] else None,
+                "cached_input_ratio": round(totals["cached_input_tokens"] / totals["input_tokens"], 4) if totals["input_tokens"] else 0.0,
+            }
+        return {"nodes": nodes, "recent_turns": list(self._recent)}
+
+
+usage_tracker = LLMUsageTracker()
@@ -3,23 +3,33 @@
 import base64
 import datetime
 import os
+import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from uuid import uuid4
 
-import requests
+import httpx
 import session_store
-from models import Conversation, CreateConversationRequest, Project, StreamingResponseChunk
+from models import Conversation, CreateConversationRequest, Project
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from store import available_designations
-import asyncio
 import json
 from fastapi.middleware.cors import CORSMiddleware
 
-from workflow import workflow
+from conversation_turns import follow_events, join_or_start_turn
+from session_backends import event_id_key
 from state import INITIAL_STATE
+from context_prefetch import start_prefetch
+from tools.clockify_cache import get_clockify_cache
+from tools.clockify_client import close_clockify_client, get_clockify_client
+from llm_usage import usage_tracker
+from prompt_cache import get_prompt_prefix_cache
+from opening_questions import get_opening_question_cache
+from tracing import end_span, sampled_log, shutdown_tracing, start_span, use_span
+from warmup import get_warmup
 
 load_dotenv()
 
@@ -27,7 +37,19 @@ from settings import settings
 
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup_enabled:
+        # In the background: the server answers (and reports not ready) while it runs
+        get_warmup().start()
+    yield
+    await get_warmup().stop()
+    await close_clockify_client()
+    await session_store.get_backend().close()
+    shutdown_tracing()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Simple in-memory session (can be replaced with Redis)
@@ -46,89 +69,103 @@ app.add_middleware(
 # print(os.getenv("GOOGLE_API_KEY"))
 
 
+def sse_events(request: Request, conversation_id: str, last_event_id: Optional[str] = None,
+               turn_owner: Optional[str] = None):
+    """
+    The conversation's events as SSE; see follow_events. Events with an event_id carry it in their
+    JSON and as the SSE id, so an EventSource sends it back as Last-Event-ID when it reconnects.
+    """
+
+    async def event_generator():
+        events = follow_events(conversation_id, last_event_id, turn_owner)
+        checked_at = last_event_at = time.monotonic()
+        try:
+            async for token in events:
+                now = time.monotonic()
+                # Checked while events flow too, as writes to a closed connection may not fail
+                if now - checked_at >= settings.stream_disconnect_poll_seconds:
+                    checked_at = now
+                    if await request.is_disconnected():
+                        print(f"Client disconnected from conversation {conversation_id}")
+                        break
+                if token is None:
+                    if now - last_event_at >= settings.stream_idle_timeout_seconds:
+                        print(f"No workflow events for {now - last_event_at:.0f}s in conversation {conversation_id}, giving up on it")
+                        yield f"data: {json.dumps({'type': 'status', 'data': 'The response timed out. Please try again.'})}\n\n"
+                        yield f"data: {json.dumps({'type': 'complete', 'data': ''})}\n\n"
+                        break
+                    continue
+                last_event_at = now
+                sampled_log("sse.chunk", conversation_id=conversation_id, type=token["type"],
+                            current_step=token.get("current_step", ""), bytes=len(token["data"]))
+                event_id = f"id: {token['event_id']}\n" if token.get("event_id") else ""
+                yield f"{event_id}data: {json.dumps(token)}\n\n"
+        finally:
+            # Stops marking the conversation followed: once no response (on any worker) has
+            # followed it for stream_resume_grace_seconds, its workflow is cancelled
+            await events.aclose()
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 @app.post("/api/conversations/{conversation_id}/messages/stream")
-async def chat_stream(conversation_id: str, message: dict):
+async def chat_stream(conversation_id: str, message: dict, request: Request):
 
     user_message = message["content"]
 
-    # Initialize session if not exists
-    current_session = session_store.load_session(conversation_id)
-    msgs = current_session["messages"]
-    current_step =  msgs[len(msgs) - 1].get("message_section", "General") if msgs else "General"
-
-    current_session["messages"].append({
+    # The message_section is filled in from the previous message by the messages reducer
+    new_message = {
         "id": str(uuid4()),
         "role": "user",
         "content": user_message,
         "created_at": datetime.datetime.utcnow().isoformat(),
         "conversation_id": conversation_id,
-        "message_section": current_step,
         "message_type": ""
-    })
-
-    session_store.save_session(conversation_id, current_session)
-
-    async def event_generator():
-        queue = asyncio.Queue()
-
-        async def stream_callback(chunk: StreamingResponseChunk):
-            await queue.put(chunk)
-
-        # Invoke workflow
-        task = asyncio.create_task(
-            workflow.ainvoke(
-                current_session,
-                config={"stream_callback": stream_callback}
-            )
-        )
-
-        while True:
-            token: StreamingResponseChunk = await queue.get()
-            print("Yielding token:", token)
-            if token["type"] == "state_update":
-                # Update session state
-                state_value = json.loads(token["data"])
-                for key in state_value:
-                    current_session[key] = state_value[key]
-            # if token contains FINAL_TEXT, split the string with FINAL_TEXT and store the second part in SESSION
-            if token['type'] == "full_text":
-                current_session["messages"].append({
-                    "role": "assistant",
-                    "content": token['data'],
-                    "id": str(uuid4()),
-                    "created_at": datetime.datetime.utcnow().isoformat(),
-                    "conversation_id": conversation_id,
-                    "message_section": token["current_step"],
-                    "message_type": ""
-                })
-                continue
-            if token['type'] == "metadata":
-                current_session["messages"].append({
-                    "role": "assistant",
-                    "content": token['data'],
-                    "id": str(uuid4()),
-                    "created_at": datetime.datetime.utcnow().isoformat(),
-                    "conversation_id": conversation_id,
-                    "message_section": token["current_step"],
-                    "message_type": "metadata"
-                })
-                continue
-            if token['type'] == "complete":
-                yield f"data: {json.dumps(token)}\n\n"
-                break
-            yield f"data: {json.dumps(token)}\n\n"
-        
-        session_store.save_session(conversation_id, current_session)
-        state = await task
-        # queue.put({
-        #     "data": "",
-        #     "type": "complete"
-        # })
+    }
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    # Only one workflow run per conversation at a time, across workers; a duplicate of the
+    # running message follows that run instead of starting another
+    turn_owner, turn = await join_or_start_turn(conversation_id, user_message)
+    if turn_owner is None:
+        raise HTTPException(status_code=409, detail="A reply to another message is still being generated for this conversation")
+    if turn is not None:
+        # One trace per turn: the workflow, including its checkpoint reads and writes
+        turn_span = start_span("chat_turn", {"conversation.id": conversation_id})
+        await turn.publish({"type": "status", "data": "Starting to process..."})
+        # The checkpointer loads the conversation's state, resumes at its current step and
+        # persists each node's delta; the task inherits the turn span, so node spans nest under it.
+        # The run is not tied to this response: its events go to the conversation's event log.
+        # Imported here rather than at startup: workflow pulls in langgraph (see warmup.py)
+        from workflow import workflow
+        with use_span(turn_span):
+            turn.start(lambda stream_callback: workflow.ainvoke(
+                {"messages": [new_message]},
+                config={"configurable": {"thread_id": conversation_id, "stream_callback": stream_callback}}
+            ))
+        turn.task.add_done_callback(lambda _: end_span(turn_span))
+    else:
+        print(f"Duplicate request for conversation {conversation_id} follows the running turn")
+
+    return sse_events(request, conversation_id, turn_owner=turn_owner)
+
+
+@app.get("/api/conversations/{conversation_id}/messages/stream")
+async def resume_chat_stream(conversation_id: str, request: Request, last_event_id: Optional[str] = None):
+    """
+    Resume a conversation's stream on any worker: the events after last_event_id (the
+    event_id of the last event received; all of the latest turn's when omitted), then
+    the live ones. The Last-Event-ID header is accepted as well.
+    """
+    last_event_id = last_event_id or request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            event_id_key(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="last_event_id is not an event id")
+    return sse_events(request, conversation_id, last_event_id=last_event_id)
 
 @app.post("/api/conversations", response_model=Conversation)
-def create_conversation(request: CreateConversationRequest):
+async def create_conversation(request: CreateConversationRequest):
     now = datetime.datetime.utcnow().isoformat()
 
     designation = next((d for d in available_designations if d.id == request.designation_id), None)
@@ -153,27 +190,61 @@ def create_conversation(request: CreateConversationRequest):
     current_session = INITIAL_STATE.copy()
     current_session["conversation"] = conversation.dict()
     current_session["designation"] = designation.name if designation else ""
-    session_store.save_session(conversation.id, current_session)
+    await session_store.save_session(conversation.id, current_session)
+    await session_store.index_conversation(current_session["conversation"])
+
+    if settings.context_prefetch_enabled:
+        # Fetch Clockify and feedback inputs now, while the user goes through intake
+        start_prefetch(current_session["conversation"])
 
     return conversation
 
 # api to get all available projects
 @app.get("/api/projects", response_model=List[Project])
-def get_projects():
-    # Access variables via dot notation
-    url = f"https://api.clockify.me/api/v1/workspaces/{settings.clockify_workspace_id}/projects"
-    headers = {
-        "X-Api-Key": settings.clockify_api_key,
-        "Content-Type": "application/json"
-    }
-
+async def get_projects():
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return [Project(id=p['id'], name=p['name']) for p in response.json()]
-    except requests.exceptions.RequestException as e:
+        projects = await get_clockify_client().get_projects()
+        return [Project(id=p['id'], name=p['name']) for p in projects]
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Clockify Error: {str(e)}")
 
+# api to inspect the Clockify report cache counters
+@app.get("/api/cache/clockify")
+def get_clockify_cache_stats():
+    return get_clockify_cache().get_stats()
+
+# api to drop cached Clockify report entries for a project and user
+@app.delete("/api/cache/clockify/{project_id}/{user_id}")
+async def invalidate_clockify_cache(project_id: str, user_id: str):
+    await get_clockify_cache().invalidate(project_id, user_id)
+    return {"invalidated": True}
+
+# api to inspect per-node LLM token and latency accounting
+@app.get("/api/usage/llm")
+def get_llm_usage():
+    # llm_cache and llm_gateway import langchain_core; only loaded once LLM calls are made or looked at
+    from llm_cache import get_llm_response_cache
+    from llm_gateway import get_llm_gateway
+    return {**usage_tracker.get_stats(), "prompt_prefix_cache": get_prompt_prefix_cache().get_stats(),
+            "opening_questions": get_opening_question_cache().get_stats(),
+            "response_cache": get_llm_response_cache().get_stats(), "gateway": get_llm_gateway().get_stats()}
+
+# api to drop every cached LLM response
+@app.delete("/api/cache/llm")
+async def clear_llm_cache():
+    from llm_cache import get_llm_response_cache
+    await get_llm_response_cache().clear()
+    return {"cleared": True}
+
+# readiness probe: 503 until the warm-up is done, so a new worker gets no traffic while cold
+@app.get("/api/health/ready")
+def get_readiness(response: Response):
+    status = get_warmup().get_status()
+    ready = status["ready"] or not settings.warmup_enabled
+    if not ready:
+        response.status_code = 503
+    return {**status, "ready": ready}
+
 # api to get all available designations
 @app.get("/api/designations")
 def get_designations():
@@ -181,25 +252,22 @@ def get_designations():
 
 # api to get conversations by session id
 @app.get("/api/conversations/{conversation_id}", response_model=Conversation)
-def get_conversation(conversation_id: str):
-    session = session_store.load_session(conversation_id)
+async def get_conversation(conversation_id: str):
+    session = await session_store.load_session(conversation_id, include_messages=False)
     conversation = Conversation(**session["conversation"])
     return conversation
 
 #api to get messages within a conversation
 @app.get("/api/conversations/{conversation_id}/messages")
-def get_messages(conversation_id: str):
-    session = session_store.load_session(conversation_id)
+async def get_messages(conversation_id: str):
+    session = await session_store.load_session(conversation_id)
     return session["messages"]
 
 #api to get all conversations
 @app.get("/api/conversations", response_model=list[Conversation])
-def get_all_conversations():
-    conversations = []
-    all_sessions = session_store.get_all_session_states()
-    for session_id, state in all_sessions.items():
-        if "conversation" in state:
-            conversations.append(Conversation(**state["conversation"]))
-    #sort conversations by created_at date descending
-    conversations.sort(key=lambda x: x.created_at, reverse=True)
-    return conversations
+async def get_all_conversations(response: Response, user_id: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
+    # newest first; when a limit is given, the cursor for the next page is returned in X-Next-Cursor
+    conversations, next_cursor = await session_store.list_conversations(user_id=user_id, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [Conversation(**c) for c in conversations]
@@ -0,0 +1,86 @@
+# opening_questions.py
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from prompt_cache import inputs_fingerprint
+
+MAX_CACHED_OPENINGS = 256
+
+OpeningKey = Tuple[str, str]
+
+
+class OpeningQuestionCache:
+    """
+    Opening replies of outcomes that are not under evaluation yet, keyed by
+    (session id, outcome) and generated speculatively in the background.
+
+    The first turn of an outcome has no history, so its reply depends only on
+    the outcome and the employee context; an entry is used only while those
+    inputs are unchanged, and is replaced when they change. `take` hands an
+    entry out once, waiting for it if it is still being generated.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_OPENINGS):
+        self.max_entries = max_entries
+        # key -> {"fingerprint", "task"}
+        self._entries: "OrderedDict[OpeningKey, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"started": 0, "served": 0, "discarded": 0, "failed": 0, "misses": 0}
+
+    def prepare(self, key: OpeningKey, inputs: Dict[str, Any], generate: Callable[[], Awaitable[str]]) -> bool:
+        """Start generating the opening reply for `key` unless one for the same inputs exists. Returns True when started."""
+        fingerprint = inputs_fingerprint(inputs)
+        entry = self._entries.get(key)
+        if entry and entry["fingerprint"] == fingerprint:
+            return False
+        if entry:
+            # The context changed since it was generated
+            self._discard(key)
+
+        task = asyncio.create_task(generate())
+        # Failures are reported by `take`; entries never taken should not warn about them
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._entries[key] = {"fingerprint": fingerprint, "task": task}
+        self._stats["started"] += 1
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+        return True
+
+    async def take(self, key: OpeningKey, inputs: Dict[str, Any]) -> Optional[str]:
+        """The opening reply prepared for `key` and these inputs, or None when there is none."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry["fingerprint"] != inputs_fingerprint(inputs):
+            self._discard(key)
+            self._stats["misses"] += 1
+            return None
+
+        del self._entries[key]
+        try:
+            reply = await entry["task"]
+        except Exception as e:
+            print(f"Speculative opening question failed, generating it now: {e}")
+            self._stats["failed"] += 1
+            return None
+        self._stats["served"] += 1
+        return reply
+
+    def _discard(self, key: OpeningKey):
+        entry = self._entries.pop(key)
+        entry["task"].cancel()
+        self._stats["discarded"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "size": len(self._entries)}
+
+
+_opening_question_cache: Optional[OpeningQuestionCache] = None
+
+
+def get_opening_question_cache() -> OpeningQuestionCache:
+    global _opening_question_cache
+    if _opening_question_cache is None:
+        _opening_question_cache = OpeningQuestionCache()
+    return _opening_question_cache
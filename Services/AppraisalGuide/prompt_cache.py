@@ -0,0 +1,109 @@
+# prompt_cache.py
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from settings import settings
+
+MAX_CACHED_PREFIXES = 256
+# Stop using a provider cache this long before it expires, so a request never races its expiry
+EXPIRY_MARGIN_SECONDS = 60
+
+PrefixKey = Tuple[str, str]
+
+
+def inputs_fingerprint(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _supports_context_cache(model) -> bool:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from llm_cache import unwrap
+    return isinstance(unwrap(model), ChatGoogleGenerativeAI)
+
+
+class PromptPrefixCache:
+    """
+    Rendered prompt prefixes keyed by (session id, outcome).
+
+    `render` memoizes the prefix text for as long as its inputs are unchanged.
+    `provider_cache` returns the name of a Gemini context cache holding the
+    prefix, so a request only has to send the conversation turns. The cache is
+    created in the background the first time a prefix is seen; until it is ready,
+    or when the model has no context caching, callers send the prefix inline.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_PREFIXES, ttl_seconds: int = 60 * 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> {"fingerprint", "prefix", "cache_name", "expires_at", "failed"}
+        self._entries: "OrderedDict[PrefixKey, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[Tuple[PrefixKey, str], asyncio.Task] = {}
+        self._stats = {"render_hits": 0, "renders": 0, "provider_caches_created": 0, "provider_cache_errors": 0}
+
+    def render(self, key: PrefixKey, inputs: Dict[str, Any], render_prefix: Callable[[], str]) -> str:
+        fingerprint = inputs_fingerprint(inputs)
+        entry = self._entries.get(key)
+        if entry and entry["fingerprint"] == fingerprint:
+            self._entries.move_to_end(key)
+            self._stats["render_hits"] += 1
+            return entry["prefix"]
+
+        self._stats["renders"] += 1
+        prefix = render_prefix()
+        self._entries[key] = {"fingerprint": fingerprint, "prefix": prefix, "cache_name": None, "expires_at": 0.0, "failed": False}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return prefix
+
+    def provider_cache(self, key: PrefixKey, model) -> Optional[str]:
+        """Name of a live provider cache for the prefix last rendered for `key`, or None."""
+        entry = self._entries.get(key)
+        if entry is None or entry["failed"] or not _supports_context_cache(model):
+            return None
+        if entry["cache_name"] and time.monotonic() < entry["expires_at"]:
+            return entry["cache_name"]
+
+        pending_key = (key, entry["fingerprint"])
+        if pending_key not in self._pending:
+            task = asyncio.create_task(self._create_provider_cache(model, entry))
+            self._pending[pending_key] = task
+            task.add_done_callback(lambda _: self._pending.pop(pending_key, None))
+        return None
+
+    async def _create_provider_cache(self, model, entry: Dict[str, Any]):
+        from langchain_core.messages import SystemMessage
+        from langchain_google_genai import create_context_cache
+        from llm_cache import unwrap
+
+        try:
+            # create_context_cache is a blocking API call
+            name = await asyncio.to_thread(
+                create_context_cache, unwrap(model), [SystemMessage(content=entry["prefix"])], ttl=f"{self.ttl_seconds}s"
+            )
+        except Exception as e:
+            # e.g. prefix below the model's minimum cacheable size; keep sending it inline
+            print(f"Context cache unavailable, sending prompt prefix inline: {e}")
+            entry["failed"] = True
+            self._stats["provider_cache_errors"] += 1
+            return
+        entry["cache_name"] = name
+        entry["expires_at"] = time.monotonic() + self.ttl_seconds - EXPIRY_MARGIN_SECONDS
+        self._stats["provider_caches_created"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "size": len(self._entries)}
+
+
+_prompt_prefix_cache: Optional[PromptPrefixCache] = None
+
+
+def get_prompt_prefix_cache() -> PromptPrefixCache:
+    global _prompt_prefix_cache
+    if _prompt_prefix_cache is None:
+        _prompt_prefix_cache = PromptPrefixCache(ttl_seconds=settings.llm_context_cache_ttl_seconds)
+    return _prompt_prefix_cache
@@ -1,7 +1,13 @@
-import redis
+import redis.asyncio as redis
+from settings import settings
 
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
-    decode_responses=True  # IMPORTANT: store JSON as strings
+# A blocking pool makes callers wait for a free connection instead of failing
+# once redis_max_connections are checked out.
+redis_pool = redis.BlockingConnectionPool.from_url(
+    settings.redis_url,
+    max_connections=settings.redis_max_connections,
+    timeout=settings.redis_pool_timeout_seconds,
+    decode_responses=False  # values are bytes: sessions go through session_codec
 )
+
+redis_client = redis.Redis(connection_pool=redis_pool)
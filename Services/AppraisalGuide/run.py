@@ -6,5 +6,13 @@ load_dotenv()
 
 debug_mode = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
 print(f"Debug mode is {'on' if debug_mode else 'off'}")
+# Worker processes share sessions, leases and stream event logs through Redis, so any
+# worker can serve any request; with SESSION_BACKEND=memory keep a single worker
+workers = 1 if debug_mode else int(os.getenv("WORKERS", "1"))
+if workers > 1 and os.getenv("SESSION_BACKEND", "redis").lower() == "memory":
+    print("SESSION_BACKEND=memory is per process, running a single worker")
+    workers = 1
+print(f"Starting {workers} worker(s)")
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, log_level="info", reload=debug_mode)
+    uvicorn.run("main:app", host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")),
+                log_level="info", reload=debug_mode, workers=workers)
@@ -0,0 +1,607 @@
+# session_backends.py
+import asyncio
+import bisect
+import copy
+import datetime
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from session_codec import SessionCodec
+from state import INITIAL_STATE
+from tracing import current_span
+
+SESSION_PREFIX = "session:"
+
+# Conversation listing index:
+#   conversations:index         sorted set of conversation ids scored by created_at
+#   conversations:user:<id>     the same, per user
+#   conversation:<id>           JSON of the Conversation metadata
+CONVERSATION_INDEX_KEY = "conversations:index"
+USER_CONVERSATION_INDEX_PREFIX = "conversations:user:"
+CONVERSATION_PREFIX = "conversation:"
+
+# Layout per session:
+#   session:<id>:state      hash, one encoded value per small state field
+#   session:<id>:messages   list, one encoded message per item (append-only)
+#   session:<id>:<field>    string, for each of the large BLOB_FIELDS
+#   session:<id>:checkpoint string, the workflow checkpoint record (see checkpointer.py)
+#   session:<id>:version    integer, incremented by every checkpoint write
+#   session:<id>:lease      string, owner of the running workflow turn, with a TTL
+#   session:<id>:events     stream, the current turn's SSE events (see conversation_turns.py)
+#   session:<id>:followers  string, refreshed by every response following the turn, with a TTL
+# Values are encoded with session_codec. Sessions written before this layout
+# live in a single JSON string at session:<id> and are migrated the first
+# time they are loaded.
+MESSAGES_FIELD = "messages"
+CHECKPOINT_SUFFIX = "checkpoint"
+VERSION_SUFFIX = "version"
+LEASE_SUFFIX = "lease"
+EVENTS_SUFFIX = "events"
+FOLLOWERS_SUFFIX = "followers"
+
+# Compare-and-set on the lease owner, so a worker never extends or drops a lease it lost
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SessionConflictError(Exception):
+    """A versioned write lost against a concurrent writer of the same session."""
+
+
+def event_id_key(event_id: str) -> Tuple[int, int]:
+    """Sort key of a stream event id ("<ms>-<seq>")."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+BLOB_FIELDS = ("context_builder_data", "project_context", "clockify_data", "feedback_data")
+
+
+class SessionState(dict):
+    """
+    A loaded session. Remembers the encoded form of what is stored in Redis so
+    `save_session` can write only the fields that changed since.
+    """
+    stored: Dict[str, Any]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stored = {}
+
+
+def created_at_score(created_at: str) -> float:
+    created = datetime.datetime.fromisoformat(created_at)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=datetime.timezone.utc)
+    return created.timestamp()
+
+
+def encode_cursor(score: float, conversation_id: str) -> str:
+    # The id breaks ties between conversations created at the same time
+    return f"{score!r}:{conversation_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    score, _, conversation_id = cursor.partition(":")
+    return float(score), conversation_id
+
+
+class SessionBackend(ABC):
+    """Storage for session state and the conversation listing index."""
+
+    @abstractmethod
+    async def load_session(self, session_id: str, include_messages: bool = True) -> dict:
+        """Load a session, or a fresh copy of INITIAL_STATE when it does not exist."""
+
+    @abstractmethod
+    async def save_session(self, session_id: str, state: dict):
+        """Persist a session."""
+
+    @abstractmethod
+    async def load_checkpoint(self, session_id: str) -> Tuple[Optional[bytes], int]:
+        """Return the session's workflow checkpoint record (None when it has none) and its version."""
+
+    @abstractmethod
+    async def save_checkpoint(self, session_id: str, fields: Dict[str, Any], new_messages: List[Dict[str, Any]],
+                              checkpoint: bytes, expected_version: int, replace_messages: bool = False) -> int:
+        """
+        Atomically write changed state fields, append messages (or replace the history
+        when `replace_messages`) and store the checkpoint record, provided the stored
+        version is still `expected_version`. Returns the new version; raises
+        SessionConflictError when another writer got there first.
+        """
+
+    @abstractmethod
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Take the session's lease for `owner` unless someone else holds it."""
+
+    @abstractmethod
+    async def renew_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend a lease `owner` still holds; False when it expired or was taken over."""
+
+    @abstractmethod
+    async def release_lease(self, session_id: str, owner: str):
+        """Release the lease if `owner` still holds it."""
+
+    @abstractmethod
+    async def lease_owner(self, session_id: str) -> Optional[str]:
+        """The current holder of the session's lease, None when nobody holds it."""
+
+    @abstractmethod
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]], max_entries: int,
+                            ttl_seconds: float, reset: bool = False) -> List[str]:
+        """
+        Append events to the session's event stream (emptied first when `reset`),
+        keeping about the last `max_entries`. Returns their ids, which increase
+        monotonically, also across resets.
+        """
+
+    @abstractmethod
+    async def read_events(self, cursors: Dict[str, str], count: int,
+                          block_seconds: Optional[float] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Read up to `count` events after the given id from each session's stream, as
+        {session_id: [(event_id, event)]} with sessions without new events left out.
+        With `block_seconds`, waits that long for an event when none is there yet.
+        """
+
+    @abstractmethod
+    async def touch_followers(self, session_id: str, ttl_seconds: float):
+        """Record that a response still follows the session's events, for `ttl_seconds`."""
+
+    @abstractmethod
+    async def has_followers(self, session_id: str) -> bool:
+        """Whether a response touched the session's followers within their TTL."""
+
+    @abstractmethod
+    async def get_all_session_states(self) -> Dict[str, Any]:
+        """Return every stored session keyed by id, without message histories."""
+
+    @abstractmethod
+    async def index_conversation(self, conversation: Dict[str, Any]):
+        """Record a conversation's metadata in the listing index."""
+
+    @abstractmethod
+    async def list_conversations(self, user_id: Optional[str] = None, cursor: Optional[str] = None,
+                                 limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """List conversation metadata newest first, with the cursor of the next page (None when done)."""
+
+    async def ping(self):
+        """Check the backend is reachable."""
+
+    async def warm_up(self, connections: int):
+        """Open up to `connections` connections ahead of the first requests, checking the backend is reachable."""
+        await self.ping()
+
+    async def close(self):
+        """Release connections held by the backend."""
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session storage in Redis. Values are written through `codec`; the client
+    must return raw bytes (decode_responses=False).
+    """
+
+    def __init__(self, client: redis.Redis, codec: Optional[SessionCodec] = None):
+        self.client = client
+        self.codec = codec or SessionCodec()
+
+    @staticmethod
+    def _state_key(session_id: str) -> str:
+        return f"{SESSION_PREFIX}{session_id}:state"
+
+    @staticmethod
+    def _messages_key(session_id: str) -> str:
+        return f"{SESSION_PREFIX}{session_id}:messages"
+
+    @staticmethod
+    def _blob_key(session_id: str, field: str) -> str:
+        return f"{SESSION_PREFIX}{session_id}:{field}"
+
+    async def load_session(self, session_id: str, include_messages: bool = True) -> dict:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._state_key(session_id))
+        for field in BLOB_FIELDS:
+            pipe.get(self._blob_key(session_id, field))
+        if include_messages:
+            pipe.lrange(self._messages_key(session_id), 0, -1)
+        results = await pipe.execute()
+
+        fields: Dict[str, bytes] = {field.decode(): raw for field, raw in results[0].items()}
+        for field, raw in zip(BLOB_FIELDS, results[1:1 + len(BLOB_FIELDS)]):
+            if raw is not None:
+                fields[field] = raw
+
+        if not fields:
+            legacy = await self.client.get(SESSION_PREFIX + session_id)
+            if legacy is None:
+                return copy.deepcopy(INITIAL_STATE)
+            return await self._migrate_legacy_session(session_id, json.loads(legacy), include_messages)
+
+        state = SessionState({field: self.codec.decode(raw) for field, raw in fields.items()})
+        state.stored = fields
+        bytes_read = sum(len(raw) for raw in fields.values())
+        if include_messages:
+            raw_messages: List[bytes] = results[-1]
+            state[MESSAGES_FIELD] = [self.codec.decode(m) for m in raw_messages]
+            state.stored[MESSAGES_FIELD] = len(raw_messages)
+            bytes_read += sum(len(m) for m in raw_messages)
+        current_span().set_attribute("session.bytes_read", bytes_read)
+        return state
+
+    async def _migrate_legacy_session(self, session_id: str, legacy_state: dict, include_messages: bool) -> dict:
+        state = SessionState(legacy_state)
+        await self.save_session(session_id, state)
+        await self.client.delete(SESSION_PREFIX + session_id)
+        if not include_messages:
+            state.pop(MESSAGES_FIELD, None)
+            state.stored.pop(MESSAGES_FIELD, None)
+        return state
+
+    async def save_session(self, session_id: str, state: dict):
+        """
+        Write only what changed since the state was loaded or last saved.
+
+        Messages are treated as append-only: only messages beyond the stored count are
+        pushed. A state that was not produced by `load_session` has everything written.
+        Fields still stored in an older encoding differ from their re-encoded form, so
+        they are migrated to the current codec by the first save after a load.
+        """
+        stored = state.stored if isinstance(state, SessionState) else {}
+        encoded = {field: self.codec.encode(value) for field, value in state.items() if field != MESSAGES_FIELD}
+        changed = {field: value for field, value in encoded.items() if stored.get(field) != value}
+
+        pipe = self.client.pipeline(transaction=True)
+        hash_fields = {field: value for field, value in changed.items() if field not in BLOB_FIELDS}
+        if hash_fields:
+            pipe.hset(self._state_key(session_id), mapping=hash_fields)
+        for field in BLOB_FIELDS:
+            if field in changed:
+                pipe.set(self._blob_key(session_id, field), changed[field])
+
+        messages = state.get(MESSAGES_FIELD)
+        if messages is not None:
+            stored_count = stored.get(MESSAGES_FIELD)
+            if stored_count is None:
+                stored_count = await self.client.llen(self._messages_key(session_id))
+            if len(messages) < stored_count:
+                # History was rewritten rather than appended to; replace it
+                pipe.delete(self._messages_key(session_id))
+                stored_count = 0
+            new_messages = [self.codec.encode(m) for m in messages[stored_count:]]
+            if new_messages:
+                pipe.rpush(self._messages_key(session_id), *new_messages)
+        else:
+            new_messages = []
+
+        await pipe.execute()
+        current_span().set_attributes({
+            "session.fields_written": len(changed),
+            "session.messages_appended": len(new_messages),
+            "session.bytes_written": sum(len(v) for v in changed.values()) + sum(len(m) for m in new_messages),
+        })
+
+        if isinstance(state, SessionState):
+            state.stored.update(changed)
+            if messages is not None:
+                state.stored[MESSAGES_FIELD] = len(messages)
+
+    async def load_checkpoint(self, session_id: str) -> Tuple[Optional[bytes], int]:
+        checkpoint, version = await self.client.mget(self._blob_key(session_id, CHECKPOINT_SUFFIX),
+                                                     self._blob_key(session_id, VERSION_SUFFIX))
+        return checkpoint, int(version or 0)
+
+    async def save_checkpoint(self, session_id: str, fields: Dict[str, Any], new_messages: List[Dict[str, Any]],
+                              checkpoint: bytes, expected_version: int, replace_messages: bool = False) -> int:
+        encoded = {field: self.codec.encode(value) for field, value in fields.items()}
+        encoded_messages = [self.codec.encode(m) for m in new_messages]
+        version_key = self._blob_key(session_id, VERSION_SUFFIX)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            # WATCH the version, check it, then queue the writes; EXEC fails if it changed in between
+            await pipe.watch(version_key)
+            stored_version = int(await pipe.get(version_key) or 0)
+            if stored_version != expected_version:
+                raise SessionConflictError(f"session {session_id} is at version {stored_version}, expected {expected_version}")
+            pipe.multi()
+            hash_fields = {field: value for field, value in encoded.items() if field not in BLOB_FIELDS}
+            if hash_fields:
+                pipe.hset(self._state_key(session_id), mapping=hash_fields)
+            for field in BLOB_FIELDS:
+                if field in encoded:
+                    pipe.set(self._blob_key(session_id, field), encoded[field])
+            if replace_messages:
+                pipe.delete(self._messages_key(session_id))
+            if encoded_messages:
+                pipe.rpush(self._messages_key(session_id), *encoded_messages)
+            pipe.set(self._blob_key(session_id, CHECKPOINT_SUFFIX), checkpoint)
+            pipe.incr(version_key)
+            try:
+                results = await pipe.execute()
+            except redis.WatchError:
+                raise SessionConflictError(f"session {session_id} was written concurrently at version {expected_version}")
+
+        current_span().set_attributes({
+            "session.fields_written": len(encoded),
+            "session.messages_appended": len(encoded_messages),
+            "session.bytes_written": sum(len(v) for v in encoded.values()) + sum(len(m) for m in encoded_messages) + len(checkpoint),
+        })
+        return results[-1]
+
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        return bool(await self.client.set(self._blob_key(session_id, LEASE_SUFFIX), owner, nx=True, px=int(ttl_seconds * 1000)))
+
+    async def renew_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        return bool(await self.client.eval(RENEW_LEASE_SCRIPT, 1, self._blob_key(session_id, LEASE_SUFFIX), owner, int(ttl_seconds * 1000)))
+
+    async def release_lease(self, session_id: str, owner: str):
+        await self.client.eval(RELEASE_LEASE_SCRIPT, 1, self._blob_key(session_id, LEASE_SUFFIX), owner)
+
+    async def lease_owner(self, session_id: str) -> Optional[str]:
+        owner = await self.client.get(self._blob_key(session_id, LEASE_SUFFIX))
+        return owner.decode() if owner is not None else None
+
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]], max_entries: int,
+                            ttl_seconds: float, reset: bool = False) -> List[str]:
+        key = self._blob_key(session_id, EVENTS_SUFFIX)
+        pipe = self.client.pipeline(transaction=True)
+        if reset:
+            # Emptied rather than deleted: the stream keeps its last id, so the new log's ids
+            # stay above every id a follower may hold, even within the same millisecond
+            pipe.xtrim(key, maxlen=0, approximate=False)
+        for event in events:
+            pipe.xadd(key, {"e": self.codec.encode(event)}, maxlen=max_entries, approximate=True)
+        pipe.pexpire(key, int(ttl_seconds * 1000))
+        results = await pipe.execute()
+        ids = results[1:-1] if reset else results[:-1]
+        return [event_id.decode() for event_id in ids]
+
+    async def read_events(self, cursors: Dict[str, str], count: int,
+                          block_seconds: Optional[float] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        keys = {self._blob_key(session_id, EVENTS_SUFFIX): session_id for session_id in cursors}
+        response = await self.client.xread(
+            {key: cursors[session_id] for key, session_id in keys.items()},
+            count=count, block=int(block_seconds * 1000) if block_seconds else None,
+        )
+        events: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for key, entries in response or []:
+            session_id = keys[key.decode()]
+            events[session_id] = [(event_id.decode(), self.codec.decode(fields[b"e"])) for event_id, fields in entries]
+        return events
+
+    async def touch_followers(self, session_id: str, ttl_seconds: float):
+        await self.client.set(self._blob_key(session_id, FOLLOWERS_SUFFIX), b"1", px=int(ttl_seconds * 1000))
+
+    async def has_followers(self, session_id: str) -> bool:
+        return bool(await self.client.exists(self._blob_key(session_id, FOLLOWERS_SUFFIX)))
+
+    async def get_all_session_states(self) -> Dict[str, Any]:
+        sessions: Dict[str, Any] = {}
+        async for key in self.client.scan_iter(match=f"{SESSION_PREFIX}*", count=100):
+            session_id = key.decode().replace(SESSION_PREFIX, "", 1)
+            if session_id.endswith(":state"):
+                session_id = session_id[:-len(":state")]
+            elif ":" in session_id:
+                # messages list or blob field of a session; covered by its :state key
+                continue
+
+            try:
+                sessions[session_id] = await self.load_session(session_id, include_messages=False)
+            except ValueError:
+                # Skip corrupted or undecodable values
+                continue
+        return sessions
+
+    async def index_conversation(self, conversation: Dict[str, Any]):
+        score = created_at_score(conversation["created_at"])
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(CONVERSATION_PREFIX + conversation["id"], json.dumps(conversation))
+        pipe.zadd(CONVERSATION_INDEX_KEY, {conversation["id"]: score})
+        pipe.zadd(USER_CONVERSATION_INDEX_PREFIX + conversation["user_id"], {conversation["id"]: score})
+        await pipe.execute()
+
+    async def _rebuild_conversation_index(self):
+        # One-off backfill for sessions created before the index existed
+        for state in (await self.get_all_session_states()).values():
+            if state.get("conversation"):
+                await self.index_conversation(state["conversation"])
+
+    async def _index_page(self, index_key: str, cursor: Optional[str], limit: Optional[int]):
+        if not cursor:
+            return await self.client.zrevrangebyscore(
+                index_key, "+inf", "-inf", start=0 if limit else None, num=limit, withscores=True
+            )
+        # Members with the cursor's score come in reverse id order; those after the cursor's id
+        # go first, then the page below that score
+        score, last_id = decode_cursor(cursor)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrangebyscore(index_key, repr(score), repr(score), withscores=True)
+        pipe.zrevrangebyscore(index_key, f"({score!r}", "-inf", start=0 if limit else None, num=limit, withscores=True)
+        tied, below = await pipe.execute()
+        page = [(member, member_score) for member, member_score in tied if member < last_id.encode()] + below
+        return page[:limit] if limit else page
+
+    async def list_conversations(self, user_id: Optional[str] = None, cursor: Optional[str] = None,
+                                 limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Two round trips regardless of how many sessions or messages exist:
+        one range read on the created_at index and one MGET of the metadata.
+        """
+        index_key = USER_CONVERSATION_INDEX_PREFIX + user_id if user_id else CONVERSATION_INDEX_KEY
+        page = await self._index_page(index_key, cursor, limit)
+
+        if not page and cursor is None and not await self.client.exists(CONVERSATION_INDEX_KEY):
+            await self._rebuild_conversation_index()
+            page = await self._index_page(index_key, cursor, limit)
+        if not page:
+            return [], None
+
+        raw_conversations = await self.client.mget([CONVERSATION_PREFIX + conversation_id.decode() for conversation_id, _ in page])
+        conversations = [json.loads(raw) for raw in raw_conversations if raw is not None]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0].decode()) if limit and len(page) == limit else None
+        return conversations, next_cursor
+
+    async def ping(self):
+        await self.client.ping()
+
+    async def warm_up(self, connections: int):
+        # Concurrent commands each check out a connection, so the pool ends up holding that many open
+        await asyncio.gather(*(self.client.ping() for _ in range(max(1, connections))))
+
+    async def close(self):
+        await self.client.aclose()
+        await self.client.connection_pool.disconnect()
+
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    Process-local backend for tests and single-node use without Redis.
+    States are stored JSON-encoded, so callers never share mutable objects with the store.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, str] = {}
+        self._checkpoints: Dict[str, bytes] = {}
+        self._versions: Dict[str, int] = {}
+        # session id -> (owner, monotonic expiry)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        # session id -> [(event id, JSON event)]; ids are "<n>-0" from a per-session counter
+        self._events: Dict[str, List[Tuple[str, str]]] = {}
+        self._event_counters: Dict[str, int] = {}
+        # Set, and replaced, whenever events are appended, to wake blocked readers
+        self._events_appended = asyncio.Event()
+        # session id -> monotonic expiry
+        self._followers: Dict[str, float] = {}
+        self._conversations: Dict[str, Dict[str, Any]] = {}
+        # (score, id) kept sorted; read backwards, newest first and ties by id descending as in Redis
+        self._index: List[Tuple[float, str]] = []
+
+    async def load_session(self, session_id: str, include_messages: bool = True) -> dict:
+        raw = self._sessions.get(session_id)
+        if raw is None:
+            return copy.deepcopy(INITIAL_STATE)
+        state = json.loads(raw)
+        if not include_messages:
+            state.pop(MESSAGES_FIELD, None)
+        return state
+
+    async def save_session(self, session_id: str, state: dict):
+        if MESSAGES_FIELD not in state and session_id in self._sessions:
+            # Saved from a load without messages; keep the stored history
+            state = {**state, MESSAGES_FIELD: json.loads(self._sessions[session_id]).get(MESSAGES_FIELD, [])}
+        self._sessions[session_id] = json.dumps(state)
+
+    async def load_checkpoint(self, session_id: str) -> Tuple[Optional[bytes], int]:
+        return self._checkpoints.get(session_id), self._versions.get(session_id, 0)
+
+    async def save_checkpoint(self, session_id: str, fields: Dict[str, Any], new_messages: List[Dict[str, Any]],
+                              checkpoint: bytes, expected_version: int, replace_messages: bool = False) -> int:
+        stored_version = self._versions.get(session_id, 0)
+        if stored_version != expected_version:
+            raise SessionConflictError(f"session {session_id} is at version {stored_version}, expected {expected_version}")
+        state = await self.load_session(session_id)
+        state.update(fields)
+        state[MESSAGES_FIELD] = ([] if replace_messages else state.get(MESSAGES_FIELD, [])) + list(new_messages)
+        self._sessions[session_id] = json.dumps(state)
+        self._checkpoints[session_id] = checkpoint
+        self._versions[session_id] = stored_version + 1
+        return stored_version + 1
+
+    async def acquire_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        holder = self._leases.get(session_id)
+        if holder and holder[1] > time.monotonic():
+            return False
+        self._leases[session_id] = (owner, time.monotonic() + ttl_seconds)
+        return True
+
+    async def renew_lease(self, session_id: str, owner: str, ttl_seconds: float) -> bool:
+        holder = self._leases.get(session_id)
+        if not holder or holder[0] != owner or holder[1] <= time.monotonic():
+            return False
+        self._leases[session_id] = (owner, time.monotonic() + ttl_seconds)
+        return True
+
+    async def release_lease(self, session_id: str, owner: str):
+        holder = self._leases.get(session_id)
+        if holder and holder[0] == owner:
+            del self._leases[session_id]
+
+    async def lease_owner(self, session_id: str) -> Optional[str]:
+        holder = self._leases.get(session_id)
+        return holder[0] if holder and holder[1] > time.monotonic() else None
+
+    async def append_events(self, session_id: str, events: List[Dict[str, Any]], max_entries: int,
+                            ttl_seconds: float, reset: bool = False) -> List[str]:
+        # The TTL is not applied; the process-local log lives as long as the process
+        stream = [] if reset else self._events.get(session_id, [])
+        ids = []
+        for event in events:
+            self._event_counters[session_id] = self._event_counters.get(session_id, 0) + 1
+            ids.append(f"{self._event_counters[session_id]}-0")
+            stream.append((ids[-1], json.dumps(event)))
+        self._events[session_id] = stream[-max_entries:]
+        self._events_appended.set()
+        self._events_appended = asyncio.Event()
+        return ids
+
+    async def read_events(self, cursors: Dict[str, str], count: int,
+                          block_seconds: Optional[float] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        deadline = time.monotonic() + (block_seconds or 0)
+        while True:
+            appended = self._events_appended
+            events = {}
+            for session_id, after in cursors.items():
+                after_key = event_id_key(after)
+                new = [(event_id, json.loads(event)) for event_id, event in self._events.get(session_id, [])
+                       if event_id_key(event_id) > after_key][:count]
+                if new:
+                    events[session_id] = new
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            try:
+                await asyncio.wait_for(appended.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def touch_followers(self, session_id: str, ttl_seconds: float):
+        self._followers[session_id] = time.monotonic() + ttl_seconds
+
+    async def has_followers(self, session_id: str) -> bool:
+        return self._followers.get(session_id, 0) > time.monotonic()
+
+    async def get_all_session_states(self) -> Dict[str, Any]:
+        return {session_id: await self.load_session(session_id, include_messages=False) for session_id in self._sessions}
+
+    async def index_conversation(self, conversation: Dict[str, Any]):
+        if conversation["id"] not in self._conversations:
+            bisect.insort(self._index, (created_at_score(conversation["created_at"]), conversation["id"]))
+        self._conversations[conversation["id"]] = copy.deepcopy(conversation)
+
+    async def list_conversations(self, user_id: Optional[str] = None, cursor: Optional[str] = None,
+                                 limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        end = bisect.bisect_left(self._index, decode_cursor(cursor)) if cursor else len(self._index)
+        page = []
+        for score, conversation_id in reversed(self._index[:end]):
+            conversation = self._conversations[conversation_id]
+            if user_id and conversation["user_id"] != user_id:
+                continue
+            page.append((score, copy.deepcopy(conversation)))
+            if limit and len(page) == limit:
+                break
+        next_cursor = encode_cursor(page[-1][0], page[-1][1]["id"]) if limit and len(page) == limit else None
+        return [conversation for _, conversation in page], next_cursor
@@ -0,0 +1,117 @@
+# session_codec.py
+import json
+from typing import Any, Callable, Dict, Tuple
+
+# Encoded values start with a 3-byte header: format version, codec id, compression id.
+# Anything else is a value written before codecs existed (plain JSON text) and is
+# decoded as such, so existing sessions keep loading and are re-encoded on their next write.
+FORMAT_VERSION = 1
+
+CODEC_IDS = {"json": 1, "orjson": 2, "msgpack": 3}
+COMPRESSION_IDS = {"none": 0, "zstd": 1, "lz4": 2}
+
+Serializer = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+def _json_codec() -> Serializer:
+    return (
+        lambda value: json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+        json.loads,
+    )
+
+
+def _orjson_codec() -> Serializer:
+    import orjson
+    return orjson.dumps, orjson.loads
+
+
+def _msgpack_codec() -> Serializer:
+    try:
+        import ormsgpack
+        return ormsgpack.packb, ormsgpack.unpackb
+    except ImportError:
+        import msgpack
+        return (lambda value: msgpack.packb(value, use_bin_type=True)), (lambda data: msgpack.unpackb(data, raw=False))
+
+
+def _zstd_compression():
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=3)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def _lz4_compression():
+    import lz4.frame
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+_CODEC_FACTORIES = {"json": _json_codec, "orjson": _orjson_codec, "msgpack": _msgpack_codec}
+_COMPRESSION_FACTORIES = {"zstd": _zstd_compression, "lz4": _lz4_compression}
+_codecs: Dict[str, Serializer] = {}
+_compressions: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {}
+
+
+def _get_codec(name: str) -> Serializer:
+    if name not in _codecs:
+        _codecs[name] = _CODEC_FACTORIES[name]()
+    return _codecs[name]
+
+
+def _get_compression(name: str):
+    if name not in _compressions:
+        _compressions[name] = _COMPRESSION_FACTORIES[name]()
+    return _compressions[name]
+
+
+def _available(factory) -> bool:
+    try:
+        factory()
+        return True
+    except ImportError:
+        return False
+
+
+class SessionCodec:
+    """
+    Serializes session values for storage.
+
+    `codec` picks the serializer (json, orjson or msgpack) and values of at least
+    `compression_threshold` bytes are compressed with `compression` (zstd or lz4).
+    A serializer or compressor whose package is not installed falls back to json /
+    no compression. Decoding reads the header, so values written with any other
+    configuration, or as legacy JSON text, still decode.
+    """
+
+    def __init__(self, codec: str = "json", compression: str = "none", compression_threshold: int = 1024):
+        if codec != "json" and not _available(_CODEC_FACTORIES[codec]):
+            print(f"Session codec {codec} is not installed, using json")
+            codec = "json"
+        if compression != "none" and not _available(_COMPRESSION_FACTORIES[compression]):
+            print(f"Session compression {compression} is not installed, storing uncompressed")
+            compression = "none"
+        self.codec = codec
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+    def encode(self, value: Any) -> bytes:
+        dumps, _ = _get_codec(self.codec)
+        payload = dumps(value)
+        compression = self.compression
+        if compression != "none" and len(payload) >= self.compression_threshold:
+            payload = _get_compression(compression)[0](payload)
+        else:
+            compression = "none"
+        return bytes((FORMAT_VERSION, CODEC_IDS[self.codec], COMPRESSION_IDS[compression])) + payload
+
+    def decode(self, data: bytes | str) -> Any:
+        if isinstance(data, str):
+            return json.loads(data)
+        if not data or data[0] != FORMAT_VERSION:
+            return json.loads(data)
+        codec = next(name for name, codec_id in CODEC_IDS.items() if codec_id == data[1])
+        compression = next(name for name, compression_id in COMPRESSION_IDS.items() if compression_id == data[2])
+        payload = data[3:]
+        if compression != "none":
+            payload = _get_compression(compression)[1](payload)
+        return _get_codec(codec)[1](payload)
@@ -1,60 +1,136 @@
 # session_store.py
-import json
-from redis_client import redis_client
-from state import INITIAL_STATE
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
 
-SESSION_PREFIX = "session:"
+from session_backends import InMemorySessionBackend, RedisSessionBackend, SessionBackend
+from session_codec import SessionCodec
+from settings import settings
+from tracing import span
 
-def load_session(session_id: str) -> dict:
-    key = SESSION_PREFIX + session_id
-    raw = redis_client.get(key)
+_backend: Optional[SessionBackend] = None
 
-    if raw is None:
-        return INITIAL_STATE.copy()
 
-    return json.loads(raw)
+def get_backend() -> SessionBackend:
+    """Return the configured session backend ("redis" or "memory"), creating it on first use."""
+    global _backend
+    if _backend is None:
+        if settings.session_backend == "memory":
+            _backend = InMemorySessionBackend()
+        else:
+            from redis_client import redis_client
+            _backend = RedisSessionBackend(redis_client, SessionCodec(
+                codec=settings.session_codec,
+                compression=settings.session_compression,
+                compression_threshold=settings.session_compression_threshold,
+            ))
+    return _backend
 
 
-def save_session(session_id: str, state: dict):
-    key = SESSION_PREFIX + session_id
-    redis_client.set(key, json.dumps(state))
+def set_backend(backend: SessionBackend):
+    """Swap the session backend, e.g. for an in-memory one in tests and benchmarks."""
+    global _backend
+    _backend = backend
 
 
-def get_all_session_states() -> Dict[str, Any]:
+async def load_session(session_id: str, include_messages: bool = True) -> dict:
     """
-    Fetch all session states from Redis whose keys start with SESSION_PREFIX.
+    Load a session. Pass include_messages=False when the caller does not need
+    the message history; the returned state then has no "messages" key and
+    saving it leaves the stored messages untouched.
+    """
+    with span("session.load", {"session.id": session_id, "session.include_messages": include_messages}) as s:
+        state = await get_backend().load_session(session_id, include_messages)
+        s.set_attribute("session.messages", len(state.get("messages", [])))
+        return state
+
+
+async def save_session(session_id: str, state: dict):
+    with span("session.save", {"session.id": session_id}):
+        await get_backend().save_session(session_id, state)
+
+
+async def load_checkpoint(session_id: str) -> Tuple[Optional[bytes], int]:
+    with span("session.load_checkpoint", {"session.id": session_id}):
+        return await get_backend().load_checkpoint(session_id)
+
+
+async def save_checkpoint(session_id: str, fields: Dict[str, Any], new_messages: List[Dict[str, Any]],
+                          checkpoint: bytes, expected_version: int, replace_messages: bool = False) -> int:
+    """
+    Write one workflow step's state delta if the session is still at `expected_version`;
+    see SessionBackend.save_checkpoint. Raises SessionConflictError otherwise.
+    """
+    with span("session.save_checkpoint", {"session.id": session_id, "session.version": expected_version}):
+        return await get_backend().save_checkpoint(session_id, fields, new_messages, checkpoint,
+                                                   expected_version, replace_messages)
+
+
+async def acquire_lease(session_id: str, owner: str, ttl_seconds: float) -> bool:
+    """Take the per-conversation lease that allows running its workflow; False while another owner holds it."""
+    return await get_backend().acquire_lease(session_id, owner, ttl_seconds)
+
+
+async def renew_lease(session_id: str, owner: str, ttl_seconds: float) -> bool:
+    return await get_backend().renew_lease(session_id, owner, ttl_seconds)
+
+
+async def release_lease(session_id: str, owner: str):
+    await get_backend().release_lease(session_id, owner)
+
+
+async def lease_owner(session_id: str) -> Optional[str]:
+    return await get_backend().lease_owner(session_id)
+
+
+async def append_events(session_id: str, events: List[Dict[str, Any]], reset: bool = False) -> List[str]:
+    """
+    Append SSE events to the conversation's event log and return their ids. `reset`
+    empties the log first, as each turn starts a new one.
+    """
+    with span("session.append_events", {"session.id": session_id, "events": len(events)}):
+        return await get_backend().append_events(session_id, events, settings.stream_event_max_entries,
+                                                  settings.stream_event_ttl_seconds, reset)
+
+
+async def read_events(cursors: Dict[str, str], block_seconds: Optional[float] = None) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    """Events after each conversation's cursor id; see SessionBackend.read_events."""
+    return await get_backend().read_events(cursors, settings.stream_event_read_count, block_seconds)
+
+
+async def touch_followers(session_id: str):
+    await get_backend().touch_followers(session_id, settings.stream_resume_grace_seconds)
+
+
+async def has_followers(session_id: str) -> bool:
+    return await get_backend().has_followers(session_id)
+
+
+async def get_all_session_states() -> Dict[str, Any]:
+    """
+    Fetch all session states, without message histories.
     Returns:
         {
           "<session_id>": <session_state_dict>,
           ...
         }
     """
-    sessions: Dict[str, Any] = {}
-    cursor = 0
-
-    while True:
-        cursor, keys = redis_client.scan(
-            cursor=cursor,
-            match=f"{SESSION_PREFIX}*",
-            count=100
-        )
+    with span("session.get_all"):
+        return await get_backend().get_all_session_states()
 
-        for key in keys:
-            raw_value = redis_client.get(key)
-            if raw_value is None:
-                continue
 
-            try:
-                session_state = json.loads(raw_value)
-            except json.JSONDecodeError:
-                # Skip corrupted or non-JSON values
-                continue
+async def index_conversation(conversation: Dict[str, Any]):
+    """Record a conversation's metadata in the listing index."""
+    with span("session.index_conversation"):
+        await get_backend().index_conversation(conversation)
 
-            session_id = key.replace(SESSION_PREFIX, "", 1)
-            sessions[session_id] = session_state
 
-        if cursor == 0:
-            break
+async def list_conversations(user_id: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    List conversation metadata, newest first.
 
-    return sessions
+    `cursor` is the value returned as the second element by the previous page;
+    it is None when there are no more pages.
+    """
+    with span("session.list_conversations", {"limit": limit}) as s:
+        conversations, next_cursor = await get_backend().list_conversations(user_id=user_id, cursor=cursor, limit=limit)
+        s.set_attribute("conversations", len(conversations))
+        return conversations, next_cursor
@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,6 +12,126 @@ class Settings(BaseSettings):
     google_api_key: str
     debug: bool = False
     clockify_user_id: str
+    clockify_api_base_url: str = "https://api.clockify.me/api/v1"
+    clockify_reports_base_url: str = "https://reports.api.clockify.me/v1"
+    clockify_max_connections: int = 20
+    clockify_requests_per_second: float = 10.0
+    clockify_timeout_seconds: float = 30.0
+    clockify_cache_enabled: bool = True
+    clockify_cache_ttl_seconds: int = 6 * 60 * 60
+    clockify_cache_max_entries: int = 256
+    context_prefetch_enabled: bool = True
+    # Clockify descriptions are filtered locally before the LLM sees them (tools/activity_filter.py):
+    # non-development entries (an exclude keyword and no keep keyword; keywords are regular
+    # expressions matched as whole words, unset for the defaults there) are dropped, and
+    # descriptions merged when they are the same after normalization or similar (character
+    # shingle Jaccard similarity of at least the threshold). At most max_items activities are
+    # sent, ranked by time logged.
+    activity_filter_enabled: bool = True
+    activity_exclude_keywords: Optional[List[str]] = None
+    activity_keep_keywords: Optional[List[str]] = None
+    activity_similarity_threshold: float = 0.7
+    activity_max_items: int = 200
+
+    # Session storage: "redis" or "memory" (single process, nothing persisted)
+    session_backend: Literal["redis", "memory"] = "redis"
+    redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 50
+    redis_pool_timeout_seconds: float = 5.0
+    # Stored session encoding; values of at least the threshold (bytes) are compressed
+    session_codec: Literal["json", "orjson", "msgpack"] = "orjson"
+    session_compression: Literal["none", "zstd", "lz4"] = "zstd"
+    session_compression_threshold: int = 1024
+
+    # Chat model of every workflow node, unless overridden for the node in llm_node_models:
+    # a JSON object from node (project_intake, context_builder, evaluation) to any of
+    # model, temperature, max_output_tokens and streaming, e.g.
+    # LLM_NODE_MODELS='{"context_builder": {"model": "gemini-2.5-flash-lite", "temperature": 0}}'.
+    # Nodes with the same resulting configuration share one client.
+    llm_model: str = "gemini-2.5-flash"
+    llm_temperature: float = 0.3
+    llm_max_output_tokens: Optional[int] = None
+    llm_streaming: bool = True
+    llm_node_models: Dict[str, Dict[str, Any]] = {}
+
+    # Evaluation prompt prefix: kept in the provider's context cache for this long (seconds)
+    llm_context_cache_enabled: bool = True
+    llm_context_cache_ttl_seconds: int = 60 * 60
+    # Exact-match cache of LLM responses (in-process LRU, plus Redis with the redis session
+    # backend), keyed by the normalized messages, bound tools and model settings
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 6 * 60 * 60
+    llm_cache_max_entries: int = 512
+    # Every LLM request goes through the gateway: at most llm_max_concurrency in flight per
+    # process (others queue), each call done within the call timeout (queueing and retries
+    # included), a stream's first token and each next chunk within their timeouts, and
+    # retryable errors (429, 5xx, timeouts) retried with jittered exponential backoff
+    llm_max_concurrency: int = 16
+    llm_call_timeout_seconds: float = 120.0
+    llm_first_token_timeout_seconds: float = 30.0
+    llm_stream_idle_timeout_seconds: float = 30.0
+    llm_max_retries: int = 2
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8.0
+    # Hedging: a duplicate request is sent when the first token (the reply, for ainvoke) is
+    # later than the p95 of recent calls, if a slot is free; the first to answer is used.
+    # Doubles the cost of the slowest calls, so it is off by default.
+    llm_hedge_enabled: bool = False
+    llm_hedge_min_samples: int = 20
+    llm_hedge_min_delay_seconds: float = 1.0
+
+    # History sent to the LLM: the last turns verbatim, older ones in a rolling summary.
+    # Budgets are estimated tokens of history per agent, excluding the system prompt.
+    history_keep_last_turns: int = 4
+    history_summary_batch_turns: int = 2
+    intake_history_token_budget: int = 2000
+    evaluation_history_token_budget: int = 3000
+    # Generate the opening question of every pending outcome in the background once the
+    # context is built, so moving to the next outcome does not wait for the LLM. Costs one
+    # LLM call per outcome up front, also for outcomes the employee never reaches.
+    speculative_opening_questions: bool = False
+
+    # Tracing: spans are written as OTLP/JSON lines to the export path (empty to disable)
+    # and, when set, POSTed to an OTLP/HTTP collector such as http://localhost:4318/v1/traces
+    tracing_enabled: bool = True
+    tracing_export_path: str = "traces.otlp.jsonl"
+    tracing_otlp_endpoint: Optional[str] = None
+    tracing_flush_interval_seconds: float = 2.0
+    # Fraction of hot-path events (e.g. each streamed SSE chunk) that are logged
+    log_sample_rate: float = 0.01
+
+    # Chat SSE streams: events buffered per response, how often a quiet stream checks that the
+    # client is still connected, and how long without workflow events before giving up
+    stream_queue_max_events: int = 256
+    stream_disconnect_poll_seconds: float = 1.0
+    stream_idle_timeout_seconds: float = 120.0
+    # Lease on a conversation while a worker runs its workflow; renewed every third of it,
+    # so it only runs out when the worker died
+    conversation_lease_seconds: float = 30.0
+    # Each turn's SSE events go to an event log in the session store, from which any worker
+    # serves them (live, or replayed after last_event_id). The turn batches message chunks
+    # for up to the flush interval per append; each worker reads the logs its responses
+    # follow with one blocking read of up to the read block. The log expires after the TTL.
+    stream_event_flush_seconds: float = 0.05
+    stream_event_read_block_seconds: float = 0.25
+    stream_event_read_count: int = 500
+    stream_event_max_entries: int = 10000
+    stream_event_ttl_seconds: float = 60 * 60
+    # A turn keeps running this long after its last response went away, so a client that
+    # reconnects (to any worker) with last_event_id gets the rest of the reply
+    stream_resume_grace_seconds: float = 10.0
+
+    # Startup warm-up (warmup.py): the session store's connection pool (this many connections),
+    # LLM clients, workflow graph and Clockify connections, in the background; /api/health/ready
+    # reports ready once it is done. Failed required steps are retried after the retry delay.
+    warmup_enabled: bool = True
+    warmup_redis_connections: int = 10
+    warmup_retry_seconds: float = 5.0
+
+    # batch.py: rows drafted at once, and context builder LLM calls per second across them
+    # (Clockify calls go through the client's own rate limit)
+    batch_concurrency: int = 8
+    batch_llm_requests_per_second: float = 2.0
 
     # This tells Pydantic to read from a .env file
     model_config = SettingsConfigDict(env_file=env_path)
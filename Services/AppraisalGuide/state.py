@@ -1,8 +1,22 @@
 # state.py
-from typing import TypedDict, List, Dict, Any
+from typing import Annotated, TypedDict, List, Dict, Any
+
+
+def append_messages(messages: List[Dict[str, Any]], new_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reducer for `messages`: nodes and callers return only the messages they add.
+    A message without a message_section continues the section of the one before it.
+    """
+    merged = list(messages)
+    for message in new_messages:
+        if "message_section" not in message:
+            message = {**message, "message_section": merged[-1].get("message_section", "General") if merged else "General"}
+        merged.append(message)
+    return merged
+
 
 class AppState(TypedDict):
-    messages: List[Dict[str, Any]]
+    messages: Annotated[List[Dict[str, Any]], append_messages]
     project_context: Dict[str, Any]
     current_node_complete: bool
     wait_for_user_input: bool
@@ -11,10 +25,12 @@ class AppState(TypedDict):
     designation: str
     error: str
     clockify_data: Dict[str, Any]
+    feedback_data: Dict[str, Any]
     feedback_document_path: str
     completed_outcomes: List[str]
     outcome_under_evaluation: str
     context_builder_data: Dict[str, Any]
+    history_summaries: Dict[str, Any]
 
 INITIAL_STATE: AppState = {
     "messages": [],
@@ -27,7 +43,9 @@ INITIAL_STATE: AppState = {
     "error": "",
     "completed_outcomes": [],
     "clockify_data": {},
+    "feedback_data": {},
     "feedback_document_path": "",
     "outcome_under_evaluation": "",
-    "context_builder_data": {}
+    "context_builder_data": {},
+    "history_summaries": {}
 }
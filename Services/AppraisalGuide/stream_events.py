@@ -0,0 +1,75 @@
+# stream_events.py
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class EventQueue:
+    """
+    Bounded queue of workflow events for one SSE response.
+
+    Backpressure: a `message` event is appended to the text of a `message`
+    for the same step still waiting at the tail, so a slow client gets fewer,
+    larger text chunks and never loses text. Any other event waits for room
+    while the queue holds `maxsize` events, which pauses the workflow.
+
+    `close()` ends the stream: `get` returns the remaining events, then None,
+    and producers blocked in `put` return without queueing.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._closed = False
+        self.coalesced = 0
+
+    def _merge(self, event: Dict[str, Any]) -> bool:
+        if event["type"] == "message" and self._events:
+            tail = self._events[-1]
+            if tail["type"] == "message" and tail.get("current_step") == event.get("current_step"):
+                # The merged event carries the later event's other fields, e.g. its event_id
+                self._events[-1] = {**event, "data": tail["data"] + event["data"]}
+                self.coalesced += 1
+                return True
+        return False
+
+    async def put(self, event: Dict[str, Any]):
+        if self._merge(event):
+            return
+        while len(self._events) >= self.maxsize and not self._closed:
+            self._not_full.clear()
+            await self._not_full.wait()
+        if self._closed:
+            return
+        self._events.append(event)
+        self._not_empty.set()
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue without waiting; False when the event would have to wait for room."""
+        if self._closed or self._merge(event):
+            return True
+        if len(self._events) >= self.maxsize:
+            return False
+        self._events.append(event)
+        self._not_empty.set()
+        return True
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        while not self._events:
+            if self._closed:
+                return None
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        event = self._events.popleft()
+        self._not_full.set()
+        return event
+
+    def close(self):
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __len__(self) -> int:
+        return len(self._events)
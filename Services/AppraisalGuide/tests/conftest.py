@@ -0,0 +1,21 @@
+# tests/conftest.py
+"""
+Run from Services/AppraisalGuide, with the dev dependency group (pytest, fakeredis):
+    uv run pytest
+    python -m pytest tests    # in an environment with the dev group installed
+"""
+import os
+import sys
+
+# Settings are read at import time; tests run without a .env, Redis or Clockify
+for name, value in {
+    "CLOCKIFY_API_KEY": "test",
+    "CLOCKIFY_WORKSPACE_ID": "test",
+    "CLOCKIFY_USER_ID": "test",
+    "GOOGLE_API_KEY": "test",
+    "SESSION_BACKEND": "memory",
+    "TRACING_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+# tests/test_clockify_cache.py
+import asyncio
+
+import tools.clockify_cache as clockify_cache
+from tools.clockify_cache import ClockifyReportCache
+
+
+class FakeClockifyClient:
+    """Answers report requests from a fixed list of entries, recording the ranges asked for."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.requests = []
+
+    async def get_time_entries(self, project_id, user_id, rangeStart, rangeEnd):
+        self.requests.append((rangeStart, rangeEnd))
+        start, end = clockify_cache._parse(rangeStart), clockify_cache._parse(rangeEnd)
+        return [e for e in self.entries if start <= clockify_cache._parse(e["timeInterval"]["start"]) <= end]
+
+
+def entry(entry_id, start):
+    return {"_id": entry_id, "description": f"work {entry_id}", "timeInterval": {"start": start, "duration": 3600}}
+
+
+def test_date_only_end_keeps_entries_of_that_day(monkeypatch):
+    client = FakeClockifyClient([
+        entry("a", "2024-03-01T09:00:00Z"),
+        entry("b", "2024-03-31T00:00:00Z"),
+        entry("c", "2024-03-31T17:30:00Z"),
+        entry("d", "2024-04-01T09:00:00Z"),
+    ])
+    monkeypatch.setattr(clockify_cache, "get_clockify_client", lambda: client)
+    cache = ClockifyReportCache(ttl_seconds=60, max_entries=8)
+
+    entries = asyncio.run(cache.get_time_entries("project", "user", "2024-03-01", "2024-03-31"))
+
+    assert [e["_id"] for e in entries] == ["c", "b", "a"]
+    assert client.requests == [("2024-03-01T00:00:00.000Z", "2024-03-31T23:59:59.999Z")]
+
+    # The whole last day is recorded as covered: asking again is a hit
+    entries = asyncio.run(cache.get_time_entries("project", "user", "2024-03-01", "2024-03-31"))
+    assert [e["_id"] for e in entries] == ["c", "b", "a"]
+    assert len(client.requests) == 1
+
+
+def test_entries_come_newest_first_across_utc_offsets(monkeypatch):
+    client = FakeClockifyClient([
+        entry("early", "2024-03-05T23:30:00+00:00"),
+        # 2024-03-05T23:00:00Z: sorts after "early" as a string, but started before it
+        entry("late_offset", "2024-03-06T01:00:00+02:00"),
+        entry("latest", "2024-03-06T08:00:00Z"),
+    ])
+    monkeypatch.setattr(clockify_cache, "get_clockify_client", lambda: client)
+    cache = ClockifyReportCache(ttl_seconds=60, max_entries=8)
+
+    entries = asyncio.run(cache.get_time_entries("project", "user", "2024-03-01", "2024-03-31"))
+
+    assert [e["_id"] for e in entries] == ["latest", "early", "late_offset"]
@@ -0,0 +1,78 @@
+# tests/test_json_scanner.py
+import json
+import random
+import string
+
+from utils import JSONFieldStreamer, JSONStreamScanner
+
+SEED = 0
+RUNS = 300
+TRICKY = ['{', '}', '"', '\\', '\\"', '{"a": 1}', 'é', '😀', '\n', ' ', "status", "complete"]
+
+
+def random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(TRICKY + list(string.ascii_letters)) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randint(0, 5 if depth < 4 else 2)
+    if kind == 0:
+        return random_string(rng)
+    if kind == 1:
+        return rng.choice([rng.randint(-1000, 1000), rng.random(), True, False, None])
+    if kind == 2:
+        return random_string(rng)
+    if kind == 3:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return random_object(rng, depth + 1)
+
+
+def random_object(rng: random.Random, depth: int = 0) -> dict:
+    return {random_string(rng): random_value(rng, depth) for _ in range(rng.randint(0, 5))}
+
+
+def random_prose(rng: random.Random) -> str:
+    # Prose may contain quotes and closing braces, but an opening brace always starts an object
+    return "".join(rng.choice(string.ascii_letters + ' .,!?"}\n`') for _ in range(rng.randint(0, 40)))
+
+
+def split_randomly(rng: random.Random, text: str):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 30)))) if len(text) > 1 else []
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_scanner_recovers_objects_and_prose_whatever_the_chunks():
+    rng = random.Random(SEED)
+    for run in range(RUNS):
+        objects = [random_object(rng) for _ in range(rng.randint(0, 3))]
+        prose = [random_prose(rng) for _ in range(len(objects) + 1)]
+        text = prose[0] + "".join(json.dumps(o, ensure_ascii=rng.random() < 0.5) + p for o, p in zip(objects, prose[1:]))
+
+        scanner = JSONStreamScanner()
+        forwarded = "".join(scanner.feed(chunk) for chunk in split_randomly(rng, text))
+        assert scanner.objects == objects, f"run {run}: objects differ for {text!r}"
+        assert forwarded == "".join(prose), f"run {run}: prose differs for {text!r}"
+        assert not scanner.in_object
+
+
+def test_field_streamer_streams_top_level_string_fields_whatever_the_chunks():
+    rng = random.Random(SEED)
+    for run in range(RUNS):
+        obj = random_object(rng)
+        strings = {key: value for key, value in obj.items() if isinstance(value, str)}
+        # Some of the string fields, and a field the object does not have
+        fields = [key for key in strings if rng.random() < 0.5] + ["absent"]
+        text = random_prose(rng) + json.dumps(obj, ensure_ascii=rng.random() < 0.5) + random_prose(rng)
+        if rng.random() < 0.5:
+            # Only the first object is read
+            text += json.dumps(random_object(rng))
+
+        streamer = JSONFieldStreamer(fields)
+        streamed = {}
+        for chunk in split_randomly(rng, text):
+            for field, piece in streamer.feed(chunk):
+                assert piece, f"run {run}: empty piece for {text!r}"
+                streamed[field] = streamed.get(field, "") + piece
+        assert streamer.values == strings, f"run {run}: values differ for {text!r}"
+        assert streamed == {key: value for key, value in strings.items() if key in fields and value}, \
+            f"run {run}: streamed fields differ for {text!r}"
@@ -0,0 +1,207 @@
+# tests/test_session_backends.py
+import asyncio
+
+import fakeredis
+import pytest
+
+import conversation_turns
+import session_store
+from conversation_turns import follow_events, join_or_start_turn
+from session_backends import InMemorySessionBackend, RedisSessionBackend, SessionConflictError, event_id_key
+
+BACKENDS = ["memory", "redis"]
+
+
+def make_backend(kind: str):
+    if kind == "redis":
+        return RedisSessionBackend(fakeredis.FakeAsyncRedis())
+    return InMemorySessionBackend()
+
+
+async def list_all_pages(backend, limit: int, user_id=None):
+    ids, cursor = [], None
+    while True:
+        conversations, cursor = await backend.list_conversations(user_id=user_id, cursor=cursor, limit=limit)
+        ids.extend(c["id"] for c in conversations)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+def test_list_conversations_pages_through_created_at_ties(kind, limit):
+    async def run():
+        backend = make_backend(kind)
+        # Seven conversations, five of them created at the same moment, across page boundaries
+        created = ["2024-05-01T10:00:00"] + ["2024-05-02T10:00:00"] * 5 + ["2024-05-03T10:00:00"]
+        for index, created_at in enumerate(created):
+            await backend.index_conversation({"id": f"conv-{index}", "user_id": "user", "created_at": created_at})
+
+        # Newest first; conversations created at the same moment by id, descending (Redis' order)
+        expected = ["conv-6", "conv-5", "conv-4", "conv-3", "conv-2", "conv-1", "conv-0"]
+        assert await list_all_pages(backend, limit) == expected
+        assert await list_all_pages(backend, limit, user_id="user") == expected
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_save_checkpoint_versions_and_rejects_stale_writers(kind):
+    async def run():
+        backend = make_backend(kind)
+        assert await backend.load_checkpoint("conv") == (None, 0)
+
+        version = await backend.save_checkpoint("conv", {"current_step": "intake"}, [{"id": "m1"}], b"one", 0)
+        assert version == 1
+        version = await backend.save_checkpoint("conv", {"current_step": "evaluation"}, [{"id": "m2"}], b"two", version)
+        assert version == 2
+        assert await backend.load_checkpoint("conv") == (b"two", 2)
+
+        # A writer that loaded version 1 lost the race and must not overwrite version 2
+        with pytest.raises(SessionConflictError):
+            await backend.save_checkpoint("conv", {"current_step": "stale"}, [{"id": "m3"}], b"stale", 1)
+        assert await backend.load_checkpoint("conv") == (b"two", 2)
+        session = await backend.load_session("conv")
+        assert session["current_step"] == "evaluation"
+        assert [m["id"] for m in session["messages"]] == ["m1", "m2"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_lease_is_held_by_one_owner(kind):
+    async def run():
+        backend = make_backend(kind)
+        assert await backend.acquire_lease("conv", "worker-a", 30)
+        assert not await backend.acquire_lease("conv", "worker-b", 30)
+        assert await backend.lease_owner("conv") == "worker-a"
+
+        # Someone else can neither extend nor drop the lease
+        assert not await backend.renew_lease("conv", "worker-b", 30)
+        await backend.release_lease("conv", "worker-b")
+        assert await backend.lease_owner("conv") == "worker-a"
+
+        assert await backend.renew_lease("conv", "worker-a", 30)
+        await backend.release_lease("conv", "worker-a")
+        assert await backend.lease_owner("conv") is None
+        assert await backend.acquire_lease("conv", "worker-b", 30)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_join_or_start_turn_follows_duplicates_and_rejects_other_messages(kind, monkeypatch):
+    async def run():
+        monkeypatch.setattr(session_store, "_backend", make_backend(kind))
+
+        owner, turn = await join_or_start_turn("conv", "What did I work on?")
+        assert turn is not None and owner == turn.owner
+        assert await session_store.lease_owner("conv") == owner
+
+        # The same message again (e.g. a retried request, on any worker) follows the running turn
+        assert await join_or_start_turn("conv", "What did I work on?") == (owner, None)
+        # Another message has to wait for the turn to finish
+        assert await join_or_start_turn("conv", "Something else") == (None, None)
+
+        await session_store.release_lease("conv", owner)
+        owner, turn = await join_or_start_turn("conv", "Something else")
+        assert turn is not None and owner == turn.owner
+
+    asyncio.run(run())
+
+
+def message(text: str):
+    return {"type": "message", "data": text, "current_step": "evaluation"}
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_event_ids_keep_increasing_across_log_resets(kind):
+    async def run():
+        backend = make_backend(kind)
+        ids = []
+        for turn in range(5):
+            # Each turn starts a new log, often within the same millisecond as the last append
+            ids += await backend.append_events("conv", [message(f"{turn}a"), message(f"{turn}b")], 100, 60, reset=True)
+            ids += await backend.append_events("conv", [message(f"{turn}c")], 100, 60)
+        keys = [event_id_key(event_id) for event_id in ids]
+        assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+        # Only the last turn's events are left
+        entries = (await backend.read_events({"conv": "0-0"}, 100))["conv"]
+        assert [event["data"] for _, event in entries] == ["4a", "4b", "4c"]
+        assert [event_id for event_id, _ in entries] == ids[-3:]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_read_events_returns_events_after_the_cursor_up_to_count(kind):
+    async def run():
+        backend = make_backend(kind)
+        ids = await backend.append_events("conv", [message(str(n)) for n in range(10)], 100, 60)
+        await backend.append_events("other", [message("other")], 100, 60)
+
+        events = await backend.read_events({"conv": ids[3]}, 4)
+        assert list(events) == ["conv"]
+        assert [(event_id, event["data"]) for event_id, event in events["conv"]] == [(ids[n], str(n)) for n in range(4, 8)]
+
+        assert await backend.read_events({"conv": ids[-1]}, 4) == {}
+        events = await backend.read_events({"conv": ids[-2], "other": "0-0"}, 4)
+        assert [event["data"] for _, event in events["conv"]] == ["9"]
+        assert [event["data"] for _, event in events["other"]] == ["other"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_follow_events_of_a_turn_skips_the_previous_turn(kind, monkeypatch):
+    async def run():
+        monkeypatch.setattr(session_store, "_backend", make_backend(kind))
+        monkeypatch.setattr(conversation_turns, "_reader", None)
+
+        # The previous turn's log is still there when the new turn's response starts following
+        await session_store.append_events("conv", [
+            {"type": "turn", "data": "owner-a"}, message("old"), {"type": "complete", "data": ""},
+        ], reset=True)
+        assert await session_store.acquire_lease("conv", "owner-b", 30)
+
+        async def collect():
+            return [event async for event in follow_events("conv", turn_owner="owner-b") if event is not None]
+
+        follower = asyncio.create_task(collect())
+        await asyncio.sleep(0.05)
+        await session_store.append_events("conv", [{"type": "turn", "data": "owner-b"}, message("new")], reset=True)
+        await session_store.append_events("conv", [message(" reply"), {"type": "complete", "data": ""}])
+        events = await asyncio.wait_for(follower, 5)
+
+        # Message chunks may reach the follower merged; the text is what counts
+        assert "".join(event["data"] for event in events if event["type"] == "message") == "new reply"
+        assert [event["type"] for event in events if event["type"] != "message"] == ["complete"]
+        assert events[-1]["type"] == "complete"
+        keys = [event_id_key(event["event_id"]) for event in events]
+        assert keys == sorted(keys)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_turn_releases_its_lease_when_the_event_log_fails(kind, monkeypatch):
+    async def run():
+        backend = make_backend(kind)
+        monkeypatch.setattr(session_store, "_backend", backend)
+
+        async def failing_append(*args, **kwargs):
+            raise ConnectionError("event log unavailable")
+
+        owner, turn = await join_or_start_turn("conv", "What did I work on?")
+        monkeypatch.setattr(backend, "append_events", failing_append)
+
+        async def workflow(stream_callback):
+            await stream_callback({"type": "status", "data": "Starting"})
+
+        turn.start(workflow)
+        # The final flush fails too; the turn still ends cleanly and gives up the lease
+        assert await asyncio.wait_for(turn.task, 5) is None
+        assert await backend.lease_owner("conv") is None
+
+    asyncio.run(run())
@@ -0,0 +1,201 @@
+# tools/activity_filter.py
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from settings import settings
+
+# Whole words/phrases (regular expressions, case-insensitive). An entry is non-development work
+# when it matches an exclude keyword and no keep keyword, e.g. "Sprint planning meeting" is
+# dropped but "Code review meeting for the login API" is kept.
+DEFAULT_EXCLUDE_KEYWORDS = [
+    r"meetings?", r"stand-?ups?", r"stand up", r"scrum", r"sync(?:-?up)?", r"1:1", r"one[- ]on[- ]one",
+    r"retro(?:spective)?", r"planning", r"grooming", r"refinement", r"demo", r"discussions?", r"calls?",
+    r"catch[- ]?up", r"town ?hall", r"all[- ]hands", r"interviews?", r"training", r"onboarding",
+    r"lunch", r"break", r"leave", r"holiday", r"vacation", r"sick", r"admin", r"timesheets?", r"e-?mails?",
+    r"hr", r"appraisal",
+]
+DEFAULT_KEEP_KEYWORDS = [
+    r"implement\w*", r"fix\w*", r"bugs?", r"hotfix\w*", r"refactor\w*", r"test\w*", r"deploy\w*", r"releas\w*",
+    r"code reviews?", r"reviewed", r"pr", r"pull requests?", r"debug\w*", r"develop\w*", r"features?", r"api",
+    r"endpoints?", r"migrat\w*", r"optimi[sz]\w*", r"integrat\w*", r"build", r"ci", r"pipelines?", r"coding",
+    r"unit tests?", r"schema", r"query", r"performance",
+]
+
+# Ticket ids: ABC-123 anywhere, abc-123 at the start (elsewhere "feature-12" is more likely a name), #123
+TICKET_ID = re.compile(r"^\s*[A-Za-z][A-Za-z0-9]+-\d+\b:?|\b[A-Z][A-Z0-9]+-\d+\b:?|#\d+\b")
+WHITESPACE = re.compile(r"\s+")
+EDGE_PUNCTUATION = " \t-:;,.|/"
+
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+# LSH bands x rows = NUM_PERM; pairs with a similarity of about (1/BANDS)^(1/ROWS) ~ 0.6 or more
+# become candidates, which are then checked against the threshold exactly
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20251)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def clean(description: str) -> str:
+    """The description without ticket ids, with whitespace collapsed and stray edge punctuation removed."""
+    return WHITESPACE.sub(" ", TICKET_ID.sub(" ", description)).strip(EDGE_PUNCTUATION)
+
+
+def normalize(description: str) -> str:
+    """Key under which descriptions count as the same activity: cleaned and case-folded."""
+    return clean(description).casefold()
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> re.Pattern:
+    return re.compile(r"(?<![\w-])(?:" + "|".join(keywords) + r")(?![\w-])", re.IGNORECASE)
+
+
+class ActivityClassifier:
+    """Rule-based split of time entries into development work and everything else."""
+
+    def __init__(self, exclude_keywords: Optional[List[str]] = None, keep_keywords: Optional[List[str]] = None):
+        self._exclude = _keyword_pattern(exclude_keywords or DEFAULT_EXCLUDE_KEYWORDS)
+        self._keep = _keyword_pattern(keep_keywords or DEFAULT_KEEP_KEYWORDS)
+
+    def is_development(self, description: str) -> bool:
+        return not self._exclude.search(description) or bool(self._keep.search(description))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> frozenset:
+    if len(text) <= size:
+        return frozenset([text])
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def minhash(shingle_set: frozenset) -> Tuple[int, ...]:
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingle_set]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def near_duplicate_groups(texts: List[str], threshold: float) -> List[List[int]]:
+    """
+    Indexes of `texts` grouped by near-duplicates: texts whose character shingle sets have a
+    Jaccard similarity of at least `threshold`, directly or through others. Candidate pairs
+    come from MinHash LSH buckets, so the work stays close to linear in the number of texts.
+    """
+    shingle_sets = [shingles(text) for text in texts]
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+    for index, shingle_set in enumerate(shingle_sets):
+        signature = minhash(shingle_set)
+        for band in range(BANDS):
+            buckets[(band, signature[band * ROWS:(band + 1) * ROWS])].append(index)
+
+    for members in buckets.values():
+        for position, i in enumerate(members):
+            for j in members[position + 1:]:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j and jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for index in range(len(texts)):
+        groups[find(index)].append(index)
+    return list(groups.values())
+
+
+def _seconds(entry: Dict[str, Any]) -> int:
+    # Cached entries keep the duration at the top level, report entries under timeInterval
+    if "duration" in entry:
+        return entry["duration"] or 0
+    return (entry.get("timeInterval") or {}).get("duration") or 0
+
+
+def filter_activities(entries: List[Dict[str, Any]], classifier: ActivityClassifier, threshold: float,
+                      max_items: int) -> Dict[str, Any]:
+    """
+    Turn time entries into a ranked list of development activities: non-development entries
+    dropped, descriptions normalized, exact and near-duplicates merged. Each activity is the
+    most frequent wording of its most frequent variant, with the group's entry count and logged seconds;
+    activities are ranked by time logged, then by entry count.
+    """
+    variants: Dict[str, Dict[str, Any]] = {}
+    excluded = 0
+    for entry in entries:
+        description = entry.get("description")
+        if not description:
+            continue
+        if not classifier.is_development(description):
+            excluded += 1
+            continue
+        key = normalize(description)
+        if not key:
+            continue
+        variant = variants.get(key)
+        if variant is None:
+            variant = variants[key] = {"wordings": defaultdict(int), "count": 0, "seconds": 0}
+        variant["wordings"][clean(description)] += 1
+        variant["count"] += 1
+        variant["seconds"] += _seconds(entry)
+
+    keys = list(variants)
+    activities = []
+    for group in near_duplicate_groups(keys, threshold):
+        members = [variants[keys[i]] for i in group]
+        # Most frequent wording; the first seen among equals (groups keep first-seen order)
+        representative = max(members, key=lambda m: m["count"])
+        activities.append({
+            "description": max(representative["wordings"].items(), key=lambda w: w[1])[0],
+            "count": sum(m["count"] for m in members),
+            "seconds": sum(m["seconds"] for m in members),
+            "variants": len(members),
+            "first": min(group),
+        })
+    activities.sort(key=lambda a: (-a["seconds"], -a["count"], a["first"]))
+    for activity in activities:
+        del activity["first"]
+
+    return {
+        "entries": len(entries),
+        "excluded": excluded,
+        "unique": len(variants),
+        "activities": activities[:max_items],
+        "omitted": activities[max_items:],
+    }
+
+
+def format_activities(result: Dict[str, Any]) -> str:
+    """Comma-separated activities, "(xN)" for N merged entries, and a note of any left out."""
+    items = [f"{a['description']} (x{a['count']})" if a["count"] > 1 else a["description"] for a in result["activities"]]
+    omitted = result["omitted"]
+    if omitted:
+        items.append(f"and {len(omitted)} less frequent activities ({sum(a['count'] for a in omitted)} entries)")
+    return ", ".join(items)
+
+
+_classifier: Optional[ActivityClassifier] = None
+
+
+def get_activity_classifier() -> ActivityClassifier:
+    """Return the classifier built from the configured keywords, creating it on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = ActivityClassifier(settings.activity_exclude_keywords, settings.activity_keep_keywords)
+    return _classifier
+
+
+def summarize_activities(entries: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """The activity list sent to the LLM for these entries, with the filter's result."""
+    result = filter_activities(entries, get_activity_classifier(), settings.activity_similarity_threshold,
+                               settings.activity_max_items)
+    return format_activities(result), result
@@ -0,0 +1,240 @@
+# tools/clockify_cache.py
+import asyncio
+import datetime
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from settings import settings
+from tools.clockify_client import get_clockify_client
+from tracing import current_span
+
+CACHE_PREFIX = "clockify_cache:"
+ONE_MS = datetime.timedelta(milliseconds=1)
+
+# A cached segment is {"start": iso, "end": iso, "entries": [...]} and records
+# that every entry for (project, user) inside [start, end] is in `entries`.
+Segment = Dict[str, Any]
+
+
+def _parse(value: str) -> datetime.datetime:
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def _parse_end(value: str) -> datetime.datetime:
+    """Like `_parse`, but a date-only end ("2025-03-31") covers that whole day."""
+    if len(value) == len("YYYY-MM-DD"):
+        return _parse(value) + datetime.timedelta(days=1) - ONE_MS
+    return _parse(value)
+
+
+def _format(value: datetime.datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def _compact_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the descriptions pipeline needs, so cached segments stay small."""
+    return {
+        "_id": entry.get("_id"),
+        "description": entry.get("description", ""),
+        "start": _format(_parse(entry["timeInterval"]["start"])),
+        # Seconds logged, used to rank activities
+        "duration": entry["timeInterval"].get("duration"),
+    }
+
+
+def missing_ranges(segments: List[Segment], start: datetime.datetime, end: datetime.datetime) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """Return the sub-ranges of [start, end] not covered by any cached segment."""
+    gaps = []
+    cursor = start
+    for segment in sorted(segments, key=lambda s: s["start"]):
+        seg_start, seg_end = _parse(segment["start"]), _parse(segment["end"])
+        if seg_end < cursor:
+            continue
+        if seg_start > end:
+            break
+        if seg_start > cursor:
+            gaps.append((cursor, seg_start - ONE_MS))
+        cursor = max(cursor, seg_end + ONE_MS)
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_segments(segments: List[Segment]) -> List[Segment]:
+    """Coalesce overlapping or touching segments, de-duplicating entries by id."""
+    merged: List[Segment] = []
+    for segment in sorted(segments, key=lambda s: s["start"]):
+        if merged and _parse(segment["start"]) <= _parse(merged[-1]["end"]) + ONE_MS:
+            last = merged[-1]
+            seen = {e["_id"] for e in last["entries"]}
+            last["entries"].extend(e for e in segment["entries"] if e["_id"] not in seen)
+            last["end"] = max(last["end"], segment["end"], key=_parse)
+        else:
+            merged.append({"start": segment["start"], "end": segment["end"], "entries": list(segment["entries"])})
+    return merged
+
+
+class ClockifyReportCache:
+    """
+    Read-through cache for Clockify detailed-report entries.
+
+    Entries are cached per (project, user) as a list of covered date-range
+    segments. An in-process LRU sits in front of a Redis tier, both with a TTL.
+    A request for [start, end] only fetches the sub-ranges no segment covers
+    yet and merges them into the cached segments, so re-running the same
+    appraisal window (or a window overlapping a previous one) costs no or
+    fewer Clockify calls.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, redis_client=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Without a Redis client only the in-process tier is used
+        self.redis_client = redis_client
+        self._lru: "OrderedDict[str, Tuple[float, List[Segment]]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "partial_hits": 0,
+            "misses": 0,
+            "lru_hits": 0,
+            "redis_hits": 0,
+            "ranges_fetched": 0,
+            "bytes_served": 0,
+            "bytes_fetched": 0,
+        }
+
+    @staticmethod
+    def _key(project_id: str, user_id: str) -> str:
+        return f"{CACHE_PREFIX}{project_id}:{user_id}"
+
+    async def _load(self, key: str) -> List[Segment]:
+        cached = self._lru.get(key)
+        if cached is not None:
+            expires_at, segments = cached
+            if expires_at > time.monotonic():
+                self._lru.move_to_end(key)
+                self.stats["lru_hits"] += 1
+                return segments
+            del self._lru[key]
+
+        if self.redis_client is None:
+            return []
+        try:
+            raw = await self.redis_client.get(key)
+        except redis.RedisError as e:
+            print(f"Clockify cache read failed: {str(e)}")
+            return []
+        if raw is None:
+            return []
+        self.stats["redis_hits"] += 1
+        segments = json.loads(raw)
+        self._remember(key, segments)
+        return segments
+
+    def _remember(self, key: str, segments: List[Segment]):
+        self._lru[key] = (time.monotonic() + self.ttl_seconds, segments)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def _store(self, key: str, segments: List[Segment]):
+        self._remember(key, segments)
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.set(key, json.dumps(segments), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            print(f"Clockify cache write failed: {str(e)}")
+
+    async def get_time_entries(self, project_id, user_id, rangeStart, rangeEnd) -> List[Dict[str, Any]]:
+        """
+        Return the compact entries in [rangeStart, rangeEnd] in the report's order (see
+        ClockifyClient.get_time_entries): newest first, by start time.
+        """
+        key = self._key(project_id, user_id)
+        start, end = _parse(rangeStart), _parse_end(rangeEnd)
+        segments = await self._load(key)
+        gaps = missing_ranges(segments, start, end)
+
+        uncached = []
+        if gaps:
+            client = get_clockify_client()
+            now = datetime.datetime.now(datetime.timezone.utc)
+            fetched = await asyncio.gather(*(
+                client.get_time_entries(project_id, user_id, _format(gap_start), _format(gap_end))
+                for gap_start, gap_end in gaps
+            ))
+            new_segments = []
+            for (gap_start, gap_end), entries in zip(gaps, fetched):
+                compact = [_compact_entry(e) for e in entries]
+                self.stats["bytes_fetched"] += len(json.dumps(compact))
+                # Time can still be logged after "now", so only the part of
+                # the range up to now is recorded as covered.
+                uncached.extend(e for e in compact if _parse(e["start"]) > now)
+                if gap_start <= now:
+                    new_segments.append({
+                        "start": _format(gap_start),
+                        "end": _format(min(gap_end, now)),
+                        "entries": [e for e in compact if _parse(e["start"]) <= now]
+                    })
+            self.stats["ranges_fetched"] += len(gaps)
+            outcome = "misses" if gaps == [(start, end)] else "partial_hits"
+            self.stats[outcome] += 1
+            current_span().set_attributes({"cache.outcome": outcome, "cache.ranges_fetched": len(gaps)})
+            segments = merge_segments(segments + new_segments)
+            await self._store(key, segments)
+        else:
+            self.stats["hits"] += 1
+            current_span().set_attribute("cache.outcome", "hits")
+
+        result = {}
+        for segment in segments:
+            for entry in segment["entries"]:
+                if start <= _parse(entry["start"]) <= end:
+                    result[entry["_id"]] = entry
+        for entry in uncached:
+            result[entry["_id"]] = entry
+        entries = sorted(result.values(), key=lambda e: _parse(e["start"]), reverse=True)
+        self.stats["bytes_served"] += len(json.dumps(entries))
+        return entries
+
+    async def invalidate(self, project_id: str, user_id: str):
+        key = self._key(project_id, user_id)
+        self._lru.pop(key, None)
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.delete(key)
+        except redis.RedisError as e:
+            print(f"Clockify cache invalidation failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["partial_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+            "lru_size": len(self._lru),
+        }
+
+
+_cache: Optional[ClockifyReportCache] = None
+
+
+def get_clockify_cache() -> ClockifyReportCache:
+    global _cache
+    if _cache is None:
+        redis_client = None
+        if settings.session_backend == "redis":
+            from redis_client import redis_client
+        _cache = ClockifyReportCache(
+            ttl_seconds=settings.clockify_cache_ttl_seconds,
+            max_entries=settings.clockify_cache_max_entries,
+            redis_client=redis_client,
+        )
+    return _cache
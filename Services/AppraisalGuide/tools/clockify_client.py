@@ -0,0 +1,172 @@
+# tools/clockify_client.py
+import asyncio
+import math
+from typing import Any, Dict, List, Optional
+
+import httpx
+from rate_limit import TokenBucket
+from settings import settings
+from tracing import span
+
+PAGE_SIZE = 1000
+MAX_RETRIES = 3
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _backoff(attempt: int) -> float:
+    return 0.2 * 2 ** attempt
+
+
+class ClockifyClient:
+    """
+    Async Clockify client shared by every request in the process.
+
+    A single `httpx.AsyncClient` keeps connections to Clockify alive between
+    calls, and a shared token bucket replaces the old fixed `time.sleep(0.1)`
+    between pages, so concurrent sessions stay within the workspace rate limit
+    without ever blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        workspace_id: str,
+        api_base_url: str,
+        reports_base_url: str,
+        max_connections: int,
+        requests_per_second: float,
+        timeout: float,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.workspace_id = workspace_id
+        self.api_base_url = api_base_url.rstrip("/")
+        self.reports_base_url = reports_base_url.rstrip("/")
+        self._rate_limiter = TokenBucket(requests_per_second)
+        self._http = httpx.AsyncClient(
+            headers={
+                "X-Api-Key": api_key,
+                "Content-Type": "application/json"
+            },
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a rate-limited request, retrying throttled and transient failures."""
+        with span("clockify.request", {"http.method": method, "url.path": httpx.URL(url).path}) as s:
+            for attempt in range(MAX_RETRIES + 1):
+                s.set_attribute("retries", attempt)
+                await self._rate_limiter.acquire()
+                try:
+                    response = await self._http.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    if attempt == MAX_RETRIES:
+                        raise
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < MAX_RETRIES:
+                    retry_after = response.headers.get("Retry-After", "")
+                    await asyncio.sleep(int(retry_after) if retry_after.isdigit() else _backoff(attempt))
+                    continue
+
+                s.set_attributes({"http.status_code": response.status_code, "response.bytes": len(response.content)})
+                response.raise_for_status()
+                return response
+
+    async def get_projects(self) -> List[Dict[str, Any]]:
+        url = f"{self.api_base_url}/workspaces/{self.workspace_id}/projects"
+        response = await self._request("GET", url)
+        return response.json()
+
+    async def _get_detailed_report_page(self, project_id, user_id, rangeStart, rangeEnd, page) -> Dict[str, Any]:
+        url = f"{self.reports_base_url}/workspaces/{self.workspace_id}/reports/detailed"
+        payload = {
+            "dateRangeStart": rangeStart,
+            "dateRangeEnd": rangeEnd,
+            "detailedFilter": {
+                "page": page,
+                "pageSize": PAGE_SIZE,
+                "sortColumn": "DATE"
+            },
+            "sortOrder": "DESCENDING",
+            "projects": {"ids": [project_id]},
+            "users": {"ids": [user_id]},
+            "amountShown": "HIDE_AMOUNT"
+        }
+        response = await self._request("POST", url, json=payload)
+        return response.json()
+
+    async def get_time_entries(self, project_id, user_id, rangeStart, rangeEnd) -> List[Dict[str, Any]]:
+        """
+        Fetch every detailed-report time entry for a project and user within a date range.
+
+        The first page is fetched on its own; its totals tell us how many pages
+        exist, and the remaining pages are then requested concurrently. If the
+        report omits totals we fall back to walking pages until one comes back
+        empty. Entries are returned in report order: newest first, by start time.
+        """
+        first_page = await self._get_detailed_report_page(project_id, user_id, rangeStart, rangeEnd, 1)
+        entries = list(first_page.get("timeentries", []))
+        if len(entries) < PAGE_SIZE:
+            return entries
+
+        totals = first_page.get("totals") or []
+        entries_count = totals[0].get("entriesCount") if totals and totals[0] else None
+
+        if entries_count is None:
+            page = 2
+            while True:
+                page_entries = (await self._get_detailed_report_page(
+                    project_id, user_id, rangeStart, rangeEnd, page)).get("timeentries", [])
+                if not page_entries:
+                    break
+                entries.extend(page_entries)
+                page += 1
+            return entries
+
+        page_count = math.ceil(entries_count / PAGE_SIZE)
+        pages = await asyncio.gather(*(
+            self._get_detailed_report_page(project_id, user_id, rangeStart, rangeEnd, page)
+            for page in range(2, page_count + 1)
+        ))
+        for page in pages:
+            entries.extend(page.get("timeentries", []))
+        return entries
+
+    async def warm_up(self):
+        """Open a connection (DNS, TCP, TLS) to both Clockify hosts; any HTTP response will do."""
+        await asyncio.gather(self._http.head(self.api_base_url), self._http.head(self.reports_base_url))
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_client: Optional[ClockifyClient] = None
+
+
+def get_clockify_client() -> ClockifyClient:
+    """Return the process-wide Clockify client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = ClockifyClient(
+            api_key=settings.clockify_api_key,
+            workspace_id=settings.clockify_workspace_id,
+            api_base_url=settings.clockify_api_base_url,
+            reports_base_url=settings.clockify_reports_base_url,
+            max_connections=settings.clockify_max_connections,
+            requests_per_second=settings.clockify_requests_per_second,
+            timeout=settings.clockify_timeout_seconds,
+        )
+    return _client
+
+
+async def close_clockify_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,15 +1,21 @@
-import time
-import requests
+import asyncio
+
 from settings import settings
+from tools.activity_filter import summarize_activities
+from tools.clockify_cache import get_clockify_cache
+from tools.clockify_client import get_clockify_client
+from tracing import span
 
 
-def get_all_descriptions(project_id, user_id, rangeStart, rangeEnd):
+async def get_all_descriptions(project_id, user_id, rangeStart, rangeEnd):
     """
-    Retrieve all unique time entry descriptions from Clockify for a specific project and user within a date range.
+    Retrieve the development activities from Clockify time entries for a specific project and user within a date range.
     
     This function fetches time tracking descriptions logged by a user on a specific project
-    for a custom date range. It automatically handles pagination to retrieve all entries
-    and returns deduplicated descriptions.
+    for a custom date range. It automatically handles pagination to retrieve all entries.
+    With the activity filter enabled, non-development entries are dropped and exact and
+    near-duplicate descriptions merged (see tools/activity_filter.py); otherwise the
+    descriptions are only deduplicated.
     
     Args:
         project_id (str): The Clockify project ID to fetch time entries from.
@@ -18,72 +24,49 @@ def get_all_descriptions(project_id, user_id, rangeStart, rangeEnd):
         rangeEnd (str): End date in ISO 8601 format (e.g., "2025-10-24T23:59:59.000Z").
     
     Returns:
-        str: A comma-separated string of unique time entry descriptions in the order
-             they were first encountered. Empty descriptions are excluded.
+        str: A comma-separated string of activities, ranked by time logged, each with "(xN)"
+             when it stands for N entries. Without the activity filter: the unique
+             descriptions in the order they were first encountered. Empty descriptions are excluded.
     
     Example:
-        descriptions = get_all_descriptions(
+        descriptions = await get_all_descriptions(
             "proj123", 
             "user456",
             "2025-06-01T00:00:00.000Z",
             "2025-12-31T23:59:59.000Z"
         )
-        # Returns: "Frontend development, API integration, Code review, Bug fixes"
+        # Returns: "Frontend development (x14), API integration (x9), Code review (x6), Bug fixes"
     
     Note:
         - Requires valid Clockify API credentials in settings (clockify_api_key, clockify_workspace_id)
-        - Respects API rate limits with 100ms delay between paginated requests
-        - Preserves original case and order of first occurrence
+        - Pages after the first are fetched concurrently through the shared, rate-limited ClockifyClient
+        - Results are served from the Clockify report cache when enabled; only uncached sub-ranges are fetched
+        - Activities keep the original case of their most frequent wording, without ticket ids
         - Date format must be ISO 8601 with timezone (UTC recommended)
     """
-    try:
-        url = f"https://reports.api.clockify.me/v1/workspaces/{settings.clockify_workspace_id}/reports/detailed"
-        headers = {
-            "X-Api-Key": settings.clockify_api_key,
-            "Content-Type": "application/json"
-        }
-        
-        all_descriptions = []
-        current_page = 1
-        
-        while True:
-            payload = {
-                "dateRangeStart": rangeStart,
-                "dateRangeEnd": rangeEnd,
-                "detailedFilter": {
-                    "page": current_page,
-                    "pageSize": 1000
-                },
-                "projects": {"ids": [project_id]},
-                "users": {"ids": [user_id]},
-                "amountShown": "HIDE_AMOUNT"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers)
-            data = response.json()
-            
-            # Extract entries from this page
-            entries = data.get('timeentries', [])
-            
-            if not entries:
-                break  # Exit loop if no more entries
-                
-            for entry in entries:
-                if entry.get('description'):
-                    all_descriptions.append(entry['description'])
-            
-            print(f"Fetched page {current_page}...")
-            current_page += 1
-            
-            # Short sleep to respect rate limits (50 req/sec, but good to be safe)
-            time.sleep(0.1) 
-        
-        
-        # all_descriptions = list(set(desc.lower() for desc in all_descriptions))
-        all_descriptions = list(dict.fromkeys(all_descriptions))
-        
-        final_text = ", ".join(all_descriptions)
-        return final_text
-    except Exception as e:
-        print(f"Error fetching descriptions: {str(e)}")
-        return ""
+    with span("tool.clockify_descriptions", {"project.id": project_id}) as s:
+        try:
+            if settings.clockify_cache_enabled:
+                entries = await get_clockify_cache().get_time_entries(project_id, user_id, rangeStart, rangeEnd)
+            else:
+                entries = await get_clockify_client().get_time_entries(project_id, user_id, rangeStart, rangeEnd)
+            print(f"Fetched {len(entries)} time entries...")
+
+            if settings.activity_filter_enabled:
+                # CPU-bound for long ranges, so off the event loop
+                final_text, result = await asyncio.to_thread(summarize_activities, entries)
+                s.set_attributes({"entries": len(entries), "excluded": result["excluded"], "descriptions": result["unique"],
+                                  "activities": len(result["activities"]) + len(result["omitted"]), "result.bytes": len(final_text)})
+                return final_text
+
+            all_descriptions = [entry['description'] for entry in entries if entry.get('description')]
+            # all_descriptions = list(set(desc.lower() for desc in all_descriptions))
+            all_descriptions = list(dict.fromkeys(all_descriptions))
+
+            final_text = ", ".join(all_descriptions)
+            s.set_attributes({"entries": len(entries), "descriptions": len(all_descriptions), "result.bytes": len(final_text)})
+            return final_text
+        except Exception as e:
+            print(f"Error fetching descriptions: {str(e)}")
+            s.record_error(e)
+            return ""
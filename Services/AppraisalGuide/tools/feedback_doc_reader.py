@@ -1,42 +1,129 @@
+import asyncio
 import base64
-import openpyxl
+import hashlib
+import io
 import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
 
-def parse_feedback_excel(file_path):
+from tracing import current_span, span
+
+MAX_CACHED_DOCUMENTS = 64
+
+# path -> ((mtime_ns, size), sha256): lets an unchanged file be recognised with a stat() call;
+# an LRU with the same cap, entries go when their digest is evicted
+_stat_cache: "OrderedDict[str, Tuple[Tuple[int, int], str]]" = OrderedDict()
+# sha256 -> parsed workbook, so identical content at a new path/mtime is not parsed again
+_parsed_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _parse_workbook(source) -> Dict[str, Any]:
+    # Imported on first use: openpyxl is a noticeable share of the app's import time
+    import openpyxl
+
+    # read_only streams rows from the sheet XML instead of building every cell in memory
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
     try:
-        file_path = base64.b64decode(file_path.encode('utf-8')).decode('utf-8')
-        # Load the workbook
-        wb = openpyxl.load_workbook(file_path, data_only=True)
         all_sheets_data = {}
 
         for sheet_name in wb.sheetnames:
             ws = wb[sheet_name]
             sheet_content = {}
             current_key = None
-            
+
             # We start from row 2 to skip the main title "ENGINEER-LEAD FEEDBACK DOCUMENT"
             # max_col=2 because we only care about columns A and B
             for row in ws.iter_rows(min_row=2, max_col=2, values_only=True):
-                key_cell, value_cell = row
-                
+                key_cell, value_cell = (tuple(row) + (None, None))[:2]
+
                 # If Column A has text, it's a new category (e.g., "Appreciations")
                 if key_cell:
                     # Create a clean key name (e.g., "Action Items" -> "action_items")
-                    current_key = key_cell.strip().lower().replace(" ", "_")
+                    current_key = str(key_cell).strip().lower().replace(" ", "_")
                     sheet_content[current_key] = []
-                    
+
                     if value_cell:
                         sheet_content[current_key].append(str(value_cell).strip())
-                
+
                 # If Column A is empty but Column B has text, it's a continuation point
                 elif current_key and value_cell:
                     sheet_content[current_key].append(str(value_cell).strip())
-            
+
             # Store this sheet's data using the sheet name as the key
             all_sheets_data[sheet_name] = sheet_content
-            
-        json_output = json.dumps(all_sheets_data)
-        return json_output
+
+        return all_sheets_data
+    finally:
+        wb.close()
+
+
+def load_feedback(file_path: str) -> Dict[str, Any]:
+    """
+    Parse the feedback workbook at a base64 encoded path into {sheet: {category: [points]}}.
+
+    Results are cached by content: an unchanged file (same path, mtime and size)
+    costs a single stat() call, and a changed stat only re-parses when the
+    sha256 of the bytes is new. Blocking; use `aload_feedback` from async code.
+    """
+    path = base64.b64decode(file_path.encode('utf-8')).decode('utf-8')
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    current_span().set_attribute("feedback.bytes", stat.st_size)
+
+    with _cache_lock:
+        cached = _stat_cache.get(path)
+        if cached and cached[0] == signature and cached[1] in _parsed_cache:
+            _parsed_cache.move_to_end(cached[1])
+            _stat_cache.move_to_end(path)
+            current_span().set_attribute("feedback.cache", "stat_hit")
+            return _parsed_cache[cached[1]]
+
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    with _cache_lock:
+        parsed = _parsed_cache.get(digest)
+    current_span().set_attribute("feedback.cache", "content_hit" if parsed is not None else "miss")
+    if parsed is None:
+        parsed = _parse_workbook(io.BytesIO(content))
+
+    with _cache_lock:
+        _stat_cache[path] = (signature, digest)
+        _stat_cache.move_to_end(path)
+        _parsed_cache[digest] = parsed
+        _parsed_cache.move_to_end(digest)
+        evicted = set()
+        while len(_parsed_cache) > MAX_CACHED_DOCUMENTS:
+            evicted.add(_parsed_cache.popitem(last=False)[0])
+        for stale_path in [p for p, (_, d) in _stat_cache.items() if d in evicted]:
+            del _stat_cache[stale_path]
+        while len(_stat_cache) > MAX_CACHED_DOCUMENTS:
+            _stat_cache.popitem(last=False)
+    return parsed
+
+
+async def aload_feedback(file_path: str) -> Dict[str, Any]:
+    """Async `load_feedback`; parsing runs in a worker thread so the event loop keeps serving."""
+    with span("tool.feedback_excel"):
+        return await asyncio.to_thread(load_feedback, file_path)
+
+
+def parse_feedback_excel(file_path):
+    try:
+        return json.dumps(load_feedback(file_path))
+    except Exception as e:
+        print(f"Error parsing Excel file: {str(e)}")
+        return ""
+
+
+async def aparse_feedback_excel(file_path):
+    try:
+        return json.dumps(await aload_feedback(file_path))
     except Exception as e:
         print(f"Error parsing Excel file: {str(e)}")
         return ""
@@ -0,0 +1,253 @@
+# tracing.py
+import contextvars
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from settings import settings
+
+SERVICE_NAME = "appraisal-guide"
+MAX_BATCH_SIZE = 512
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Queued to stop the exporter thread after a final flush
+_SHUTDOWN = object()
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation with attributes, in the OTLP trace data model.
+
+    Spans opened while another span is current become its children, also
+    across `asyncio.create_task`, which copies the context.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else ""
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status_code = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def add_to_attribute(self, key: str, amount: float):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_error(self, error: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class _NoopSpan(Span):
+    """Stand-in returned when tracing is disabled, so call sites need no checks."""
+
+    def __init__(self):
+        pass
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_to_attribute(self, key, amount):
+        pass
+
+    def record_error(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanExporter:
+    """
+    Batches finished spans and writes them from a background thread, so ending
+    a span never does I/O on the event loop.
+
+    Each batch is one OTLP/JSON ExportTraceServiceRequest. It is appended as a
+    line to `path` and, when `endpoint` is set, POSTed to an OTLP/HTTP collector
+    (e.g. http://localhost:4318/v1/traces).
+    """
+
+    def __init__(self, path: Optional[str], endpoint: Optional[str], flush_interval: float):
+        self.path = path
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def _run(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _SHUTDOWN:
+                self._write(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= MAX_BATCH_SIZE or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: List[Span]):
+        if not batch:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME), _otlp_attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [span.to_otlp() for span in batch]}],
+        }]}
+        try:
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(request) + "\n")
+            if self.endpoint:
+                import httpx
+                httpx.post(self.endpoint, json=request, timeout=5.0)
+        except Exception as e:
+            print(f"Span export failed: {e}")
+
+    def shutdown(self):
+        self._queue.put(_SHUTDOWN)
+        self._thread.join(timeout=5.0)
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = SpanExporter(settings.tracing_export_path, settings.tracing_otlp_endpoint,
+                                         settings.tracing_flush_interval_seconds)
+    return _exporter
+
+
+def current_span() -> Span:
+    """The innermost open span, for adding attributes from deeper in the call stack."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Span:
+    """
+    Start a span under the current one without making it current. Use
+    `use_span` to open children under it, e.g. from a streaming response whose
+    work runs in several places, and `end_span` to finish it.
+    """
+    if not settings.tracing_enabled:
+        return NOOP_SPAN
+    return Span(name, _current_span.get(), attributes)
+
+
+def end_span(finished: Span):
+    if finished is NOOP_SPAN:
+        return
+    finished.end_ns = time.time_ns()
+    _get_exporter().export(finished)
+
+
+@contextmanager
+def use_span(active: Span):
+    """Make `active` the current span for the block, without ending it."""
+    if active is NOOP_SPAN:
+        yield active
+        return
+    token = _current_span.set(active)
+    try:
+        yield active
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Open a span for the duration of the block. Exceptions mark it as failed and propagate."""
+    new_span = start_span(name, attributes)
+    try:
+        with use_span(new_span):
+            yield new_span
+    except BaseException as e:
+        new_span.record_error(e)
+        raise
+    finally:
+        end_span(new_span)
+
+
+def shutdown_tracing():
+    """Flush spans still queued for export."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def sampled_log(event: str, sample_rate: Optional[float] = None, **fields):
+    """
+    Structured (JSON line) log for hot paths: only a `sample_rate` fraction of
+    calls is printed, tagged with the current trace and span ids.
+    """
+    rate = settings.log_sample_rate if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    current = _current_span.get()
+    record = {"event": event, "sample_rate": rate, **fields}
+    if current:
+        record["trace_id"], record["span_id"] = current.trace_id, current.span_id
+    print(json.dumps(record, default=str))
@@ -1,4 +1,6 @@
-from typing import Any, Dict, List
+import json
+import re
+from typing import Any, Dict, List, Tuple
 
 
 def strip_unwanted_properties(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -12,14 +14,316 @@ def strip_unwanted_properties(messages: List[Dict[str, Any]]) -> List[Dict[str,
         cleaned_messages.append(cleaned_message)
     return cleaned_messages
 
+# Characters that change the scanner's state: braces and quotes outside strings,
+# quotes and backslashes inside them. Everything in between is skipped by one search.
+_JSON_STRUCTURE = re.compile(r'[{}"]')
+_JSON_STRING_STRUCTURE = re.compile(r'["\\]')
+# The rest of a string up to and including its closing quote, when it is all in the chunk
+_JSON_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+
+class JSONStreamScanner:
+    """
+    Incremental scanner for JSON objects embedded in streamed LLM output.
+
+    `feed` consumes chunks as they arrive and returns the part of the chunk
+    outside top-level JSON objects, so callers can forward prose and hold back
+    everything from the first "{" on. Braces and escaped quotes inside JSON
+    strings are handled. Every character is looked at once, so the cost of a
+    chunk is proportional to the chunk, not to the output so far. Each
+    top-level object is parsed as soon as it closes and appended to `objects`;
+    a balanced span that is not valid JSON is dropped.
+    """
+
+    def __init__(self):
+        self.objects: List[Dict[str, Any]] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_parts: List[str] = []
+
+    @property
+    def in_object(self) -> bool:
+        return self._depth > 0
+
+    def feed(self, chunk: str) -> str:
+        prose: List[str] = []
+        pos = 0
+        # Start of the current prose run, or of the current object's text, in this chunk
+        segment_start = 0
+        if self._escape and chunk:
+            # The previous chunk ended with a backslash inside a string
+            self._escape = False
+            pos = 1
+
+        while pos < len(chunk):
+            if self._in_string:
+                match = _JSON_STRING_STRUCTURE.search(chunk, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos < len(chunk):
+                        pos += 1
+                    else:
+                        self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _JSON_STRUCTURE.search(chunk, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if self._depth == 0:
+                # Quotes and closing braces in prose mean nothing
+                if char == "{":
+                    prose.append(chunk[segment_start:match.start()])
+                    segment_start = match.start()
+                    self._depth = 1
+            elif char == '"':
+                rest = _JSON_STRING_REST.match(chunk, pos)
+                if rest:
+                    pos = rest.end()
+                else:
+                    self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._object_parts.append(chunk[segment_start:pos])
+                    self._close_object()
+                    segment_start = pos
+
+        if self._depth:
+            self._object_parts.append(chunk[segment_start:])
+        else:
+            prose.append(chunk[segment_start:])
+        return "".join(prose)
+
+    def _close_object(self):
+        text = "".join(self._object_parts)
+        self._object_parts = []
+        try:
+            self.objects.append(json.loads(text))
+        except ValueError:
+            pass
+
+
+# Structural characters of an object being streamed field by field
+_JSON_FIELD_STRUCTURE = re.compile(r'[{}\[\]":,]')
+# Longest undecodable tail of a streamed string: a \\uXXXX high surrogate plus a partial \\uXXX
+MAX_INCOMPLETE_ESCAPE = 11
+
+
+def _decode_string_prefix(raw: str) -> Tuple[str, str]:
+    """
+    Decode as much of the raw (still escaped) text of an unfinished JSON string
+    as possible. Returns the decoded text and the raw tail that has to wait for
+    more input: a split escape sequence or half of a surrogate pair.
+    """
+    for cut in range(min(MAX_INCOMPLETE_ESCAPE, len(raw)) + 1):
+        head = raw[:len(raw) - cut]
+        try:
+            text = json.loads('"' + head + '"')
+        except ValueError:
+            continue
+        if text and "\ud800" <= text[-1] <= "\udbff":
+            continue
+        return text, raw[len(head):]
+    return "", raw
+
+
+class JSONFieldStreamer:
+    """
+    Streams the values of selected top-level string fields of a JSON object
+    while the object is still being generated.
+
+    `feed` returns (field, text) pieces of the decoded values of `fields` as
+    they arrive, so e.g. a question can be shown before the rest of the
+    object exists. Completed top-level string values of every field are kept
+    in `values`, which lets a caller read a short field such as "rating"
+    before a long one that follows it. Only the first object is read.
+    """
+
+    def __init__(self, fields):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {}
+        self._depth = 0
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        # "key" or "value" for strings directly inside the object, None for nested ones
+        self._string_kind = None
+        self._expect_value = False
+        self._key = None
+        self._raw: List[str] = []
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        pieces: List[Tuple[str, str]] = []
+        pos = 0
+        string_start = 0
+        if self._escape and chunk:
+            self._escape = False
+            pos = 1
+
+        while pos < len(chunk) and not self._done:
+            if self._in_string:
+                match = _JSON_STRING_STRUCTURE.search(chunk, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos < len(chunk):
+                        pos += 1
+                    else:
+                        self._escape = True
+                else:
+                    self._in_string = False
+                    self._string_text(chunk[string_start:match.start()], True, pieces)
+                continue
+
+            match = _JSON_FIELD_STRUCTURE.search(chunk, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+            elif char == '"':
+                self._in_string = True
+                string_start = pos
+                if self._depth == 1:
+                    self._string_kind = "value" if self._expect_value else "key"
+                else:
+                    self._string_kind = None
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                self._done = self._depth == 0
+            elif self._depth == 1:
+                self._expect_value = char == ":"
+
+        if self._in_string:
+            self._string_text(chunk[string_start:], False, pieces)
+        return pieces
+
+    def _string_text(self, text: str, closed: bool, pieces: List[Tuple[str, str]]):
+        if self._string_kind is None:
+            return
+        self._raw.append(text)
+        if self._string_kind == "value" and self._key in self.fields:
+            self._pending += text
+            if closed:
+                ready, self._pending = json.loads('"' + self._pending + '"'), ""
+            else:
+                ready, self._pending = _decode_string_prefix(self._pending)
+            if ready:
+                pieces.append((self._key, ready))
+        if closed:
+            value = json.loads('"' + "".join(self._raw) + '"')
+            self._raw = []
+            if self._string_kind == "key":
+                self._key = value
+            else:
+                self.values[self._key] = value
+
+
 def extract_json(text: str) -> Dict[str, Any]:
     """
-    Extract the JSON substring from the LLM output.
-    Simplified extraction for prototype.
+    Extract the first JSON object from the LLM output, ignoring any prose
+    or code fences around it. Returns {} when there is none.
+    """
+    scanner = JSONStreamScanner()
+    scanner.feed(text)
+    return scanner.objects[0] if scanner.objects else {}
+
+
+# Rough token estimate (about 4 characters per token) used for history budgeting;
+# it avoids a tokenizer round trip per message.
+CHARS_PER_TOKEN = 4
+
+HISTORY_SUMMARY_PROMPT = """
+You maintain a running summary of an appraisal conversation between an assistant and an employee.
+Update the existing summary with the new messages below. Keep every fact the employee shared
+(projects, responsibilities, technologies, examples, impact, ratings discussed) and the questions
+already asked, so they are not asked again. Write plain prose, at most 200 words, no preamble.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(str(m.get("content", ""))) // CHARS_PER_TOKEN + 1 for m in messages)
+
+
+def _history_fingerprint(messages: List[Dict[str, Any]]) -> str:
+    import hashlib
+    return hashlib.sha256(json.dumps([[m["role"], m["content"]] for m in messages]).encode("utf-8")).hexdigest()
+
+
+async def _summarize_history(model, summary: str, messages: List[Dict[str, Any]]) -> str:
+    import time
+    from llm_usage import usage_tracker
+    from tracing import span
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = HISTORY_SUMMARY_PROMPT.format(summary=summary or "(none)", messages=transcript)
+    with span("llm.history_summary", {"messages": len(messages)}):
+        started = time.perf_counter()
+        response = await model.ainvoke([{"role": "user", "content": prompt}])
+        usage_tracker.record("history_summary", response.usage_metadata, time.perf_counter() - started)
+    return response.text.strip()
+
+
+async def window_history(messages: List[Dict[str, Any]], cached_summary: Dict[str, Any], model,
+                         keep_last_turns: int, token_budget: int,
+                         summary_batch_turns: int = 2) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Fit a message history into `token_budget` estimated tokens.
+
+    The last `keep_last_turns` turns (user + assistant message pairs) are kept
+    verbatim. Older messages are folded into a rolling summary that is sent as
+    a single message ahead of them. `cached_summary` is the record returned by
+    the previous call ({"summary", "covered", "fingerprint"}); only messages the
+    summary does not cover yet are sent to `model`, and only once at least
+    `summary_batch_turns` of them have accumulated or the budget is exceeded,
+    so most turns cost no summarization call. Until then they are sent verbatim.
+
+    Returns the messages to send and the summary record to persist.
     """
-    import json
-    import re
-    match = re.search(r'\{[\s\S]*\}', text)
-    if match:
-        return json.loads(match.group(0))
-    return {}
+    summary = cached_summary.get("summary", "") if cached_summary else ""
+    covered = cached_summary.get("covered", 0) if cached_summary else 0
+    if covered > len(messages) or (covered and cached_summary.get("fingerprint") != _history_fingerprint(messages[:covered])):
+        # History was rewritten since the summary was made
+        summary, covered = "", 0
+
+    keep = min(len(messages), max(keep_last_turns, 1) * 2)
+    cut = len(messages) - keep
+    fold_until = cut if cut - covered >= summary_batch_turns * 2 else covered
+    # The summary itself counts against the budget; the latest message is always sent verbatim
+    verbatim_budget = token_budget - (estimate_tokens([{"content": summary}]) if summary else 0)
+    verbatim_tokens = estimate_tokens(messages[fold_until:])
+    while verbatim_tokens > verbatim_budget and fold_until < len(messages) - 1:
+        verbatim_tokens -= estimate_tokens(messages[fold_until:fold_until + 1])
+        fold_until += 1
+
+    if fold_until > covered:
+        summary = await _summarize_history(model, summary, messages[covered:fold_until])
+        covered = fold_until
+
+    window = list(messages[covered:])
+    if summary:
+        window.insert(0, {"role": "user", "content": "Summary of our earlier conversation (older messages omitted):\n" + summary})
+
+    record = {"summary": summary, "covered": covered, "fingerprint": _history_fingerprint(messages[:covered])} if covered else {}
+    return window, record
@@ -0,0 +1,117 @@
+# warmup.py
+import asyncio
+import importlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import session_store
+from settings import settings
+from tools.clockify_client import get_clockify_client
+from tracing import span
+
+# Agent modules build their nodes' LLM clients (llm.get_llm) when imported
+AGENT_MODULES = ("agents.project_intake", "agents.context_builder", "agents.evaluation_agent")
+
+
+async def warm_session_store():
+    await session_store.get_backend().warm_up(min(settings.warmup_redis_connections, settings.redis_max_connections))
+
+
+async def warm_llm_clients():
+    for module in AGENT_MODULES:
+        await asyncio.to_thread(importlib.import_module, module)
+
+
+async def warm_graph():
+    # Importing workflow imports langgraph and compiles the graph
+    await asyncio.to_thread(importlib.import_module, "workflow")
+
+
+async def warm_clockify():
+    await get_clockify_client().warm_up()
+
+
+class WarmUp:
+    """
+    Startup work that would otherwise fall on the first requests: the session
+    store's connection pool, the LLM clients, the compiled workflow graph and
+    the Clockify HTTP connections, all started at once. A required step that
+    fails is retried every `retry_seconds` (the process stays not ready); an
+    optional one (Clockify, an external service) is logged and given up.
+    """
+
+    def __init__(self, retry_seconds: float):
+        self.retry_seconds = retry_seconds
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        self.started_at = time.perf_counter()
+        with span("warmup"):
+            await asyncio.gather(
+                self._step("session_store", warm_session_store),
+                self._step("llm_clients", warm_llm_clients),
+                self._step("graph", warm_graph),
+                self._step("clockify", warm_clockify, required=False),
+            )
+        self.finished_at = time.perf_counter()
+        print(f"Warm-up done in {self.finished_at - self.started_at:.2f}s: "
+              + ", ".join(f"{name}={step['status']} {step['seconds']}s" for name, step in self.steps.items()))
+
+    async def _step(self, name: str, warm: Callable[[], Awaitable[None]], required: bool = True):
+        step = self.steps[name] = {"status": "running", "seconds": None, "attempts": 0, "error": None}
+        started = time.perf_counter()
+        while True:
+            step["attempts"] += 1
+            try:
+                with span(f"warmup.{name}"):
+                    await warm()
+                step["status"] = "done"
+                break
+            except Exception as e:
+                step["error"] = f"{type(e).__name__}: {e}"
+                if not required:
+                    print(f"Warm-up of {name} failed, continuing without it: {step['error']}")
+                    step["status"] = "skipped"
+                    break
+                print(f"Warm-up of {name} failed, retrying in {self.retry_seconds}s: {step['error']}")
+                await asyncio.sleep(self.retry_seconds)
+        step["seconds"] = round(time.perf_counter() - started, 3)
+
+    def get_status(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at if self.started_at else None
+        return {
+            "ready": self.ready,
+            "seconds": round(elapsed, 3) if elapsed is not None else None,
+            "steps": self.steps,
+        }
+
+
+_warmup: Optional[WarmUp] = None
+
+
+def get_warmup() -> WarmUp:
+    """Return the process-wide warm-up, creating it on first use."""
+    global _warmup
+    if _warmup is None:
+        _warmup = WarmUp(retry_seconds=settings.warmup_retry_seconds)
+    return _warmup
@@ -1,33 +1,66 @@
 # workflow.py
+import datetime
+import json
+from uuid import uuid4
+
 import constants
 from langgraph.graph import StateGraph, END
+from checkpointer import checkpointer
 from state import AppState
+from tracing import span
 
 
 graph = StateGraph(AppState)
 
+async def run_agent(agent, state, config):
+    """
+    Run an agent and return its state delta for the checkpointer.
+
+    Events are forwarded to the caller's stream_callback. Along the way
+    `state_update` events are folded into the delta (they win over the values
+    the agent returns, as they are what the client sees) and `full_text` /
+    `metadata` events become the messages the node appends. The agent's own
+    `messages` value is its history view, not an update, and is dropped.
+    """
+    stream_callback = config['configurable']["stream_callback"]
+    conversation_id = config['configurable']["thread_id"]
+    updates = {}
+    new_messages = []
+
+    async def node_callback(chunk):
+        if chunk["type"] == "state_update":
+            updates.update(json.loads(chunk["data"]))
+        elif chunk["type"] in ("full_text", "metadata"):
+            new_messages.append({
+                "role": "assistant",
+                "content": chunk["data"],
+                "id": str(uuid4()),
+                "created_at": datetime.datetime.utcnow().isoformat(),
+                "conversation_id": conversation_id,
+                "message_section": chunk["current_step"],
+                "message_type": "metadata" if chunk["type"] == "metadata" else ""
+            })
+        await stream_callback(chunk)
+
+    result = await agent(state, node_callback)
+    result.pop("messages", None)
+    return {**result, **updates, "messages": new_messages}
+
 async def intake_node(state, config):
-    # print("In intake_node with state:", state)
-    # print("In intake_node with config:", config)
     from agents.project_intake import project_intake_agent
-    stream_callback = config['configurable']["stream_callback"]
-    return await project_intake_agent(state, stream_callback)
+    with span("node.intake"):
+        return await run_agent(project_intake_agent, state, config)
 
 async def context_builder_node(state, config):
     from agents.context_builder import context_builder
-    stream_callback = config['configurable']["stream_callback"]
-    return await context_builder(state, stream_callback)
-
-async def start_node(state, config):
-    from agents.start import start
-    stream_callback = config['configurable']["stream_callback"]
-    return await start(state, stream_callback)
+    with span("node.context_builder"):
+        return await run_agent(context_builder, state, config)
 
 # create node for evaluation agent
 async def evaluation_node(state, config):
     from agents.evaluation_agent import evaluation_agent
-    stream_callback = config['configurable']["stream_callback"]
-    return await evaluation_agent(state, stream_callback)
+    with span("node.evaluation"):
+        return await run_agent(evaluation_agent, state, config)
 
 def intake_router(state):
     if state["current_node_complete"]:
@@ -39,7 +72,9 @@ def context_builder_router(state):
     return constants.EVALUATION_STEP
 
 def start_router(state):
-    return state.get("current_step", constants.PROJECT_INTAKE_STEP)
+    # Resume at the step the conversation was left in
+    current_step = state.get("current_step")
+    return current_step if current_step and current_step != "start" else constants.PROJECT_INTAKE_STEP
 
 def evaluation_node_router(state):
     if state["current_node_complete"]:
@@ -50,7 +85,6 @@ def evaluation_node_router(state):
         return constants.EVALUATION_STEP
     return END
 
-graph.add_node("start", start_node)
 graph.add_node(constants.PROJECT_INTAKE_STEP, intake_node)
 graph.add_node(constants.CONTEXT_BUILDER_STEP, context_builder_node)
 graph.add_node(constants.EVALUATION_STEP, evaluation_node)
@@ -69,16 +103,11 @@ graph.add_conditional_edges(
     context_builder_router
 )
 
-graph.add_conditional_edges(
-    "start",
-    start_router
-)
-
 graph.add_conditional_edges(
     constants.EVALUATION_STEP,
     evaluation_node_router
 )
 
-graph.set_entry_point("start")
+graph.set_conditional_entry_point(start_router)
 
-workflow = graph.compile()
+workflow = graph.compile(checkpointer=checkpointer)
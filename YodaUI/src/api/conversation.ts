@@ -180,9 +180,11 @@ export const conversationApi = {
     buffer = parts.pop() ?? "";
 
     for (const part of parts) {
-      if (!part.startsWith("data:")) continue;
+      // An event is "id: ..." (when it has one) followed by "data: ..."
+      const dataLine = part.split("\n").find((line) => line.startsWith("data:"));
+      if (!dataLine) continue;
 
-      const raw = part.replace(/^data:\s*/, "").trim();
+      const raw = dataLine.replace(/^data:\s*/, "").trim();
       if (!raw) continue;
 
       try {